@@ -0,0 +1,132 @@
+"""
+Benchmark: import time of the entry points and utils modules, with a budget.
+
+Each module is imported in a fresh interpreter with `python -X importtime`;
+the report lists its cumulative import time (median of `--runs`) and the
+heaviest modules it pulled in. With a budget file (default:
+benchmarks/import_budget.json, milliseconds per module) modules over budget
+are flagged and the exit status is 1, so the check can run in CI.
+
+Heavy libraries (torch, torchaudio, librosa, gradio, the chatterbox model
+stack) are imported inside the functions that need them: a module that
+starts importing one at top level shows up here as a budget regression.
+
+Usage (from the project root, with config.py in place):
+    python -m benchmarks.bench_imports
+    python -m benchmarks.bench_imports --modules utils.voice_manager utils.web_handlers
+    python -m benchmarks.bench_imports --update   # rewrite the budget from this run
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+BUDGET_FILE = Path(__file__).parent / "import_budget.json"
+
+# Modules measured by default: the light utils, then the entry points
+DEFAULT_MODULES = [
+    "utils.text_utils",
+    "utils.text_splitter",
+    "utils.history_manager",
+    "utils.gradio_helpers",
+    "utils.audio_utils",
+    "utils.voice_index",
+    "utils.voice_manager",
+    "utils.library_catalog",
+    "utils.output_manager",
+    "utils.setup_utils",
+    "chatterbox.registry",
+    "utils.web_handlers",
+    "main",
+    "main-web",
+]
+
+# Headroom of the budget written by --update over the measured time: enough
+# for machine noise, far below a heavy library (numpy, librosa, torch, gradio)
+BUDGET_MARGIN = 2.0
+BUDGET_MIN_MS = 50
+
+
+def parse_importtime(stderr: str):
+    """(module, self_us, cumulative_us, depth) of each `-X importtime` line."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append((stripped, int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure(module: str):
+    """Cumulative import time of `module` (ms) and its heaviest imports, in a fresh interpreter."""
+    # __import__ also takes names that are not identifiers (main-web); unlike
+    # importlib.import_module it goes through the import that -X importtime times
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"__import__({module!r})"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    entries = parse_importtime(result.stderr)
+    total = next(cumulative for name, _, cumulative, depth in reversed(entries) if name == module and depth == 0)
+
+    # The target's own subtree: the lines logged after the previous top-level import
+    start = max((i for i, (_, _, _, depth) in enumerate(entries[:-1]) if depth == 0), default=-1) + 1
+    children = [(name, cumulative) for name, _, cumulative, depth in entries[start:-1] if depth == 1]
+    return total / 1000, sorted(children, key=lambda c: -c[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time per module, checked against a budget")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Imports per module (median is reported)")
+    parser.add_argument("--top", type=int, default=3, help="Heaviest imports listed per module")
+    parser.add_argument("--budget", default=str(BUDGET_FILE), help="Budget file (JSON, ms per module)")
+    parser.add_argument("--update", action="store_true", help="Write the budget from this run")
+    args = parser.parse_args()
+
+    budget_path = Path(args.budget)
+    budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+
+    results, failed = {}, []
+    print("| Module | Import (ms, median) | Budget (ms) | Heaviest imports (ms) |")
+    print("|--------|---------------------|-------------|-----------------------|")
+    for module in args.modules:
+        try:
+            runs = [measure(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"| {module} | failed | {budget.get(module, '-')} | {str(e).splitlines()[-1]} |")
+            failed.append(module)
+            continue
+        ms = statistics.median(total for total, _ in runs)
+        children = runs[len(runs) // 2][1][:args.top]
+        results[module] = ms
+        limit = budget.get(module)
+        status = "" if limit is None or ms <= limit else " ❌"
+        heaviest = ", ".join(f"{name} {us / 1000:.0f}" for name, us in children)
+        print(f"| {module} | {ms:.0f}{status} | {limit if limit is not None else '-'} | {heaviest} |")
+
+    if args.update:
+        budget.update({module: max(BUDGET_MIN_MS, round(ms * BUDGET_MARGIN)) for module, ms in results.items()})
+        budget_path.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"\nBudget written to {budget_path}")
+        return
+
+    over = [module for module, ms in results.items() if module in budget and ms > budget[module]]
+    if over:
+        print(f"\nOver budget: {', '.join(over)}")
+    if failed:
+        print(f"\nImport failed: {', '.join(failed)}")
+    if over or failed:
+        sys.exit(1)
+    print("\nAll modules within budget" if budget else "\nNo budget file: run with --update to create one")
+
+
+if __name__ == "__main__":
+    main()
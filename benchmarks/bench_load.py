@@ -0,0 +1,153 @@
+"""
+Benchmark: model load time and peak memory, before and after zero-copy loading.
+
+Variants, each loading the same weights:
+- copy: the previous loader (`torch.load` into RAM, then `load_state_dict`
+  copies into the modules), timed on the components it loaded;
+- pt: `from_local` on the original `ve.pt`/`s3gen.pt` (mmap + assign);
+- safetensors: `from_local` on their safetensors conversion
+  (see `chatterbox.checkpoints`).
+
+The checkpoint folders are built from the same files (symlinks). Each load
+runs in a fresh process, so peak RSS is per load; every variant is loaded
+`--runs` times and the median time is reported (the first run of each also
+pays for a cold page cache).
+
+Usage (from the project root):
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --ckpt-dir /path/to/checkpoint --runs 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_load(ckpt_dir, out_file):
+    """Load the model from `ckpt_dir` and write load time and RSS to `out_file`."""
+    import torch  # noqa: F401  (imported before timing: only the load is measured)
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    model = ChatterboxMultilingualTTS.from_local(ckpt_dir, device="cpu")
+    Path(out_file).write_text(json.dumps({
+        'load_seconds': time.perf_counter() - start,
+        'rss_before_mb': rss_before,
+        'peak_rss_mb': peak_rss_mb(),
+        'components': model.load_timings,
+    }))
+
+
+def run_copy_load(ckpt_dir, out_file):
+    """The previous loader: every state dict read into RAM, then copied into the modules."""
+    import torch
+    from safetensors.torch import load_file
+    from chatterbox.models.s3gen import S3Gen
+    from chatterbox.models.t3 import T3
+    from chatterbox.models.t3.modules.t3_config import T3Config
+    from chatterbox.models.tokenizers import MTLTokenizer
+    from chatterbox.models.voice_encoder import VoiceEncoder
+
+    ckpt_dir = Path(ckpt_dir)
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    ve = VoiceEncoder()
+    ve.load_state_dict(torch.load(ckpt_dir / "ve.pt", map_location="cpu", weights_only=True))
+    t3 = T3(T3Config.multilingual())
+    t3.load_state_dict(load_file(ckpt_dir / "t3_mtl23ls_v2.safetensors"))
+    s3gen = S3Gen()
+    s3gen.load_state_dict(torch.load(ckpt_dir / "s3gen.pt", map_location="cpu", weights_only=True))
+    MTLTokenizer(str(ckpt_dir / "grapheme_mtl_merged_expanded_v1.json"))
+    Path(out_file).write_text(json.dumps({
+        'load_seconds': time.perf_counter() - start,
+        'rss_before_mb': rss_before,
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def link_checkpoint(src_dir: Path, dst_dir: Path, skip=()):
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    for fpath in src_dir.iterdir():
+        if fpath.name not in skip:
+            os.symlink(fpath.resolve(), dst_dir / fpath.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load time and peak RSS: .pt vs safetensors")
+    parser.add_argument("--ckpt-dir", help="Checkpoint directory (default: download from the Hub)")
+    parser.add_argument("--runs", type=int, default=3, help="Loads per variant")
+    # Internal: run a single load in this process
+    parser.add_argument("--load", help=argparse.SUPPRESS)
+    parser.add_argument("--copy", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        (run_copy_load if args.copy else run_load)(args.load, args.out)
+        return
+
+    from chatterbox.checkpoints import PT_CHECKPOINTS, convert_checkpoints
+
+    if args.ckpt_dir:
+        ckpt_dir = Path(args.ckpt_dir)
+    else:
+        from huggingface_hub import snapshot_download
+        from chatterbox.mtl_tts import CHECKPOINT_FILES, REPO_ID
+        ckpt_dir = Path(snapshot_download(repo_id=REPO_ID, allow_patterns=CHECKPOINT_FILES))
+
+    converted_names = [Path(name).with_suffix(".safetensors").name for name in PT_CHECKPOINTS]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        link_checkpoint(ckpt_dir, tmp / "pt", skip=converted_names)
+        link_checkpoint(ckpt_dir, tmp / "safetensors", skip=converted_names)
+        print("Converting checkpoints to safetensors...")
+        convert_checkpoints(ckpt_dir, out_dir=tmp / "safetensors")
+
+        results = {}
+        for variant, folder in (("copy", "pt"), ("pt", "pt"), ("safetensors", "safetensors")):
+            runs = []
+            for i in range(args.runs):
+                out_file = tmp / f"{variant}_{i}.json"
+                cmd = [sys.executable, "-m", "benchmarks.bench_load", "--load", str(tmp / folder), "--out", str(out_file)]
+                if variant == "copy":
+                    cmd.append("--copy")
+                subprocess.run(cmd, check=True)
+                runs.append(json.loads(out_file.read_text()))
+            results[variant] = runs
+
+    print(f"\nRuns per variant: {args.runs}\n")
+    print("| Loader | Load time (s, median) | Peak RSS (MB) | RSS before load (MB) |")
+    print("|--------|-----------------------|---------------|----------------------|")
+    for variant, runs in results.items():
+        print(f"| {variant} | {statistics.median(r['load_seconds'] for r in runs):.2f} | "
+              f"{max(r['peak_rss_mb'] for r in runs):.0f} | {runs[0]['rss_before_mb']:.0f} |")
+
+    before = results["copy"]
+    for variant in ("pt", "safetensors"):
+        after = results[variant]
+        speedup = statistics.median(r['load_seconds'] for r in before) / statistics.median(r['load_seconds'] for r in after)
+        saved = max(r['peak_rss_mb'] for r in before) - max(r['peak_rss_mb'] for r in after)
+        print(f"\n{variant} vs copy: {speedup:.2f}x faster load, {saved:.0f} MB lower peak RSS")
+
+    # from_local loads the components concurrently: the total is close to the slowest one
+    print("\nPer component (s, median, components loaded concurrently):")
+    for variant in ("pt", "safetensors"):
+        names = results[variant][0]['components']
+        medians = {name: statistics.median(r['components'][name] for r in results[variant]) for name in names}
+        print(f"  {variant}: " + ", ".join(f"{name} {seconds:.2f}" for name, seconds in medians.items()))
+
+
+if __name__ == "__main__":
+    main()
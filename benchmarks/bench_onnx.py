@@ -0,0 +1,96 @@
+"""
+Benchmark: PyTorch vs ONNX Runtime backend on the same CPU.
+
+Loads the model once per backend (the first ONNX load also exports the graphs)
+and synthesizes the same chunks with the same seed on both. For each backend
+it prints the T3 decode time and speed (speech tokens per second), the S3Gen
+time and the overall real-time factor. With CFG, the torch backend decodes
+through `T3.inference` (with its alignment analyzer), the ONNX backend through
+the batched decode loop.
+
+Usage (from the project root):
+    python -m benchmarks.bench_onnx --chunks 4
+"""
+import argparse
+import time
+
+import torch
+
+from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+from utils.audio_generator import build_generation_params
+from utils.text_splitter import split_text_smart
+from utils.text_utils import read_text_from_file
+import config
+
+
+SAMPLE_TEXT = (
+    "Questa è una prova del motore di esecuzione della sintesi vocale. "
+    "Lo stesso testo viene generato prima con PyTorch e poi con ONNX Runtime. "
+    "Il confronto misura la velocità della decodifica dei token e del vocoder. "
+    "Entrambi i motori girano sullo stesso processore con gli stessi parametri. "
+)
+
+
+def run_backend(backend, chunks, args):
+    start = time.perf_counter()
+    model = ChatterboxMultilingualTTS.from_pretrained(
+        device="cpu", backend=backend, onnx_dir=config.ONNX_DIR, onnx_threads=args.threads
+    )
+    load_seconds = time.perf_counter() - start
+    params = build_generation_params(quality=args.quality)
+
+    # Warm up kernels and allocators so the first chunk is not penalized
+    model.synthesize(chunks[0], model.conds, params)
+
+    torch.manual_seed(args.seed)
+    t3_seconds = vocode_seconds = audio_seconds = 0.0
+    n_tokens = 0
+    for chunk in chunks:
+        start = time.perf_counter()
+        speech_tokens = model.generate_tokens(chunk, model.conds, params)
+        t3_seconds += time.perf_counter() - start
+        n_tokens += speech_tokens.numel()
+
+        start = time.perf_counter()
+        wav = model.vocode(speech_tokens, model.conds, params, allow_truncated=True)
+        vocode_seconds += time.perf_counter() - start
+        audio_seconds += wav.shape[-1] / model.sr
+
+    return {
+        'load': load_seconds,
+        't3': t3_seconds,
+        'tokens_per_second': n_tokens / t3_seconds,
+        'vocode': vocode_seconds,
+        'rtf': (t3_seconds + vocode_seconds) / audio_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyTorch vs ONNX Runtime backend")
+    parser.add_argument("--text", help="Text file to synthesize (default: built-in sample)")
+    parser.add_argument("--chunks", type=int, default=4, help="Number of chunks to synthesize")
+    parser.add_argument("--max-chars", type=int, default=120, help="Maximum characters per chunk")
+    parser.add_argument("--quality", default="final", help="Quality tier (see QUALITY_TIERS)")
+    parser.add_argument("--threads", type=int, help="ONNX Runtime intra-op threads (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = read_text_from_file(args.text) if args.text else SAMPLE_TEXT * 2
+    chunks = split_text_smart(text, max_chars=args.max_chars)[:args.chunks]
+
+    results = {backend: run_backend(backend, chunks, args) for backend in ("torch", "onnx")}
+
+    print(f"\nThreads: {torch.get_num_threads()}, chunks: {len(chunks)}, quality: {args.quality}\n")
+    print("| Backend | Load (s) | T3 (s) | Tokens/s | S3Gen (s) | RTF |")
+    print("|---------|----------|--------|----------|-----------|-----|")
+    for backend, r in results.items():
+        print(f"| {backend} | {r['load']:.1f} | {r['t3']:.2f} | {r['tokens_per_second']:.1f} | "
+              f"{r['vocode']:.2f} | {r['rtf']:.2f} |")
+
+    torch_r, onnx_r = results["torch"], results["onnx"]
+    print(f"\nT3 speedup: {onnx_r['tokens_per_second'] / torch_r['tokens_per_second']:.2f}x, "
+          f"S3Gen speedup: {torch_r['vocode'] / onnx_r['vocode']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: real-time factor of each quality tier (draft / standard / final).
+
+Synthesizes the same chunks once per tier and prints a Markdown table with the
+wall time, the audio produced and the real-time factor (wall time / audio
+duration: below 1 is faster than real time). The table is headed by the
+hardware it was measured on (CPU model or GPU name, threads), so it can be
+pasted into the README as it is.
+
+Usage (from the project root):
+    python -m benchmarks.bench_quality_tiers --chunks 4
+"""
+import argparse
+import platform
+import time
+
+import torch
+
+from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+from utils.audio_generator import (
+    QUALITY_TIERS,
+    build_generation_params,
+    prepare_voice_conditionals,
+    synthesize_with_resplit
+)
+from utils.audio_utils import get_combined_reference
+from utils.text_splitter import split_text_smart
+from utils.text_utils import read_text_from_file
+import config
+
+
+SAMPLE_TEXT = (
+    "Questa è una prova dei livelli di qualità della sintesi vocale. "
+    "La bozza serve a rileggere velocemente un testo mentre lo si scrive. "
+    "Il livello finale usa tutta la potenza del modello per il risultato definitivo. "
+    "Confrontando i tempi si sceglie il livello giusto per ogni fase del lavoro. "
+)
+
+
+def hardware_name(device: str) -> str:
+    """GPU name for CUDA devices, else the CPU model (from /proc/cpuinfo where available)."""
+    if device.startswith("cuda") and torch.cuda.is_available():
+        return torch.cuda.get_device_name(torch.device(device))
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time factor of each quality tier")
+    parser.add_argument("--text", help="Text file to synthesize (default: built-in sample)")
+    parser.add_argument("--chunks", type=int, default=4, help="Number of chunks to synthesize per tier")
+    parser.add_argument("--max-chars", type=int, default=120, help="Maximum characters per chunk")
+    parser.add_argument("--tiers", nargs="+", default=list(QUALITY_TIERS), choices=list(QUALITY_TIERS))
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = read_text_from_file(args.text) if args.text else SAMPLE_TEXT * 2
+    chunks = split_text_smart(text, max_chars=args.max_chars)[:args.chunks]
+
+    model = ChatterboxMultilingualTTS.from_pretrained(device=args.device)
+    voice_folder = config.VOICES_DIR / config.SELECTED_VOICE
+    audio_prompt_path = None
+    if config.REFERENCE_MODE == "concat":
+        audio_prompt_path = get_combined_reference(
+            audio_folder=voice_folder,
+            output_path=str(config.OUTPUT_DIR / f"{config.SELECTED_VOICE}_{config.COMBINED_AUDIO_NAME}"),
+            target_sr=config.SAMPLE_RATE
+        )
+    conds = prepare_voice_conditionals(model, audio_prompt_path, voice_folder=voice_folder)
+
+    # Warm up kernels and allocator so the first tier is not penalized
+    model.synthesize(chunks[0], conds, build_generation_params())
+
+    print(f"\nHardware: {hardware_name(args.device)} ({args.device}, {torch.get_num_threads()} threads), "
+          f"chunks: {len(chunks)}\n")
+    print("| Tier | CFG | S3Gen steps | Time (s) | Audio (s) | RTF |")
+    print("|------|-----|-------------|----------|-----------|-----|")
+
+    for tier in args.tiers:
+        params = build_generation_params(quality=tier)
+        torch.manual_seed(args.seed)
+
+        start = time.perf_counter()
+        audio_seconds = 0.0
+        for chunk in chunks:
+            wav = synthesize_with_resplit(model, chunk, conds, params)
+            audio_seconds += wav.shape[-1] / model.sr
+        elapsed = time.perf_counter() - start
+
+        steps = params.flow_steps or "default"
+        cfg = "off" if params.cfg_weight <= 0 else params.cfg_weight
+        print(f"| {tier} | {cfg} | {steps} | {elapsed:.2f} | {audio_seconds:.1f} | "
+              f"{elapsed / audio_seconds:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
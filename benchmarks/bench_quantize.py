@@ -0,0 +1,153 @@
+"""
+Benchmark: reduced-precision variants (int8 dynamic quantization, bfloat16) vs fp32 on CPU.
+
+Each variant runs in its own process, so peak RSS is measured per model. All
+synthesize the same sentences with the same seed; the script then reports
+load time, synthesis latency, real-time factor, peak RSS, and how close each
+variant's audio is to the fp32 audio: cosine similarity of voice-encoder speaker
+embeddings (1.0 = same voice) and the ratio of durations. Sampling makes the
+runs diverge token by token, so waveforms are not compared sample by sample.
+
+Usage (from the project root):
+    python -m benchmarks.bench_quantize
+    python -m benchmarks.bench_quantize --variants int8 bf16 --quantize-s3gen
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import torch
+
+
+# Load options of each variant (fp32 is the reference)
+VARIANTS = {
+    "fp32": {},
+    "int8": {"quantize": "int8"},
+    "bf16": {"dtype": "bfloat16"},
+}
+
+SENTENCES = [
+    "Buongiorno, questa è una prova della sintesi vocale quantizzata.",
+    "Il modello usa pesi a otto bit per i layer lineari del trasformatore.",
+    "Confrontiamo velocità, memoria e qualità con la versione originale.",
+]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    # Resident pages right now (Linux): loading converts from fp32, so the peak hides the savings
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 ** 2
+
+
+def run_variant(args):
+    """Load one variant, synthesize every sentence and write metrics + audio to --out."""
+    import torchaudio as ta
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS, GenerationParams
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    options = dict(VARIANTS[args.variant])
+    if "quantize" in options:
+        options["quantize_s3gen"] = args.quantize_s3gen
+
+    start = time.perf_counter()
+    model = ChatterboxMultilingualTTS.from_pretrained(device="cpu", **options)
+    load_seconds = time.perf_counter() - start
+    rss_after_load = current_rss_mb()
+
+    params = GenerationParams(language_id=args.language)
+    model.synthesize(SENTENCES[0], model.conds, params)  # warm-up
+
+    torch.manual_seed(args.seed)
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    for i, sentence in enumerate(SENTENCES):
+        wav = model.synthesize(sentence, model.conds, params)
+        audio_seconds += wav.shape[-1] / model.sr
+        ta.save(str(out_dir / f"{i:02d}.wav"), wav, model.sr)
+    synth_seconds = time.perf_counter() - start
+
+    metrics = {
+        'load_seconds': load_seconds,
+        'synth_seconds': synth_seconds,
+        'audio_seconds': audio_seconds,
+        'rss_after_load_mb': rss_after_load,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+    if args.reference:
+        # Compare against the other variant's audio with this model's voice encoder
+        similarities, duration_ratios = [], []
+        for i in range(len(SENTENCES)):
+            ours, theirs = out_dir / f"{i:02d}.wav", Path(args.reference) / f"{i:02d}.wav"
+            a, b = model.embed_clip(ours), model.embed_clip(theirs)
+            similarities.append(torch.nn.functional.cosine_similarity(a, b).item())
+            duration_ratios.append(ta.info(str(ours)).num_frames / ta.info(str(theirs)).num_frames)
+        metrics['speaker_similarity'] = sum(similarities) / len(similarities)
+        metrics['duration_ratio'] = sum(duration_ratios) / len(duration_ratios)
+
+    (out_dir / "metrics.json").write_text(json.dumps(metrics))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reduced-precision variants vs fp32")
+    parser.add_argument("--variants", nargs="+", default=["int8", "bf16"],
+                        choices=[v for v in VARIANTS if v != "fp32"])
+    parser.add_argument("--quantize-s3gen", action="store_true", help="Also quantize S3Gen's flow model (int8)")
+    parser.add_argument("--language", default="it")
+    parser.add_argument("--seed", type=int, default=0)
+    # Internal: run a single variant in this process
+    parser.add_argument("--variant", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--reference", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        runs = [("fp32", None)] + [(variant, Path(tmp) / "fp32") for variant in args.variants]
+        for variant, reference in runs:
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_quantize",
+                "--variant", variant, "--out", str(Path(tmp) / variant),
+                "--language", args.language, "--seed", str(args.seed),
+            ]
+            if args.quantize_s3gen:
+                cmd.append("--quantize-s3gen")
+            if reference:
+                cmd += ["--reference", str(reference)]
+            print(f"Running {variant}...")
+            subprocess.run(cmd, check=True)
+            results[variant] = json.loads((Path(tmp) / variant / "metrics.json").read_text())
+
+    print(f"\nThreads: {torch.get_num_threads()}, sentences: {len(SENTENCES)}\n")
+    print("| Variant | Load (s) | Synthesis (s) | RTF | RSS after load (MB) | Peak RSS (MB) |")
+    print("|---------|----------|---------------|-----|---------------------|---------------|")
+    for variant, m in results.items():
+        print(f"| {variant} | {m['load_seconds']:.1f} | {m['synth_seconds']:.2f} | "
+              f"{m['synth_seconds'] / m['audio_seconds']:.2f} | {m['rss_after_load_mb']:.0f} | "
+              f"{m['peak_rss_mb']:.0f} |")
+
+    fp32 = results["fp32"]
+    for variant in args.variants:
+        m = results[variant]
+        print(f"\n{variant}: speedup {fp32['synth_seconds'] / m['synth_seconds']:.2f}x, "
+              f"speaker similarity vs fp32 {m['speaker_similarity']:.3f}, "
+              f"duration ratio {m['duration_ratio']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import random
 import numpy as np
 import torch
 import gradio as gr
-from chatterbox.tts import ChatterboxTTS
+from chatterbox.registry import get_model
 
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
@@ -17,13 +17,12 @@ def set_seed(seed: int):
 
 
 def load_model():
-    model = ChatterboxTTS.from_pretrained(DEVICE)
-    return model
+    # Shared by every session: loaded once per process, not per browser tab
+    return get_model("tts", DEVICE)
 
 
-def generate(model, text, audio_prompt_path, exaggeration, temperature, seed_num, cfgw, min_p, top_p, repetition_penalty):
-    if model is None:
-        model = ChatterboxTTS.from_pretrained(DEVICE)
+def generate(text, audio_prompt_path, exaggeration, temperature, seed_num, cfgw, min_p, top_p, repetition_penalty):
+    model = load_model()
 
     if seed_num != 0:
         set_seed(int(seed_num))
@@ -42,8 +41,6 @@ def generate(model, text, audio_prompt_path, exaggeration, temperature, seed_num
 
 
 with gr.Blocks() as demo:
-    model_state = gr.State(None)  # Loaded once per session/user
-
     with gr.Row():
         with gr.Column():
             text = gr.Textbox(
@@ -67,12 +64,9 @@ with gr.Blocks() as demo:
         with gr.Column():
             audio_output = gr.Audio(label="Output Audio")
 
-    demo.load(fn=load_model, inputs=[], outputs=model_state)
-
     run_btn.click(
         fn=generate,
         inputs=[
-            model_state,
             text,
             ref_wav,
             exaggeration,
@@ -87,6 +81,7 @@ with gr.Blocks() as demo:
     )
 
 if __name__ == "__main__":
+    load_model()
     demo.queue(
         max_size=50,
         default_concurrency_limit=1,
@@ -2,14 +2,12 @@ import random
 import numpy as np
 import torch
 from chatterbox.mtl_tts import ChatterboxMultilingualTTS, SUPPORTED_LANGUAGES
+from chatterbox.registry import get_model
 import gradio as gr
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"🚀 Running on device: {DEVICE}")
 
-# --- Global Model Initialization ---
-MODEL = None
-
 LANGUAGE_CONFIG = {
     "ar": {
         "audio": "https://storage.googleapis.com/chatterbox-demo-samples/mtl_prompts/ar_f/ar_prompts2.flac",
@@ -134,20 +132,12 @@ def get_supported_languages_display() -> str:
 
 
 def get_or_load_model():
-    """Loads the ChatterboxMultilingualTTS model if it hasn't been loaded already,
-    and ensures it's on the correct device."""
-    global MODEL
-    if MODEL is None:
-        print("Model not loaded, initializing...")
-        try:
-            MODEL = ChatterboxMultilingualTTS.from_pretrained(DEVICE)
-            if hasattr(MODEL, 'to') and str(MODEL.device) != DEVICE:
-                MODEL.to(DEVICE)
-            print(f"Model loaded successfully. Internal device: {getattr(MODEL, 'device', 'N/A')}")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            raise
-    return MODEL
+    """Returns the process-wide ChatterboxMultilingualTTS model, loading it on first use."""
+    try:
+        return get_model("multilingual", DEVICE)
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        raise
 
 # Attempt to load the model at startup.
 try:
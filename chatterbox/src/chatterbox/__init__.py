@@ -5,7 +5,23 @@ except ImportError:
 
 __version__ = version("chatterbox-tts")
 
+import importlib
 
-from .tts import ChatterboxTTS
-from .vc import ChatterboxVC
-from .mtl_tts import ChatterboxMultilingualTTS, SUPPORTED_LANGUAGES
\ No newline at end of file
+# The model classes pull in torch and the whole model stack: they are imported
+# on first access, so light submodules (e.g. `chatterbox.registry`) stay light
+_LAZY_ATTRIBUTES = {
+    "ChatterboxTTS": ".tts",
+    "ChatterboxVC": ".vc",
+    "ChatterboxMultilingualTTS": ".mtl_tts",
+    "SUPPORTED_LANGUAGES": ".mtl_tts",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,111 @@
+"""
+Dynamic batching of T3 decodes across concurrent callers.
+
+Each synthesis request decodes its speech tokens with a batch of two rows (the
+CFG pair), so concurrent users of one model leave most of the CPU's matrix
+throughput idle while they queue for it. `BatchScheduler` collects the requests
+that arrive within a short window (or until `max_batch_size`), decodes them in
+one batched pass with their own conditioning and sampling parameters, and hands
+each caller its own result through a `Future`.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+
+class BatchScheduler:
+    """
+    Background thread that groups pending decode requests into batches.
+
+    `decode_batch_fn(texts, conds_list, params_list)` must return one result
+    per request, in order (e.g. `ChatterboxMultilingualTTS.generate_tokens_batch`).
+    """
+
+    def __init__(self, decode_batch_fn: Callable, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.decode_batch_fn = decode_batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.requests = 0
+        self._thread = threading.Thread(target=self._run, name="t3-batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, conds, params=None) -> Future:
+        """Queue one request; the returned future resolves to its decode result."""
+        if self._closed:
+            raise RuntimeError("BatchScheduler is closed")
+        future = Future()
+        self._queue.put((text, conds, params, future))
+        return future
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Serve what we have, stop on the next round
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _decode(self, batch):
+        texts, conds, params, futures = zip(*batch)
+        results = self.decode_batch_fn(list(texts), list(conds), list(params))
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            batch = [request for request in batch if request[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                self._decode(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][3].set_exception(e)
+                else:
+                    # Retry one by one, so a bad request does not fail the others
+                    for request in batch:
+                        try:
+                            self._decode([request])
+                        except Exception as item_error:
+                            request[3].set_exception(item_error)
+
+            self.batches += 1
+            self.requests += len(batch)
+
+    def close(self):
+        """Finish the queued requests and stop the scheduler thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,311 @@
+"""
+Checkpoint files: zero-copy loading and conversion to safetensors.
+
+`torch.load` of a `.pt` checkpoint reads every tensor into RAM, and
+`load_state_dict` then copies each one into the module's own parameters, so a
+load peaks at about twice the model size. `load_weights` instead
+memory-maps the file (safetensors, or `torch.load(mmap=True)` for `.pt`) and
+assigns the mapped tensors to the module (`load_state_dict(assign=True)`):
+pages are read on first use and the module's initial parameters are freed.
+
+`convert_checkpoints` rewrites the `.pt` checkpoints of a checkpoint directory
+as `.safetensors` next to them (one-time) and records each conversion, with
+its sha256, in the directory's manifest; `weights_path` picks a recorded
+conversion, verified, over the `.pt` file.
+
+`prepare_checkpoint` resolves a local checkpoint directory without the Hub:
+files already there are checked against `manifest.json` (size, sha256), and
+only missing ones are downloaded. A file is hashed once; later starts compare
+its size and modification time with the manifest, so a complete directory
+loads with no network call and no hashing. Once the directory is verified the
+Hub is switched off for the process (`HF_HUB_OFFLINE`), so lookups made while
+the model loads (e.g. the tokenizer's Cangjie table) do not reach the network.
+
+Usage:
+    python -m chatterbox.checkpoints <ckpt_dir>
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import torch
+from safetensors.torch import load_file, save_file
+
+
+# State-dict checkpoints of the multilingual model that ship as .pt
+PT_CHECKPOINTS = ("ve.pt", "s3gen.pt")
+
+MANIFEST_FILE = "manifest.json"
+
+
+def weights_path(ckpt_dir, name: str) -> Path:
+    """
+    `name` in `ckpt_dir`, or its `.safetensors` conversion when there is one.
+
+    Only a conversion recorded in the manifest by `convert_checkpoints` (with
+    its sha256) is used, and it is verified first: a `.safetensors` file of
+    another origin with the same name (e.g. the English model's `ve.safetensors`
+    in a shared directory) is ignored.
+    """
+    ckpt_dir = Path(ckpt_dir)
+    fpath = ckpt_dir / name
+    converted = fpath.with_suffix(".safetensors")
+    entry = read_manifest(ckpt_dir)["files"].get(converted.name, {})
+    if converted.exists() and entry.get("converted_from") == name and entry.get("sha256"):
+        verify_checkpoint(ckpt_dir, [converted.name])
+        return converted
+    return fpath
+
+
+def read_state_dict(fpath) -> dict:
+    """Memory-mapped state dict of a `.safetensors` or `.pt` file (CPU tensors)."""
+    fpath = Path(fpath)
+    if fpath.suffix == ".safetensors":
+        return load_file(fpath, device="cpu")
+    return torch.load(fpath, map_location="cpu", weights_only=True, mmap=True)
+
+
+def load_weights(module: torch.nn.Module, fpath, strict: bool = True):
+    """
+    Load `fpath` into `module` without a second copy of the weights.
+
+    The file's tensors replace the module's parameters and buffers (assign),
+    so they keep the file's dtype; move or convert the module afterwards.
+    Returns the result of `load_state_dict` (missing/unexpected keys).
+    """
+    return module.load_state_dict(read_state_dict(fpath), strict=strict, assign=True)
+
+
+def convert_to_safetensors(src, dst=None) -> Path:
+    """Rewrite the state dict in `src` (.pt) as safetensors at `dst` (default: next to `src`)."""
+    src = Path(src)
+    dst = Path(dst) if dst is not None else src.with_suffix(".safetensors")
+    state = torch.load(src, map_location="cpu", weights_only=True)
+
+    # safetensors stores each tensor on its own: copy views and shared storages
+    tensors, seen = {}, set()
+    for key, value in state.items():
+        value = value.contiguous()
+        ptr = value.untyped_storage().data_ptr()
+        tensors[key] = value.clone() if ptr in seen else value
+        seen.add(ptr)
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp file in the target directory: concurrent conversions never share one
+    fd, tmp_path = tempfile.mkstemp(dir=dst.parent, prefix=f"{dst.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        save_file(tensors, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return dst
+
+
+def convert_checkpoints(ckpt_dir, names: Iterable[str] = PT_CHECKPOINTS, out_dir=None) -> List[Path]:
+    """
+    Convert the `.pt` checkpoints `names` of `ckpt_dir` to safetensors in `out_dir`.
+
+    Each conversion is recorded in the manifest of `out_dir` (size, sha256 and
+    the source file), which is what makes `weights_path` use it. A target
+    already recorded in the manifest (a conversion, or a download with that
+    name) is left alone; an unrecorded one is replaced.
+    """
+    ckpt_dir = Path(ckpt_dir)
+    out_dir = Path(out_dir) if out_dir is not None else ckpt_dir
+    manifest = read_manifest(out_dir)
+    converted = []
+    for name in names:
+        src = ckpt_dir / name
+        dst = out_dir / Path(name).with_suffix(".safetensors").name
+        if not src.exists() or (dst.exists() and dst.name in manifest["files"]):
+            continue
+        convert_to_safetensors(src, dst)
+        stat = dst.stat()
+        manifest["files"][dst.name] = {
+            "size": stat.st_size,
+            "sha256": _sha256(dst),
+            "mtime_ns": stat.st_mtime_ns,
+            "converted_from": name,
+        }
+        _write_manifest(out_dir, manifest)
+        converted.append(dst)
+    return converted
+
+
+def _sha256(fpath: Path) -> str:
+    digest = hashlib.sha256()
+    with open(fpath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(ckpt_dir) -> dict:
+    """The manifest of `ckpt_dir` ({"revision", "files": {name: {"size", "sha256", "mtime_ns"}}})."""
+    fpath = Path(ckpt_dir) / MANIFEST_FILE
+    if not fpath.exists():
+        return {"files": {}}
+    try:
+        manifest = json.loads(fpath.read_text())
+        manifest.setdefault("files", {})
+        return manifest
+    except (OSError, ValueError) as e:
+        print(f"Warning: discarding unreadable checkpoint manifest {fpath}: {e}")
+        return {"files": {}}
+
+
+def _write_manifest(ckpt_dir: Path, manifest: dict):
+    fpath = ckpt_dir / MANIFEST_FILE
+    fd, tmp_path = tempfile.mkstemp(dir=ckpt_dir, prefix=f"{MANIFEST_FILE}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        Path(tmp_path).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp_path, fpath)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def checkpoint_revision(ckpt_dir) -> str:
+    """Revision of the weights in `ckpt_dir`: the Hub commit recorded in its manifest, else the folder name."""
+    return read_manifest(ckpt_dir).get("revision") or Path(ckpt_dir).name
+
+
+def verify_checkpoint(ckpt_dir, files: Iterable[str]) -> dict:
+    """
+    Check `files` of `ckpt_dir` against its manifest and return the manifest.
+
+    Files with the size and modification time recorded in the manifest are
+    taken as verified. Others are hashed: a file without a recorded hash is
+    added to the manifest, one whose size or hash differs from the record
+    raises a RuntimeError.
+    """
+    ckpt_dir = Path(ckpt_dir)
+    manifest = read_manifest(ckpt_dir)
+    entries = manifest["files"]
+    changed = False
+    for name in files:
+        fpath = ckpt_dir / name
+        if not fpath.exists():
+            raise FileNotFoundError(f"Checkpoint file {fpath} not found")
+        stat = fpath.stat()
+        entry = entries.get(name, {})
+        if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            continue
+
+        sha256 = _sha256(fpath)
+        if entry.get("size", stat.st_size) != stat.st_size or entry.get("sha256", sha256) != sha256:
+            raise RuntimeError(
+                f"Checkpoint file {fpath} does not match {MANIFEST_FILE} (size or sha256 differs): "
+                f"replace the file, or delete its entry from the manifest to accept it"
+            )
+        entries[name] = {"size": stat.st_size, "sha256": sha256, "mtime_ns": stat.st_mtime_ns}
+        changed = True
+
+    if changed:
+        _write_manifest(ckpt_dir, manifest)
+    return manifest
+
+
+def download_checkpoint(
+    ckpt_dir,
+    repo_id: str,
+    files: Iterable[str],
+    token: Optional[str] = None,
+    complete: bool = True,
+):
+    """
+    Download `files` of `repo_id` into `ckpt_dir`.
+
+    Files are fetched at the revision recorded in the manifest, so a directory
+    completed over several runs holds a single revision; without a record, at
+    the latest one. Each file goes into the manifest as soon as it is in place,
+    with the Hub's size and sha256 (for LFS files), so `verify_checkpoint`
+    checks the downloads against them. The revision is recorded only after all
+    `files` are downloaded, and only when they are the whole checkpoint
+    (`complete`): files already there may come from any revision.
+    """
+    from huggingface_hub import HfApi, hf_hub_download
+
+    ckpt_dir = Path(ckpt_dir)
+    manifest = read_manifest(ckpt_dir)
+    revision = manifest.get("revision") or "main"
+    info = HfApi(token=token).model_info(repo_id, revision=revision, files_metadata=True)
+    siblings = {sibling.rfilename: sibling for sibling in info.siblings}
+
+    ckpt_dir.mkdir(parents=True, exist_ok=True)
+    for name in files:
+        print(f"Downloading {name} from {repo_id}...")
+        hf_hub_download(repo_id, name, revision=info.sha, local_dir=ckpt_dir, token=token)
+        sibling = siblings.get(name)
+        entry = {}
+        if sibling is not None and sibling.size is not None:
+            entry["size"] = sibling.size
+        if sibling is not None and sibling.lfs is not None:
+            entry["sha256"] = sibling.lfs.sha256
+        manifest["files"][name] = entry
+        _write_manifest(ckpt_dir, manifest)
+
+    if complete and "revision" not in manifest:
+        manifest["revision"] = info.sha
+        _write_manifest(ckpt_dir, manifest)
+
+
+def _hub_offline():
+    """Keep huggingface_hub off the network for the rest of the process."""
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    try:
+        from huggingface_hub import constants
+    except ImportError:
+        return
+    # huggingface_hub reads the variable once, when it is imported
+    constants.HF_HUB_OFFLINE = True
+
+
+def prepare_checkpoint(ckpt_dir, repo_id: str, files: Iterable[str], offline: bool = False, token: Optional[str] = None) -> Path:
+    """
+    Make `ckpt_dir` hold verified copies of `files` and return it.
+
+    Missing files are downloaded from `repo_id`, or raise FileNotFoundError
+    when `offline`; present ones are verified against the manifest (see
+    `verify_checkpoint`). A complete, unchanged directory needs no network,
+    and once it is verified the Hub is switched off (`HF_HUB_OFFLINE=1`) so
+    the model's own lookups resolve locally.
+    """
+    ckpt_dir = Path(ckpt_dir)
+    files = list(files)
+    missing = [name for name in files if not (ckpt_dir / name).exists()]
+    if missing:
+        if offline:
+            raise FileNotFoundError(
+                f"Checkpoint files missing from {ckpt_dir}: {', '.join(missing)} "
+                f"(offline: copy them from {repo_id} on the Hub, or allow the download)"
+            )
+        download_checkpoint(ckpt_dir, repo_id, missing, token=token, complete=len(missing) == len(files))
+    verify_checkpoint(ckpt_dir, files)
+    _hub_offline()
+    return ckpt_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert .pt checkpoints to safetensors")
+    parser.add_argument("ckpt_dir", help="Checkpoint directory (e.g. the Hub snapshot folder)")
+    parser.add_argument("--out", help="Output directory (default: next to the checkpoints)")
+    args = parser.parse_args()
+
+    converted = convert_checkpoints(args.ckpt_dir, out_dir=args.out)
+    if converted:
+        for fpath in converted:
+            print(f"Converted {fpath}")
+    else:
+        print("Nothing to convert")
+
+
+if __name__ == "__main__":
+    main()
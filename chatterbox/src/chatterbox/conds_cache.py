@@ -0,0 +1,253 @@
+"""
+Caches for prepared voice `Conditionals`.
+
+Preparing conditionals (decoding the reference, S3Gen embedding, S3 tokenization
+and the VoiceEncoder pass) is the most expensive part of switching voice, while the
+result only depends on the reference audio and on the model checkpoint. Entries are
+therefore keyed by a content hash of the reference files plus the model revision.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+import torch
+
+
+# Per-file digests, keyed by (path, size, mtime) so unchanged files are not re-read
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(fpath, chunk_size: int = 1 << 20) -> bytes:
+    """sha256 of a file's content, memoized on its size and modification time."""
+    fpath = Path(fpath)
+    st = fpath.stat()
+    memo_key = (str(fpath.resolve()), st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(fpath, "rb") as f:
+        while block := f.read(chunk_size):
+            h.update(block)
+    digest = h.digest()
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def hash_files(paths: Iterable, revision: str) -> str:
+    """
+    Build a cache key from the content of `paths` and the model `revision`.
+
+    Files are hashed in name order, so the key does not depend on the order in
+    which the caller listed them.
+    """
+    h = hashlib.sha256()
+    h.update(str(revision).encode("utf-8"))
+    for fpath in sorted(Path(p) for p in paths):
+        h.update(fpath.name.encode("utf-8"))
+        h.update(file_digest(fpath))
+    return h.hexdigest()
+
+
+def conds_nbytes(conds) -> int:
+    """Approximate resident size of a `Conditionals` (sum of its tensors)."""
+    tensors = list(conds.t3.__dict__.values()) + list(conds.gen.values())
+    return sum(t.nelement() * t.element_size() for t in tensors if torch.is_tensor(t))
+
+
+class ConditionalsStore:
+    """On-disk store of `Conditionals`, one `<key>.pt` file per entry."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pt"
+
+    def load(self, key: str, conds_cls, map_location="cpu"):
+        """Return the stored entry for `key`, or None if missing or unreadable."""
+        fpath = self.path_for(key)
+        if not fpath.exists():
+            return None
+        try:
+            return conds_cls.load(fpath, map_location=map_location)
+        except Exception as e:
+            print(f"Warning: discarding unreadable conditionals cache {fpath.name}: {e}")
+            fpath.unlink(missing_ok=True)
+            return None
+
+    def save(self, key: str, conds) -> Path:
+        """Write `conds` atomically, so concurrent readers never see a partial file."""
+        fpath = self.path_for(key)
+        # Unique temp file: threads and processes saving the same key never share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            conds.save(tmp_path)
+            os.replace(tmp_path, fpath)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return fpath
+
+    def clear(self) -> int:
+        """Delete all entries and leftover temp files. Returns the number of entries removed."""
+        removed = 0
+        for fpath in self.cache_dir.glob("*.pt"):
+            fpath.unlink(missing_ok=True)
+            removed += 1
+        for fpath in self.cache_dir.glob("*.tmp"):
+            fpath.unlink(missing_ok=True)
+        return removed
+
+
+class ClipEmbeddingCache:
+    """
+    Speaker embeddings of single reference clips, keyed by clip content.
+
+    Entries live in memory (about 1 KB each) and, when `cache_dir` is set, as one
+    `<key>.pt` per clip, so a voice folder only runs the voice encoder on clips it
+    has not seen before.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, fpath, revision: str) -> str:
+        h = hashlib.sha256()
+        h.update(str(revision).encode("utf-8"))
+        h.update(file_digest(fpath))
+        return h.hexdigest()
+
+    def _load(self, key: str):
+        fpath = self.cache_dir / f"{key}.pt"
+        if not fpath.exists():
+            return None
+        try:
+            return torch.load(fpath, map_location="cpu", weights_only=True)
+        except Exception as e:
+            print(f"Warning: discarding unreadable clip embedding {fpath.name}: {e}")
+            fpath.unlink(missing_ok=True)
+            return None
+
+    def _save(self, key: str, embed) -> None:
+        fpath = self.cache_dir / f"{key}.pt"
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            torch.save(embed, tmp_path)
+            os.replace(tmp_path, fpath)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def get_or_compute(self, fpath, revision: str, compute_fn):
+        """Embedding of the clip at `fpath`; `compute_fn(fpath)` runs only on a miss."""
+        key = self.key_for(fpath, revision)
+        with self._lock:
+            embed = self._entries.get(key)
+        if embed is None and self.cache_dir is not None:
+            embed = self._load(key)
+
+        if embed is None:
+            embed = compute_fn(fpath).detach().cpu()
+            if self.cache_dir is not None:
+                self._save(key, embed)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = embed
+        else:
+            with self._lock:
+                self.hits += 1
+                self._entries[key] = embed
+        return embed
+
+
+class ConditionalsLRU:
+    """
+    In-memory LRU of `Conditionals` bounded by a byte budget.
+
+    Counters (`hits`, `misses`, `evictions`, `resident_bytes`) are kept so the
+    budget can be sized from real traffic; see `stats()`.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (conds, nbytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, conds) -> None:
+        nbytes = conds_nbytes(conds)
+        with self._lock:
+            if key in self._entries:
+                self.resident_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                # Would evict everything and still not fit
+                return
+            self._entries[key] = (conds, nbytes)
+            self.resident_bytes += nbytes
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.resident_bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.resident_bytes -= nbytes
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,53 @@
+"""
+Per-call number of flow-matching steps for S3Gen.
+
+S3Gen's flow decoder integrates its ODE with a fixed number of Euler steps
+(`n_timesteps`, passed by `S3Gen.inference` itself), and that loop is most of
+the vocoder's cost. `install_flow_steps_override` wraps the decoder's
+`forward` so that, inside a `flow_steps(n)` block, the call uses `n` steps
+instead. The setting lives in a context variable, so concurrent requests on
+one model each keep their own value.
+"""
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+
+_flow_steps = contextvars.ContextVar("chatterbox_flow_steps", default=None)
+
+
+def install_flow_steps_override(s3gen) -> bool:
+    """
+    Let `flow_steps()` override `n_timesteps` of `s3gen`'s flow decoder.
+
+    Returns False (and changes nothing) if the decoder is not where S3Gen
+    keeps it (`s3gen.flow.decoder`).
+    """
+    decoder = getattr(getattr(s3gen, "flow", None), "decoder", None)
+    if decoder is None:
+        return False
+    if getattr(decoder, "_flow_steps_override", False):
+        return True
+
+    forward = decoder.forward
+
+    def forward_with_steps(*args, **kwargs):
+        steps = _flow_steps.get()
+        if steps is not None:
+            kwargs["n_timesteps"] = steps
+        return forward(*args, **kwargs)
+
+    # nn.Module.__call__ looks up `self.forward`, so the instance attribute wins
+    decoder.forward = forward_with_steps
+    decoder._flow_steps_override = True
+    return True
+
+
+@contextmanager
+def flow_steps(n_timesteps: Optional[int]):
+    """Run S3Gen calls in this block with `n_timesteps` flow steps (None: S3Gen's default)."""
+    token = _flow_steps.set(n_timesteps)
+    try:
+        yield
+    finally:
+        _flow_steps.reset(token)
@@ -0,0 +1,48 @@
+"""
+Concurrent loading of model components.
+
+The components of a model (voice encoder, T3, S3Gen, tokenizer, built-in
+voice) are independent until they are assembled, so `load_components` builds
+them on a thread pool: file reads, safetensors/pickle deserialization, module
+construction (weight initialization runs in torch kernels, which release the
+GIL) and tokenizer JSON parsing overlap. Each loader returns its component on
+CPU; the caller moves everything to the device once, at the end.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+
+def load_components(
+    loaders: Dict[str, Callable[[], object]],
+    max_workers: Optional[int] = None,
+) -> Tuple[Dict[str, object], Dict[str, float]]:
+    """
+    Run `loaders` concurrently.
+
+    Args:
+        loaders: Component name -> zero-argument function returning the component
+        max_workers: Pool size (default: one thread per loader)
+
+    Returns:
+        (components, timings): the components by name, and the seconds each
+        loader took (wall time inside its thread). An exception raised by a
+        loader is re-raised here, after the other loaders have finished.
+    """
+    timings = {}
+
+    def timed(name, loader):
+        start = time.perf_counter()
+        try:
+            return loader()
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(loaders), thread_name_prefix="load") as pool:
+        futures = {name: pool.submit(timed, name, loader) for name, loader in loaders.items()}
+    return {name: future.result() for name, future in futures.items()}, timings
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """One-line summary of load timings, e.g. "t3 3.1s, s3gen 2.4s, ..."."""
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
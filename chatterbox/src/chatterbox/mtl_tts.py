@@ -1,25 +1,48 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 import os
+import threading
+import time
 
-import librosa
 import torch
 import perth
 import torch.nn.functional as F
-from safetensors.torch import load_file as load_safetensors
 from huggingface_hub import snapshot_download
 
 from .models.t3 import T3
 from .models.t3.modules.t3_config import T3Config
-from .models.s3tokenizer import S3_SR, drop_invalid_tokens
+from .models.s3tokenizer import S3_SR, SPEECH_VOCAB_SIZE, drop_invalid_tokens
 from .models.s3gen import S3GEN_SR, S3Gen
 from .models.tokenizers import MTLTokenizer
 from .models.voice_encoder import VoiceEncoder
 from .models.t3.modules.cond_enc import T3Cond
+from .conds_cache import ClipEmbeddingCache, ConditionalsLRU, ConditionalsStore, hash_files
+from .reference import load_conditioning_reference, load_reference
+from .t3_batch import TORCH_RUNTIME, BatchItem, ConditioningPrefixCache, batched_inference, iter_batched_inference
+from .streaming import StreamMetrics, stream_vocode
+from .batching import BatchScheduler
+from .token_budget import FIXED_MAX_NEW_TOKENS, TokenBudget, TokenLimitReached, reached_stop
+from .flow_steps import flow_steps, install_flow_steps_override
+from .quantize import check_quantization, default_cache_dir, load_quantized
+from .onnx_backend import attach_onnx_backend, check_backend, default_onnx_dir
+from .precision import autocast, check_dtype, convert_s3gen, convert_t3, resolve_dtype
+from .checkpoints import checkpoint_revision, load_weights, prepare_checkpoint, read_state_dict, weights_path
+from .loading import load_components
 
 
 REPO_ID = "ResembleAI/chatterbox"
 
+# Files of the multilingual model in the Hub repo
+CHECKPOINT_FILES = [
+    "ve.pt",
+    "t3_mtl23ls_v2.safetensors",
+    "s3gen.pt",
+    "grapheme_mtl_merged_expanded_v1.json",
+    "conds.pt",
+    "Cangjie5_TC.json",
+]
+
 # Supported languages for the multilingual model
 SUPPORTED_LANGUAGES = {
   "ar": "Arabic",
@@ -129,9 +152,25 @@ class Conditionals:
         return cls(T3Cond(**kwargs['t3']), kwargs['gen'])
 
 
+@dataclass
+class GenerationParams:
+    """Per-request sampling parameters for `ChatterboxMultilingualTTS.synthesize`."""
+    language_id: str = None
+    exaggeration: float = 0.5
+    cfg_weight: float = 0.5
+    temperature: float = 0.8
+    repetition_penalty: float = 2.0
+    min_p: float = 0.05
+    top_p: float = 1.0
+    max_new_tokens: Optional[int] = None  # None: predicted from the text (TokenBudget)
+    flow_steps: Optional[int] = None      # S3Gen flow-matching steps (None: S3Gen's default)
+
+
 class ChatterboxMultilingualTTS:
     ENC_COND_LEN = 6 * S3_SR
     DEC_COND_LEN = 10 * S3GEN_SR
+    COND_WINDOW_SECONDS = max(DEC_COND_LEN / S3GEN_SR, ENC_COND_LEN / S3_SR)
+    CONDS_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes of prepared voices kept in memory
 
     def __init__(
         self,
@@ -141,6 +180,8 @@ class ChatterboxMultilingualTTS:
         tokenizer: MTLTokenizer,
         device: str,
         conds: Conditionals = None,
+        revision: str = "main",
+        dtype: str = "float32",
     ):
         self.sr = S3GEN_SR  # sample rate of synthesized audio
         self.t3 = t3
@@ -149,6 +190,18 @@ class ChatterboxMultilingualTTS:
         self.tokenizer = tokenizer
         self.device = device
         self.conds = conds
+        self.revision = revision  # part of every conditionals cache key
+        self.dtype = dtype  # of T3 and S3Gen's flow, see `chatterbox.precision`
+        self.load_timings = {}  # seconds per component, filled by `from_local`
+        self.conds_store = None
+        self.conds_lru = ConditionalsLRU(self.CONDS_MEMORY_BUDGET)
+        self.clip_embeddings = ClipEmbeddingCache()
+        self._t3_lock = threading.Lock()
+        self.prefix_cache = ConditioningPrefixCache()
+        self.t3_runtime = TORCH_RUNTIME  # runs T3's transformer (see `use_onnx`)
+        self.token_budget = TokenBudget(max_tokens=getattr(t3.hp, "max_speech_tokens", 2000))
+        install_flow_steps_override(s3gen)
+        self.batch_scheduler = None
         self.watermarker = perth.PerthImplicitWatermarker()
 
     @classmethod
@@ -157,57 +210,244 @@ class ChatterboxMultilingualTTS:
         return SUPPORTED_LANGUAGES.copy()
 
     @classmethod
-    def from_local(cls, ckpt_dir, device) -> 'ChatterboxMultilingualTTS':
+    def from_local(
+        cls,
+        ckpt_dir,
+        device,
+        quantize: Optional[str] = None,
+        quantize_s3gen: bool = False,
+        quantize_cache_dir=None,
+        backend: str = "torch",
+        onnx_dir=None,
+        onnx_threads: Optional[int] = None,
+        dtype: str = "float32",
+    ) -> 'ChatterboxMultilingualTTS':
+        """
+        Load the model from a checkpoint directory.
+
+        With `quantize="int8"` (CPU only) the linear layers of T3's transformer,
+        and of S3Gen's flow model when `quantize_s3gen`, are dynamically
+        quantized. The quantized weights are cached in `quantize_cache_dir`
+        (default: `chatterbox.quantize.default_cache_dir()`) per checkpoint
+        revision, so later loads skip the fp32 checkpoint.
+
+        With `backend="onnx"` (CPU only) generation runs through ONNX Runtime,
+        see `use_onnx`.
+
+        With `dtype="bfloat16"` T3 and S3Gen's flow model are converted once
+        here, about halving their memory; see `chatterbox.precision` for the
+        parts that stay in float32.
+
+        Weights are memory-mapped and assigned without a copy, from the
+        verified `.safetensors` conversion of `ve.pt`/`s3gen.pt` when the
+        manifest records one (see `chatterbox.checkpoints`).
+
+        The components load concurrently on CPU (see `chatterbox.loading`) and
+        are moved to `device` together at the end; the seconds spent on each
+        are kept in `model.load_timings`.
+        """
         ckpt_dir = Path(ckpt_dir)
+        check_quantization(quantize, device)
+        check_backend(backend, device, quantize)
+        check_dtype(dtype, device, quantize, backend)
+        # Hub snapshots live in a folder named after the commit hash; local
+        # checkpoint directories record it in their manifest
+        revision = checkpoint_revision(ckpt_dir)
+        cache_dir = quantize_cache_dir or default_cache_dir()
+        start = time.perf_counter()
+
+        def build_ve():
+            ve = VoiceEncoder()
+            load_weights(ve, weights_path(ckpt_dir, "ve.pt"))
+            return ve
+
+        def load_t3(t3):
+            t3_state = read_state_dict(ckpt_dir / "t3_mtl23ls_v2.safetensors")
+            if "model" in t3_state.keys():
+                t3_state = t3_state["model"][0]
+            t3.load_state_dict(t3_state, assign=True)
+
+        def build_t3():
+            if quantize:
+                t3 = load_quantized(
+                    "t3_mtl",
+                    lambda: T3(T3Config.multilingual()),
+                    load_t3,
+                    cache_dir,
+                    revision,
+                    targets=("tfmr",),
+                )
+            else:
+                t3 = T3(T3Config.multilingual())
+                load_t3(t3)
+            return convert_t3(t3, dtype)
+
+        def load_s3gen(s3gen):
+            load_weights(s3gen, weights_path(ckpt_dir, "s3gen.pt"))
+
+        def build_s3gen():
+            if quantize and quantize_s3gen:
+                s3gen = load_quantized("s3gen", S3Gen, load_s3gen, cache_dir, revision, targets=("flow",))
+            else:
+                s3gen = S3Gen()
+                load_s3gen(s3gen)
+            return convert_s3gen(s3gen, dtype)
+
+        def build_conds():
+            if (builtin_voice := ckpt_dir / "conds.pt").exists():
+                return Conditionals.load(builtin_voice)
+            return None
+
+        components, timings = load_components({
+            "ve": build_ve,
+            "t3": build_t3,
+            "s3gen": build_s3gen,
+            "tokenizer": lambda: MTLTokenizer(str(ckpt_dir / "grapheme_mtl_merged_expanded_v1.json")),
+            "conds": build_conds,
+        })
+
+        placement_start = time.perf_counter()
+        ve = components["ve"].to(device).eval()
+        t3 = components["t3"].to(device).eval()
+        s3gen = components["s3gen"].to(device).eval()
+        conds = components["conds"].to(device) if components["conds"] is not None else None
+        timings["to_device"] = time.perf_counter() - placement_start
+
+        model = cls(t3, s3gen, ve, components["tokenizer"], device, conds=conds, revision=revision, dtype=dtype)
+        if backend == "onnx":
+            onnx_start = time.perf_counter()
+            model.use_onnx(onnx_dir, threads=onnx_threads)
+            timings["onnx"] = time.perf_counter() - onnx_start
+        timings["total"] = time.perf_counter() - start
+        model.load_timings = timings
+        return model
 
-        ve = VoiceEncoder()
-        ve.load_state_dict(
-            torch.load(ckpt_dir / "ve.pt", map_location=device, weights_only=True)
-        )
-        ve.to(device).eval()
-
-        t3 = T3(T3Config.multilingual())
-        t3_state = load_safetensors(ckpt_dir / "t3_mtl23ls_v2.safetensors")
-        if "model" in t3_state.keys():
-            t3_state = t3_state["model"][0]
-        t3.load_state_dict(t3_state)
-        t3.to(device).eval()
-
-        s3gen = S3Gen()
-        s3gen.load_state_dict(
-            torch.load(ckpt_dir / "s3gen.pt", map_location=device, weights_only=True)
+    @classmethod
+    def from_pretrained(
+        cls,
+        device: torch.device,
+        quantize: Optional[str] = None,
+        quantize_s3gen: bool = False,
+        quantize_cache_dir=None,
+        backend: str = "torch",
+        onnx_dir=None,
+        onnx_threads: Optional[int] = None,
+        dtype: str = "float32",
+        ckpt_dir=None,
+        offline: bool = False,
+    ) -> 'ChatterboxMultilingualTTS':
+        """
+        Load the model from the Hub, or from the local checkpoint directory `ckpt_dir`.
+
+        Without `ckpt_dir` the Hub snapshot is resolved on every call (a
+        metadata request even when cached). With it, files already in
+        `ckpt_dir` are verified against its manifest and used as they are;
+        missing ones are downloaded once, or raise when `offline` (see
+        `chatterbox.checkpoints.prepare_checkpoint`). Other arguments are
+        passed to `from_local`.
+        """
+        if ckpt_dir is not None:
+            ckpt_dir = prepare_checkpoint(
+                ckpt_dir, REPO_ID, CHECKPOINT_FILES, offline=offline, token=os.getenv("HF_TOKEN")
+            )
+        else:
+            ckpt_dir = Path(
+                snapshot_download(
+                    repo_id=REPO_ID,
+                    repo_type="model",
+                    revision="main",
+                    allow_patterns=CHECKPOINT_FILES,
+                    token=os.getenv("HF_TOKEN"),
+                )
+            )
+        return cls.from_local(
+            ckpt_dir,
+            device,
+            quantize=quantize,
+            quantize_s3gen=quantize_s3gen,
+            quantize_cache_dir=quantize_cache_dir,
+            backend=backend,
+            onnx_dir=onnx_dir,
+            onnx_threads=onnx_threads,
+            dtype=dtype,
         )
-        s3gen.to(device).eval()
 
-        tokenizer = MTLTokenizer(
-            str(ckpt_dir / "grapheme_mtl_merged_expanded_v1.json")
+    @property
+    def backend(self) -> str:
+        """Runtime of T3's transformer: "torch" or "onnx"."""
+        return self.t3_runtime.name
+
+    def use_onnx(self, onnx_dir=None, threads: Optional[int] = None):
+        """
+        Run T3's transformer, S3Gen's flow estimator and the voice encoder with ONNX Runtime.
+
+        Graphs are loaded from a folder per checkpoint revision under
+        `onnx_dir` (default: `chatterbox.onnx_backend.default_onnx_dir()`),
+        and exported there on first use. `generate`, `synthesize` and the rest keep their
+        interface; T3 always decodes through the batched loop, which does not
+        attach the alignment analyzer of `T3.inference`.
+        """
+        check_backend("onnx", self.device)
+        check_dtype(self.dtype, self.device, backend="onnx")
+        onnx_dir = Path(onnx_dir or default_onnx_dir()) / self.revision
+        self.t3_runtime = attach_onnx_backend(self, onnx_dir, threads=threads)
+        # Prefixes computed by the torch transformer are not reused by the graph
+        self.prefix_cache.clear()
+
+    def enable_conds_cache(self, cache_dir):
+        """Persist prepared conditionals in `cache_dir` and reuse them across runs."""
+        self.conds_store = ConditionalsStore(cache_dir)
+        self.clip_embeddings = ClipEmbeddingCache(Path(cache_dir) / "clips")
+
+    def conds_cache_key(self, wav_fpaths, variant: str = "") -> str:
+        """
+        Cache key for conditionals built from `wav_fpaths` with this checkpoint.
+
+        `variant` separates entries built from the same files in different ways.
+        """
+        revision = f"{self.revision}:{variant}" if variant else self.revision
+        return hash_files(wav_fpaths, revision)
+
+    def embed_clip(self, wav_fpath) -> torch.Tensor:
+        """Voice-encoder embedding of a single clip, shape (1, E)."""
+        (ref_16k_wav,) = load_reference(wav_fpath, (S3_SR,))
+        return torch.from_numpy(self.ve.embeds_from_wavs([ref_16k_wav], sample_rate=S3_SR))
+
+    def voice_embedding(self, wav_fpaths) -> torch.Tensor:
+        """
+        Speaker embedding of a voice made of several clips, shape (1, E).
+
+        Each clip is embedded once and cached on its content; the clip embeddings
+        are mean-pooled and re-normalized to unit length.
+        """
+        embeds = torch.cat([
+            self.clip_embeddings.get_or_compute(fpath, self.revision, self.embed_clip)
+            for fpath in wav_fpaths
+        ])
+        return F.normalize(embeds.mean(dim=0, keepdim=True), dim=1)
+
+    def compute_conditionals(self, wav_fpath, exaggeration=0.5, speaker_emb=None) -> Conditionals:
+        ## Load reference wav: one decode, the conditioning window at 24 kHz, the whole clip at 16 kHz
+        s3gen_ref_wav, ref_16k_wav = load_conditioning_reference(
+            wav_fpath, S3GEN_SR, self.COND_WINDOW_SECONDS, S3_SR
         )
 
-        conds = None
-        if (builtin_voice := ckpt_dir / "conds.pt").exists():
-            conds = Conditionals.load(builtin_voice, map_location=device).to(device)
-
-        return cls(t3, s3gen, ve, tokenizer, device, conds=conds)
-
-    @classmethod
-    def from_pretrained(cls, device: torch.device) -> 'ChatterboxMultilingualTTS':
-        ckpt_dir = Path(
-            snapshot_download(
-                repo_id=REPO_ID,
-                repo_type="model",
-                revision="main", 
-                allow_patterns=["ve.pt", "t3_mtl23ls_v2.safetensors", "s3gen.pt", "grapheme_mtl_merged_expanded_v1.json", "conds.pt", "Cangjie5_TC.json"],
-                token=os.getenv("HF_TOKEN"),
-            )
+        return self.compute_conditionals_from_wavs(
+            s3gen_ref_wav, ref_16k_wav, exaggeration=exaggeration, speaker_emb=speaker_emb
         )
-        return cls.from_local(ckpt_dir, device)
-    
-    def prepare_conditionals(self, wav_fpath, exaggeration=0.5):
-        ## Load reference wav
-        s3gen_ref_wav, _sr = librosa.load(wav_fpath, sr=S3GEN_SR)
-
-        ref_16k_wav = librosa.resample(s3gen_ref_wav, orig_sr=S3GEN_SR, target_sr=S3_SR)
 
+    def compute_conditionals_from_wavs(
+        self, s3gen_ref_wav, ref_16k_wav, exaggeration=0.5, speaker_emb=None
+    ) -> Conditionals:
+        """
+        Build conditionals from reference samples already decoded at S3GEN_SR
+        (24 kHz) and S3_SR (16 kHz). Only the first `COND_WINDOW_SECONDS` of
+        either signal influence S3Gen and the speech prompt tokens; the voice
+        encoder embeds all of `ref_16k_wav`.
+
+        `speaker_emb` (e.g. from `voice_embedding`) replaces the voice-encoder
+        pass over `ref_16k_wav`.
+        """
         s3gen_ref_wav = s3gen_ref_wav[:self.DEC_COND_LEN]
         s3gen_ref_dict = self.s3gen.embed_ref(s3gen_ref_wav, S3GEN_SR, device=self.device)
 
@@ -219,82 +459,395 @@ class ChatterboxMultilingualTTS:
             t3_cond_prompt_tokens = torch.atleast_2d(t3_cond_prompt_tokens).to(self.device)
 
         # Voice-encoder speaker embedding
-        ve_embed = torch.from_numpy(self.ve.embeds_from_wavs([ref_16k_wav], sample_rate=S3_SR))
-        ve_embed = ve_embed.mean(axis=0, keepdim=True).to(self.device)
+        if speaker_emb is None:
+            speaker_emb = torch.from_numpy(self.ve.embeds_from_wavs([ref_16k_wav], sample_rate=S3_SR))
+            speaker_emb = speaker_emb.mean(axis=0, keepdim=True)
+        ve_embed = speaker_emb.to(self.device)
 
         t3_cond = T3Cond(
             speaker_emb=ve_embed,
             cond_prompt_speech_tokens=t3_cond_prompt_tokens,
             emotion_adv=exaggeration * torch.ones(1, 1, 1),
         ).to(device=self.device)
-        self.conds = Conditionals(t3_cond, s3gen_ref_dict)
+        return Conditionals(t3_cond, s3gen_ref_dict)
 
-    def generate(
-        self,
-        text,
-        language_id,
-        audio_prompt_path=None,
-        exaggeration=0.5,
-        cfg_weight=0.5,
-        temperature=0.8,
-        repetition_penalty=2.0,
-        min_p=0.05,
-        top_p=1.0,
-    ):
-        # Validate language_id
+    def with_exaggeration(self, conds: Conditionals, exaggeration) -> Conditionals:
+        """Return `conds` with its emotion level set to `exaggeration`."""
+        if float(exaggeration) == float(conds.t3.emotion_adv[0, 0, 0].item()):
+            return conds
+        _cond: T3Cond = conds.t3
+        t3_cond = T3Cond(
+            speaker_emb=_cond.speaker_emb,
+            cond_prompt_speech_tokens=_cond.cond_prompt_speech_tokens,
+            emotion_adv=exaggeration * torch.ones(1, 1, 1),
+        ).to(device=self.device)
+        return Conditionals(t3_cond, conds.gen)
+
+    def cached_conditionals(self, cache_key: str, compute_fn, exaggeration=0.5) -> Conditionals:
+        """
+        Return the conditionals cached under `cache_key`, calling `compute_fn()`
+        only on a miss.
+
+        Lookups go through the in-memory LRU first, then the conditionals store
+        when enabled; freshly computed entries are added to both.
+        """
+        conds = self.conds_lru.get(cache_key)
+        if conds is None and self.conds_store is not None:
+            conds = self.conds_store.load(cache_key, Conditionals, map_location=self.device)
+            if conds is not None:
+                conds = conds.to(self.device)
+        if conds is None:
+            conds = compute_fn()
+            if self.conds_store is not None:
+                self.conds_store.save(cache_key, conds)
+        if cache_key not in self.conds_lru:
+            self.conds_lru.put(cache_key, conds)
+        return self.with_exaggeration(conds, exaggeration)
+
+    def get_conditionals(self, wav_fpath, exaggeration=0.5, cache_key=None) -> Conditionals:
+        """
+        Return conditionals for `wav_fpath`, from the caches when possible.
+
+        `cache_key` lets callers key the entry on something other than the file
+        itself, e.g. the clips of a voice folder the reference was built from.
+        """
+        return self.cached_conditionals(
+            cache_key or self.conds_cache_key([wav_fpath]),
+            lambda: self.compute_conditionals(wav_fpath, exaggeration=exaggeration),
+            exaggeration=exaggeration,
+        )
+
+    def conds_cache_stats(self) -> dict:
+        """Hit/miss/eviction counters and resident bytes of the in-memory cache."""
+        return self.conds_lru.stats()
+
+    def prepare_conditionals(self, wav_fpath, exaggeration=0.5, cache_key=None):
+        self.conds = self.get_conditionals(wav_fpath, exaggeration=exaggeration, cache_key=cache_key)
+
+    def _check_language(self, language_id):
+        """Validate `language_id` and return it lower-cased (or None)."""
         if language_id and language_id.lower() not in SUPPORTED_LANGUAGES:
             supported_langs = ", ".join(SUPPORTED_LANGUAGES.keys())
             raise ValueError(
                 f"Unsupported language_id '{language_id}'. "
                 f"Supported languages: {supported_langs}"
             )
-        
-        if audio_prompt_path:
-            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
-        else:
-            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
-
-        # Update exaggeration if needed
-        if float(exaggeration) != float(self.conds.t3.emotion_adv[0, 0, 0].item()):
-            _cond: T3Cond = self.conds.t3
-            self.conds.t3 = T3Cond(
-                speaker_emb=_cond.speaker_emb,
-                cond_prompt_speech_tokens=_cond.cond_prompt_speech_tokens,
-                emotion_adv=exaggeration * torch.ones(1, 1, 1),
-            ).to(device=self.device)
-
-        # Norm and tokenize text
+        return language_id.lower() if language_id else None
+
+    def _t3_cond(self, conds: Conditionals, params: GenerationParams) -> T3Cond:
+        # Fresh T3Cond per call: T3 caches prompt embeddings on the object it is given
+        return T3Cond(
+            speaker_emb=conds.t3.speaker_emb,
+            cond_prompt_speech_tokens=conds.t3.cond_prompt_speech_tokens,
+            emotion_adv=params.exaggeration * torch.ones(1, 1, 1),
+        ).to(device=self.device, dtype=resolve_dtype(self.dtype))
+
+    def _text_tokens(self, text, language_id) -> torch.Tensor:
+        """Normalized, tokenized text wrapped in start/stop text tokens, shape (1, L)."""
         text = punc_norm(text)
-        text_tokens = self.tokenizer.text_to_tokens(text, language_id=language_id.lower() if language_id else None).to(self.device)
-        text_tokens = torch.cat([text_tokens, text_tokens], dim=0)  # Need two seqs for CFG
+        text_tokens = self.tokenizer.text_to_tokens(text, language_id=language_id).to(self.device)
 
         sot = self.t3.hp.start_text_token
         eot = self.t3.hp.stop_text_token
         text_tokens = F.pad(text_tokens, (1, 0), value=sot)
         text_tokens = F.pad(text_tokens, (0, 1), value=eot)
+        return text_tokens
 
-        with torch.inference_mode():
-            speech_tokens = self.t3.inference(
-                t3_cond=self.conds.t3,
-                text_tokens=text_tokens,
-                max_new_tokens=1000,  # TODO: use the value in config
-                temperature=temperature,
-                cfg_weight=cfg_weight,
-                repetition_penalty=repetition_penalty,
-                min_p=min_p,
-                top_p=top_p,
-            )
-            # Extract only the conditional batch.
-            speech_tokens = speech_tokens[0]
+    def max_new_tokens_for(self, text, params: GenerationParams) -> int:
+        """Speech-token budget of `text`: `params.max_new_tokens`, else the `TokenBudget` prediction."""
+        if params.max_new_tokens:
+            return params.max_new_tokens
+        return self.token_budget.predict(text, params.language_id)
+
+    def _observe_tokens(self, text, language_id, speech_tokens):
+        # Complete decodes teach the budget this language's speech rate
+        if reached_stop(speech_tokens, self.t3.hp.stop_speech_token):
+            self.token_budget.observe(language_id, len(text), speech_tokens.numel() - 1)
 
+    def vocode(
+        self,
+        speech_tokens,
+        conds: Conditionals,
+        params: GenerationParams = None,
+        allow_truncated: bool = False,
+    ) -> torch.Tensor:
+        """
+        Speech tokens -> watermarked waveform in the voice of `conds`, shape (1, N).
+
+        `params.flow_steps` sets the number of S3Gen flow-matching steps.
+        Raises `TokenLimitReached` if the decode was cut by its token budget,
+        unless `allow_truncated`: the caller should split the text instead.
+        """
+        if not allow_truncated and not reached_stop(speech_tokens, self.t3.hp.stop_speech_token):
+            raise TokenLimitReached(speech_tokens.numel())
+
+        flow_steps_ctx = flow_steps(params.flow_steps if params else None)
+        with torch.inference_mode(), flow_steps_ctx, autocast(self.device, self.dtype):
             # TODO: output becomes 1D
             speech_tokens = drop_invalid_tokens(speech_tokens)
             speech_tokens = speech_tokens.to(self.device)
 
             wav, _ = self.s3gen.inference(
                 speech_tokens=speech_tokens,
-                ref_dict=self.conds.gen,
+                ref_dict=conds.gen,
             )
             wav = wav.squeeze(0).detach().cpu().numpy()
             watermarked_wav = self.watermarker.apply_watermark(wav, sample_rate=self.sr)
         return torch.from_numpy(watermarked_wav).unsqueeze(0)
+
+    def generate_tokens(self, text, conds: Conditionals, params: GenerationParams = None) -> torch.Tensor:
+        """
+        Decode the speech tokens of `text` with `T3.inference` (1D tensor).
+
+        The sequence ends with the stop token unless the token budget
+        (`max_new_tokens_for`) was reached first. Without CFG (`cfg_weight`
+        0), or with the ONNX backend, the text goes through the batched decode
+        loop instead.
+        """
+        params = params or GenerationParams()
+        if params.cfg_weight <= 0 or self.backend != "torch":
+            # No CFG branch: decode one row instead of T3.inference's (cond, uncond) pair.
+            # T3.inference calls the torch transformer, so other backends always batch.
+            return self.generate_tokens_batch([text], [conds], [params])[0]
+        language_id = self._check_language(params.language_id)
+        max_new_tokens = self.max_new_tokens_for(text, params)
+
+        t3_cond = self._t3_cond(conds, params)
+
+        text_tokens = self._text_tokens(text, language_id)
+        text_tokens = torch.cat([text_tokens, text_tokens], dim=0)  # Need two seqs for CFG
+
+        with torch.inference_mode():
+            # T3.inference rebuilds its patched backend (and alignment hooks) on
+            # every call, so only the token decode is serialized
+            with self._t3_lock:
+                speech_tokens = self.t3.inference(
+                    t3_cond=t3_cond,
+                    text_tokens=text_tokens,
+                    max_new_tokens=max_new_tokens,
+                    temperature=params.temperature,
+                    cfg_weight=params.cfg_weight,
+                    repetition_penalty=params.repetition_penalty,
+                    min_p=params.min_p,
+                    top_p=params.top_p,
+                )
+        # Extract only the conditional batch.
+        speech_tokens = speech_tokens[0]
+        self._observe_tokens(text, language_id, speech_tokens)
+        return speech_tokens
+
+    def generate_tokens_batch(self, texts, conds, params=None) -> List[torch.Tensor]:
+        """
+        Decode the speech tokens of several texts in one batched T3 pass.
+
+        `conds` and `params` are either shared by all texts or lists with one
+        entry per text, so texts for different voices and settings can share a
+        batch. A single text with CFG goes through `generate_tokens` instead
+        (torch backend only).
+        """
+        conds_list = conds if isinstance(conds, (list, tuple)) else [conds] * len(texts)
+        params_list = params if isinstance(params, (list, tuple)) else [params] * len(texts)
+        single_with_cfg = len(texts) == 1 and (params_list[0] or GenerationParams()).cfg_weight > 0
+        if single_with_cfg and self.backend == "torch":
+            return [self.generate_tokens(texts[0], conds_list[0], params_list[0])]
+
+        items = []
+        for text, item_conds, item_params in zip(texts, conds_list, params_list):
+            item_params = item_params or GenerationParams()
+            language_id = self._check_language(item_params.language_id)
+            items.append(BatchItem(
+                t3_cond=self._t3_cond(item_conds, item_params),
+                text_tokens=self._text_tokens(text, language_id)[0],
+                params=item_params,
+                max_new_tokens=self.max_new_tokens_for(text, item_params),
+            ))
+
+        with torch.inference_mode():
+            with self._t3_lock:
+                token_seqs = batched_inference(
+                    self.t3,
+                    items,
+                    max_new_tokens=max(item.max_new_tokens for item in items),
+                    prefix_cache=self.prefix_cache,
+                    runtime=self.t3_runtime,
+                )
+        for text, item, speech_tokens in zip(texts, items, token_seqs):
+            self._observe_tokens(text, item.params.language_id, speech_tokens)
+        return token_seqs
+
+    def enable_dynamic_batching(self, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        """
+        Route the T3 decode of `synthesize` through a `BatchScheduler`, so
+        concurrent callers share batched passes. Vocoding stays on each
+        caller's thread.
+
+        Opt-in: batched passes run without `T3.inference`'s alignment analyzer
+        (the guard against hallucination, repetition and a late end of speech),
+        so even a single CFG request can decode differently once it is routed
+        through the scheduler.
+        """
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.close()
+        self.batch_scheduler = BatchScheduler(
+            self.generate_tokens_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+        )
+
+    def synthesize(
+        self,
+        text,
+        conds: Conditionals,
+        params: GenerationParams = None,
+        allow_truncated: bool = False,
+    ):
+        """
+        Synthesize `text` with explicitly passed conditionals.
+
+        Unlike `generate`, this never reads or writes `self.conds`, so several
+        requests for different voices can share one loaded model. Raises
+        `TokenLimitReached` if the text did not fit its token budget, unless
+        `allow_truncated` (the decoded part is vocoded instead).
+        """
+        if self.batch_scheduler is not None:
+            # Fail fast here rather than inside someone else's batch
+            self._check_language((params or GenerationParams()).language_id)
+            speech_tokens = self.batch_scheduler.submit(text, conds, params).result()
+        else:
+            speech_tokens = self.generate_tokens(text, conds, params)
+        try:
+            return self.vocode(speech_tokens, conds, params, allow_truncated=allow_truncated)
+        except TokenLimitReached as e:
+            e.text = text
+            raise
+
+    def synthesize_batch(self, texts, conds, params=None, return_exceptions: bool = False) -> List[torch.Tensor]:
+        """
+        Synthesize several texts with one batched T3 decode, then vocode each.
+
+        `conds` and `params` follow `generate_tokens_batch`. Returns one
+        waveform per text, in order. With `return_exceptions`, a text that
+        fails to vocode (e.g. `TokenLimitReached`) gets its exception in the
+        list instead of failing the whole batch.
+        """
+        conds_list = conds if isinstance(conds, (list, tuple)) else [conds] * len(texts)
+        params_list = params if isinstance(params, (list, tuple)) else [params] * len(texts)
+        token_seqs = self.generate_tokens_batch(texts, conds_list, params_list)
+        wavs = []
+        for text, speech_tokens, item_conds, item_params in zip(texts, token_seqs, conds_list, params_list):
+            try:
+                wavs.append(self.vocode(speech_tokens, item_conds, item_params))
+            except Exception as e:
+                if isinstance(e, TokenLimitReached):
+                    e.text = text
+                if not return_exceptions:
+                    raise
+                wavs.append(e)
+        return wavs
+
+    def generate_stream(
+        self,
+        text,
+        conds: Conditionals = None,
+        params: GenerationParams = None,
+        first_window_tokens: int = 10,
+        window_tokens: int = 25,
+        context_tokens: int = 10,
+    ) -> Iterator[Tuple[torch.Tensor, StreamMetrics]]:
+        """
+        Synthesize `text` as a stream of audio blocks.
+
+        Speech tokens are vocoded in windows while T3 is still decoding (see
+        `chatterbox.streaming`), so the first block arrives after about
+        `first_window_tokens` tokens instead of after the whole utterance.
+        Yields `(wav, metrics)`: `wav` is a watermarked (1, N) block at
+        `self.sr`, `metrics` the `StreamMetrics` of the stream so far
+        (time to first audio, real-time factor). Blocks already played cannot
+        be taken back, so a text that overruns its token budget ends early.
+
+        Each decode step holds the T3 lock, like `generate_tokens`, so a
+        stream interleaves with other requests on the same model instead of
+        decoding concurrently with them; vocoding a window does not hold it.
+        A stream that ends on its stop token updates the token budget.
+        """
+        conds = conds or self.conds
+        assert conds is not None, "Please `prepare_conditionals` first or pass `conds`"
+        params = params or GenerationParams()
+        metrics = StreamMetrics()
+
+        item = BatchItem(
+            t3_cond=self._t3_cond(conds, params),
+            text_tokens=self._text_tokens(text, self._check_language(params.language_id))[0],
+            params=params,
+            max_new_tokens=self.max_new_tokens_for(text, params),
+        )
+
+        def speech_tokens():
+            decode = iter_batched_inference(
+                self.t3,
+                [item],
+                max_new_tokens=item.max_new_tokens,
+                prefix_cache=self.prefix_cache,
+                runtime=self.t3_runtime,
+            )
+            emitted = []
+            while True:
+                with self._t3_lock:
+                    step_tokens = next(decode, None)
+                if step_tokens is None:
+                    break
+                token = step_tokens[0].item()
+                emitted.append(token)
+                if token < SPEECH_VOCAB_SIZE:
+                    yield token
+            self._observe_tokens(text, params.language_id, torch.tensor(emitted, dtype=torch.long))
+
+        def vocode_window(tokens):
+            with torch.inference_mode(), flow_steps(params.flow_steps), autocast(self.device, self.dtype):
+                wav, _ = self.s3gen.inference(
+                    speech_tokens=torch.tensor(tokens, dtype=torch.long, device=self.device),
+                    ref_dict=conds.gen,
+                )
+            return wav.squeeze(0).detach().cpu().numpy()
+
+        blocks = stream_vocode(
+            vocode_window,
+            speech_tokens(),
+            first_window=first_window_tokens,
+            window=window_tokens,
+            context=context_tokens,
+        )
+        for block in blocks:
+            watermarked_block = self.watermarker.apply_watermark(block, sample_rate=self.sr)
+            metrics.record(len(watermarked_block), self.sr)
+            yield torch.from_numpy(watermarked_block).unsqueeze(0), metrics
+
+    def generate(
+        self,
+        text,
+        language_id,
+        audio_prompt_path=None,
+        exaggeration=0.5,
+        cfg_weight=0.5,
+        temperature=0.8,
+        repetition_penalty=2.0,
+        min_p=0.05,
+        top_p=1.0,
+    ):
+        if audio_prompt_path:
+            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
+        else:
+            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
+
+        params = GenerationParams(
+            language_id=language_id,
+            exaggeration=exaggeration,
+            cfg_weight=cfg_weight,
+            temperature=temperature,
+            repetition_penalty=repetition_penalty,
+            min_p=min_p,
+            top_p=top_p,
+        )
+        # generate() takes whole texts and cannot re-split them: its budget never
+        # drops below the fixed limit it always had, and a decode that still
+        # reaches it is vocoded as it is. Callers that split text use synthesize().
+        params.max_new_tokens = max(FIXED_MAX_NEW_TOKENS, self.max_new_tokens_for(text, params))
+        return self.synthesize(text, self.conds, params, allow_truncated=True)
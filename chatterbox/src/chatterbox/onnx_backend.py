@@ -0,0 +1,282 @@
+"""
+ONNX Runtime backend: run the graphs of `chatterbox.onnx_export` on CPU.
+
+`attach_onnx_backend` swaps them into a loaded model, which keeps its
+`generate`/`synthesize` interface:
+
+- T3 decoding goes through `OnnxT3Runtime`, a runtime for
+  `t3_batch.iter_batched_inference`. Embeddings, heads and sampling stay in
+  PyTorch; only the transformer runs in ONNX Runtime.
+- S3Gen's flow estimator is replaced by an `OnnxModule` running its graph.
+- The voice encoder's `forward` runs its graph.
+
+Each decode owns a KV buffer and an IO binding over it: the step graph reads
+the buffer in place and writes the new keys and values into preallocated
+outputs, which are copied into the next free slot, so decode steps allocate
+nothing on the ONNX Runtime side. Slots not filled yet are masked out of
+attention, but the graph still attends over every slot of the buffer, so the
+buffer grows in blocks of `KV_BLOCK` positions as the decode advances instead
+of being sized for the whole decode up front: a step costs (and the buffer
+holds, layers x 2 x batch x heads x positions x head_dim fp32 values) about
+the filled length, not the decode's maximum.
+"""
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import torch
+from torch import nn
+
+from .onnx_export import FLOW_ESTIMATOR_FILE, ONNX_FILES, T3_STEP_FILE, VOICE_ENCODER_FILE, export_onnx
+from .quantize import cache_root
+from .t3_batch import PrefixKV
+
+try:
+    import onnxruntime as ort
+except ImportError:  # Optional: only needed for backend="onnx"
+    ort = None
+
+
+SUPPORTED_BACKENDS = ("torch", "onnx")
+
+# Positions the KV buffer of a decode grows by (rebinding the step graph each time)
+KV_BLOCK = 256
+
+_NUMPY_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(int64)": np.int64,
+    "tensor(bool)": np.bool_,
+}
+
+
+def default_onnx_dir() -> Path:
+    """Where exported graphs are kept unless a directory is given (one subfolder per revision)."""
+    return cache_root() / "onnx"
+
+
+def check_backend(backend: str, device, quantize: Optional[str] = None) -> None:
+    """Validate a `backend` option: ONNX Runtime runs on CPU, with fp32 graphs only."""
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported backend '{backend}'. Supported: {', '.join(SUPPORTED_BACKENDS)}")
+    if backend == "torch":
+        return
+    if ort is None:
+        raise ImportError("backend='onnx' needs onnxruntime: pip install onnx onnxruntime")
+    if torch.device(device).type != "cpu":
+        raise ValueError(f"backend='onnx' is only supported on CPU, got device '{device}'")
+    if quantize:
+        raise ValueError("backend='onnx' cannot be combined with quantize")
+
+
+def create_session(fpath, threads: Optional[int] = None):
+    """An ONNX Runtime CPU session for `fpath` with full graph optimizations."""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+    return ort.InferenceSession(str(fpath), sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def _to_numpy(value, onnx_type: str) -> np.ndarray:
+    if torch.is_tensor(value):
+        value = value.detach().cpu().numpy()
+    return np.ascontiguousarray(value, dtype=_NUMPY_TYPES.get(onnx_type, np.float32))
+
+
+class OnnxModule(nn.Module):
+    """
+    Drop-in `nn.Module` that runs an ONNX graph.
+
+    Positional and keyword arguments are matched to the graph inputs by name;
+    unknown keywords are ignored. Returns the first output as a CPU tensor.
+    """
+
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+        self.inputs = [(i.name, i.type) for i in session.get_inputs()]
+
+    def forward(self, *args, **kwargs):
+        values = dict(zip((name for name, _ in self.inputs), args))
+        values.update((k, v) for k, v in kwargs.items() if k not in values)
+        feeds = {name: _to_numpy(values[name], onnx_type) for name, onnx_type in self.inputs if name in values}
+        return torch.from_numpy(self.session.run(None, feeds)[0])
+
+
+class _OnnxDecoder:
+    """KV buffer, IO binding and step buffers of one decode (see `TorchT3Runtime`)."""
+
+    def __init__(self, runtime: "OnnxT3Runtime", capacity: int):
+        self.runtime = runtime
+        self.capacity = capacity
+        self.binding = runtime.session.io_binding()
+        self.length = 0  # filled slots of the KV buffer
+
+    def _buffer_size(self, positions: int) -> int:
+        """`positions` rounded up to whole `KV_BLOCK`s, at most `capacity`."""
+        return min(self.capacity, -(-positions // KV_BLOCK) * KV_BLOCK)
+
+    def _allocate(self, batch: int, size: int = 0, kv=None, past_mask=None):
+        """(Re)bind the KV buffer (`kv`, else a new one of `size` positions) and the step buffers for `batch` rows."""
+        r = self.runtime
+        if kv is None:
+            kv = np.zeros((r.layers, 2, batch, r.kv_heads, size, r.head_dim), dtype=np.float32)
+            past_mask = np.zeros((batch, size), dtype=np.int64)
+        self.kv, self.past_mask = kv, past_mask
+        self.step_embeds = np.zeros((batch, 1, r.hidden_size), dtype=np.float32)
+        self.step_positions = np.zeros((batch, 1), dtype=np.int64)
+        self.step_mask = np.ones((batch, 1), dtype=np.int64)
+        self.hidden = np.zeros((batch, r.hidden_size), dtype=np.float32)
+        self.present = np.zeros((r.layers, 2, batch, r.kv_heads, 1, r.head_dim), dtype=np.float32)
+
+        # OrtValues over numpy arrays share their memory: bind once, then write in place
+        self._values = {
+            name: ort.OrtValue.ortvalue_from_numpy(array)
+            for name, array in (
+                ("past_kv", self.kv),
+                ("past_mask", self.past_mask),
+                ("inputs_embeds", self.step_embeds),
+                ("position_ids", self.step_positions),
+                ("new_mask", self.step_mask),
+                ("hidden", self.hidden),
+                ("present_kv", self.present),
+            )
+        }
+        self.binding.clear_binding_inputs()
+        self.binding.clear_binding_outputs()
+        for name in ("past_kv", "past_mask", "inputs_embeds", "position_ids", "new_mask"):
+            self.binding.bind_ortvalue_input(name, self._values[name])
+        for name in ("hidden", "present_kv"):
+            self.binding.bind_ortvalue_output(name, self._values[name])
+
+    def _grow(self, positions: int):
+        """Reallocate the KV buffer for at least `positions` slots, keeping the filled ones."""
+        batch = self.kv.shape[2]
+        kv, past_mask = self.kv, self.past_mask
+        self._allocate(batch, self._buffer_size(positions))
+        self.kv[:, :, :, :, :self.length] = kv[:, :, :, :, :self.length]
+        self.past_mask[:, :self.length] = past_mask[:, :self.length]
+
+    def _append(self, present: np.ndarray, new_mask: np.ndarray):
+        n = present.shape[4]
+        if self.length + n > self.capacity:
+            raise RuntimeError(f"KV buffer full ({self.capacity} positions)")
+        if self.length + n > self.kv.shape[4]:
+            self._grow(self.length + n)
+        self.kv[:, :, :, :, self.length:self.length + n] = present
+        self.past_mask[:, self.length:self.length + n] = new_mask
+        self.length += n
+
+    def prefill(self, inputs_embeds, attention_mask, position_ids, prefixes: List[PrefixKV], prefix_len: int):
+        # Room for the conditioning prefix, the text and the first speech steps
+        self._allocate(inputs_embeds.size(0), self._buffer_size(attention_mask.size(1) + 1))
+
+        # Conditioning prefixes, left-padded to `prefix_len` like the attention mask
+        for row, prefix in enumerate(prefixes):
+            start = prefix_len - prefix[0][0].size(2)
+            for layer, (k, v) in enumerate(prefix):
+                self.kv[layer, 0, row, :, start:prefix_len] = k[0].float().cpu().numpy()
+                self.kv[layer, 1, row, :, start:prefix_len] = v[0].float().cpu().numpy()
+        self.past_mask[:, :prefix_len] = attention_mask[:, :prefix_len].cpu().numpy()
+        self.length = prefix_len
+
+        # The text part has its own length: run it with one-off inputs and outputs
+        new_mask = attention_mask[:, prefix_len:].cpu().numpy()
+        feeds = {
+            "inputs_embeds": _to_numpy(inputs_embeds, "tensor(float)"),
+            "position_ids": _to_numpy(position_ids, "tensor(int64)"),
+            "past_kv": self.kv,
+            "past_mask": self.past_mask,
+            "new_mask": np.ascontiguousarray(new_mask, dtype=np.int64),
+        }
+        hidden, present = self.runtime.session.run(None, feeds)
+        self._append(present, new_mask)
+        return torch.from_numpy(hidden)
+
+    def step(self, inputs_embeds, attention_mask, position_ids) -> torch.Tensor:
+        self.step_embeds[...] = inputs_embeds.detach().float().cpu().numpy()
+        self.step_positions[...] = position_ids.cpu().numpy()
+        self.step_mask[...] = attention_mask[:, -1:].cpu().numpy()
+        self.runtime.session.run_with_iobinding(self.binding)
+        self._append(self.present, self.step_mask)
+        return torch.from_numpy(self.hidden.copy())
+
+    def select_rows(self, rows: torch.Tensor):
+        # Copies the kept rows of the buffer, which is only about as long as the filled part
+        rows = rows.cpu().numpy()
+        self._allocate(
+            len(rows),
+            kv=np.ascontiguousarray(self.kv[:, :, rows]),
+            past_mask=np.ascontiguousarray(self.past_mask[rows]),
+        )
+
+
+class OnnxT3Runtime:
+    """
+    Runs T3's transformer with ONNX Runtime (the `t3_step.onnx` graph).
+
+    Same interface as `t3_batch.TorchT3Runtime`; sessions are thread-safe, and
+    every decode gets its own IO binding, so concurrent decodes can share one
+    runtime.
+    """
+
+    name = "onnx"
+
+    def __init__(self, fpath, threads: Optional[int] = None):
+        self.session = create_session(fpath, threads)
+        inputs = {i.name: i for i in self.session.get_inputs()}
+        # Static dims of past_kv: (layers, 2, batch, kv_heads, past, head_dim)
+        self.layers, _, _, self.kv_heads, _, self.head_dim = inputs["past_kv"].shape
+        self.hidden_size = inputs["inputs_embeds"].shape[2]
+
+    def conditioning_prefix(self, t3, t3_cond) -> PrefixKV:
+        cond_emb = t3.prepare_conditioning(t3_cond).detach().float().cpu().numpy()
+        length = cond_emb.shape[1]
+        # One masked-out past slot stands in for "no past" (avoids zero-sized inputs)
+        _, present = self.session.run(None, {
+            "inputs_embeds": np.ascontiguousarray(cond_emb),
+            "position_ids": np.arange(length, dtype=np.int64)[None],
+            "past_kv": np.zeros((self.layers, 2, 1, self.kv_heads, 1, self.head_dim), dtype=np.float32),
+            "past_mask": np.zeros((1, 1), dtype=np.int64),
+            "new_mask": np.ones((1, length), dtype=np.int64),
+        })
+        present = torch.from_numpy(present)
+        return tuple((present[layer, 0], present[layer, 1]) for layer in range(self.layers))
+
+    def decoder(self, t3, capacity: int) -> _OnnxDecoder:
+        return _OnnxDecoder(self, capacity)
+
+
+def _install_voice_encoder(ve, session):
+    """Run `ve`'s forward (mels -> normalized embeddings) with `session`."""
+    module = OnnxModule(session)
+
+    def forward(mels):
+        return module(mels).to(mels.device)
+
+    # nn.Module.__call__ looks up `self.forward`, so the instance attribute wins
+    ve.forward = forward
+
+
+_export_lock = threading.Lock()
+
+
+def attach_onnx_backend(model, onnx_dir, threads: Optional[int] = None):
+    """
+    Switch a loaded CPU model to ONNX Runtime.
+
+    The graphs are read from `onnx_dir`, and exported there first if any is
+    missing (one-off; needs the `onnx` package). Returns the T3 runtime.
+    """
+    onnx_dir = Path(onnx_dir)
+    with _export_lock:
+        if not all((onnx_dir / name).exists() for name in ONNX_FILES):
+            print(f"Exporting ONNX graphs to {onnx_dir} (first run only)...")
+            export_onnx(model, onnx_dir)
+
+    runtime = OnnxT3Runtime(onnx_dir / T3_STEP_FILE, threads)
+    # Replaces the torch estimator, whose weights are then freed
+    model.s3gen.flow.decoder.estimator = OnnxModule(create_session(onnx_dir / FLOW_ESTIMATOR_FILE, threads))
+    _install_voice_encoder(model.ve, create_session(onnx_dir / VOICE_ENCODER_FILE, threads))
+    return runtime
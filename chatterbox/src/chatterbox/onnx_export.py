@@ -0,0 +1,224 @@
+"""
+Export the compute-heavy parts of the model to ONNX graphs.
+
+Three graphs are written to a directory, one per component:
+
+- `t3_step.onnx`: T3's transformer (no embeddings or heads) over a
+  preallocated KV buffer. The same graph runs the prefill (S positions) and
+  each decode step (S = 1); it returns the last hidden state and the keys and
+  values of the new positions, which the runtime writes into its buffer.
+- `flow_estimator.onnx`: the network that S3Gen's flow-matching decoder calls
+  at every ODE step, i.e. most of S3Gen's cost.
+- `voice_encoder.onnx`: the voice encoder (mel partials -> speaker embedding).
+
+S3Gen's token encoder and HiFT vocoder stay in PyTorch: the vocoder's
+STFT/iSTFT has no ONNX equivalent, and both run once per chunk.
+
+Usage (needs the `onnx` package):
+    python -m chatterbox.onnx_export --out onnx/
+"""
+import argparse
+from pathlib import Path
+
+import torch
+from torch import nn
+from transformers.models.llama.modeling_llama import apply_rotary_pos_emb, repeat_kv
+
+
+OPSET = 18
+T3_STEP_FILE = "t3_step.onnx"
+FLOW_ESTIMATOR_FILE = "flow_estimator.onnx"
+VOICE_ENCODER_FILE = "voice_encoder.onnx"
+ONNX_FILES = (T3_STEP_FILE, FLOW_ESTIMATOR_FILE, VOICE_ENCODER_FILE)
+
+
+class T3StepGraph(nn.Module):
+    """
+    T3's Llama transformer written out for export, with the KV cache as an input.
+
+    Inputs: `inputs_embeds` (B, S, D), `position_ids` (B, S), `past_kv`
+    (layers, 2, B, kv_heads, T, head_dim), `past_mask` (B, T) marking the
+    filled slots of `past_kv`, and `new_mask` (B, S) marking the non-padding
+    new positions. Outputs: `hidden` (B, D), the final-norm hidden state of the
+    last position, and `present_kv` (layers, 2, B, kv_heads, S, head_dim).
+
+    Attention runs over the past slots and the new positions separately and is
+    combined in one softmax, so the graph never writes into the KV buffer.
+    """
+
+    def __init__(self, tfmr):
+        super().__init__()
+        self.tfmr = tfmr
+        config = tfmr.config
+        self.num_heads = config.num_attention_heads
+        self.num_kv_heads = config.num_key_value_heads
+        self.head_dim = getattr(config, "head_dim", None) or config.hidden_size // config.num_attention_heads
+
+    def forward(self, inputs_embeds, position_ids, past_kv, past_mask, new_mask):
+        batch, seq_len, _ = inputs_embeds.shape
+        hidden = inputs_embeds
+        cos, sin = self.tfmr.rotary_emb(hidden, position_ids)
+        groups = self.num_heads // self.num_kv_heads
+        scale = self.head_dim ** -0.5
+
+        # Additive masks: past slots that are not filled yet, and causal + padding for the new positions
+        min_value = torch.finfo(hidden.dtype).min
+        past_bias = (1.0 - past_mask[:, None, None, :].to(hidden.dtype)) * min_value
+        positions = torch.arange(seq_len, device=hidden.device)
+        causal = positions[:, None] >= positions[None, :]
+        new_allowed = causal[None, None] & (new_mask[:, None, None, :] > 0)
+        new_bias = (~new_allowed).to(hidden.dtype) * min_value
+
+        presents = []
+        for i, layer in enumerate(self.tfmr.layers):
+            attn = layer.self_attn
+            residual = hidden
+            x = layer.input_layernorm(hidden)
+            q = attn.q_proj(x).view(batch, seq_len, self.num_heads, self.head_dim).transpose(1, 2)
+            k = attn.k_proj(x).view(batch, seq_len, self.num_kv_heads, self.head_dim).transpose(1, 2)
+            v = attn.v_proj(x).view(batch, seq_len, self.num_kv_heads, self.head_dim).transpose(1, 2)
+            q, k = apply_rotary_pos_emb(q, k, cos, sin)
+            presents.append(torch.stack([k, v]))
+
+            past_k = repeat_kv(past_kv[i, 0], groups)
+            past_v = repeat_kv(past_kv[i, 1], groups)
+            k, v = repeat_kv(k, groups), repeat_kv(v, groups)
+            scores = torch.cat([
+                torch.matmul(q, past_k.transpose(-1, -2)) * scale + past_bias,
+                torch.matmul(q, k.transpose(-1, -2)) * scale + new_bias,
+            ], dim=-1)
+            probs = torch.softmax(scores, dim=-1)
+            past_len = past_k.size(2)
+            out = torch.matmul(probs[..., :past_len], past_v) + torch.matmul(probs[..., past_len:], v)
+            out = out.transpose(1, 2).reshape(batch, seq_len, -1)
+            hidden = residual + attn.o_proj(out)
+            hidden = hidden + layer.mlp(layer.post_attention_layernorm(hidden))
+
+        hidden = self.tfmr.norm(hidden)
+        return hidden[:, -1, :], torch.stack(presents)
+
+
+def _export(module, args, fpath, input_names, output_names, dynamic_axes):
+    fpath = Path(fpath)
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = fpath.with_suffix(".tmp.onnx")
+    torch.onnx.export(
+        module,
+        args,
+        str(tmp_path),
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes=dynamic_axes,
+        opset_version=OPSET,
+        do_constant_folding=True,
+    )
+    tmp_path.replace(fpath)
+    return fpath
+
+
+def export_t3_step(t3, fpath) -> Path:
+    """Export T3's transformer as a `T3StepGraph` to `fpath`."""
+    graph = T3StepGraph(t3.tfmr).eval()
+    config = t3.tfmr.config
+    batch, seq_len, past_len = 2, 3, 4
+    args = (
+        torch.randn(batch, seq_len, config.hidden_size),
+        torch.arange(past_len, past_len + seq_len).repeat(batch, 1),
+        torch.zeros(len(t3.tfmr.layers), 2, batch, graph.num_kv_heads, past_len, graph.head_dim),
+        torch.ones(batch, past_len, dtype=torch.long),
+        torch.ones(batch, seq_len, dtype=torch.long),
+    )
+    with torch.no_grad():
+        return _export(
+            graph,
+            args,
+            fpath,
+            input_names=["inputs_embeds", "position_ids", "past_kv", "past_mask", "new_mask"],
+            output_names=["hidden", "present_kv"],
+            dynamic_axes={
+                "inputs_embeds": {0: "batch", 1: "seq"},
+                "position_ids": {0: "batch", 1: "seq"},
+                "past_kv": {2: "batch", 4: "past"},
+                "past_mask": {0: "batch", 1: "past"},
+                "new_mask": {0: "batch", 1: "seq"},
+                "hidden": {0: "batch"},
+                "present_kv": {2: "batch", 4: "seq"},
+            },
+        )
+
+
+def export_flow_estimator(s3gen, fpath) -> Path:
+    """Export the estimator of S3Gen's flow-matching decoder to `fpath`."""
+    estimator = s3gen.flow.decoder.estimator.eval()
+    n_feats = getattr(s3gen.flow, "output_size", 80)
+    batch, frames = 2, 64
+    args = (
+        torch.randn(batch, n_feats, frames),   # x
+        torch.ones(batch, 1, frames),          # mask
+        torch.randn(batch, n_feats, frames),   # mu
+        torch.rand(batch),                     # t
+        torch.randn(batch, n_feats),           # spks
+        torch.randn(batch, n_feats, frames),   # cond
+    )
+    with torch.no_grad():
+        return _export(
+            estimator,
+            args,
+            fpath,
+            input_names=["x", "mask", "mu", "t", "spks", "cond"],
+            output_names=["dphi_dt"],
+            dynamic_axes={
+                "x": {0: "batch", 2: "frames"},
+                "mask": {0: "batch", 2: "frames"},
+                "mu": {0: "batch", 2: "frames"},
+                "t": {0: "batch"},
+                "spks": {0: "batch"},
+                "cond": {0: "batch", 2: "frames"},
+                "dphi_dt": {0: "batch", 2: "frames"},
+            },
+        )
+
+
+def export_voice_encoder(ve, fpath) -> Path:
+    """Export the voice encoder (mels (B, frames, n_mels) -> embeddings (B, E)) to `fpath`."""
+    ve = ve.eval()
+    n_mels = getattr(ve.hp, "num_mels", 40)
+    frames = getattr(ve.hp, "ve_partial_frames", 160)
+    with torch.no_grad():
+        return _export(
+            ve,
+            (torch.rand(2, frames, n_mels),),
+            fpath,
+            input_names=["mels"],
+            output_names=["embeds"],
+            dynamic_axes={"mels": {0: "batch", 1: "frames"}, "embeds": {0: "batch"}},
+        )
+
+
+def export_onnx(model, out_dir) -> Path:
+    """Export the three graphs of a `ChatterboxMultilingualTTS` (fp32 weights) to `out_dir`."""
+    out_dir = Path(out_dir)
+    export_t3_step(model.t3, out_dir / T3_STEP_FILE)
+    export_flow_estimator(model.s3gen, out_dir / FLOW_ESTIMATOR_FILE)
+    export_voice_encoder(model.ve, out_dir / VOICE_ENCODER_FILE)
+    return out_dir
+
+
+def main():
+    from .mtl_tts import ChatterboxMultilingualTTS
+
+    parser = argparse.ArgumentParser(description="Export Chatterbox to ONNX graphs")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--ckpt-dir", help="Checkpoint directory (default: download from the Hub)")
+    args = parser.parse_args()
+
+    if args.ckpt_dir:
+        model = ChatterboxMultilingualTTS.from_local(args.ckpt_dir, device="cpu")
+    else:
+        model = ChatterboxMultilingualTTS.from_pretrained(device="cpu")
+    out_dir = export_onnx(model, args.out)
+    print(f"Exported {', '.join(ONNX_FILES)} to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Two-stage T3/S3Gen pipeline over consecutive text chunks.
+
+Synthesizing chunk after chunk runs T3 decoding and S3Gen vocoding strictly in
+sequence, although they do not depend on each other across chunks. Here a
+decode thread produces speech tokens (optionally several chunks per batched
+pass) while a vocoder thread renders the previous chunk. Stages are connected
+by bounded queues, so a fast decoder cannot run far ahead of the vocoder.
+
+The CPU threads are not partitioned between the stages: `torch.set_num_threads`
+sets a process-wide value, so both stages run their ops on the intra-op thread
+count already configured for the process. The gain comes from the stages
+overlapping, not from a per-stage thread share.
+"""
+import queue
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+import torch
+
+
+_DONE = object()
+
+
+def pipelined_synthesize(
+    model,
+    texts: List[str],
+    conds,
+    params=None,
+    batch_size: int = 1,
+    queue_size: int = 2,
+) -> Iterator[Tuple[int, Optional[torch.Tensor], Optional[Exception]]]:
+    """
+    Synthesize `texts` with T3 and S3Gen overlapped across chunks.
+
+    `model` needs `generate_tokens_batch(texts, conds, params)` and
+    `vocode(tokens, conds, params)` (e.g. `ChatterboxMultilingualTTS`). Yields
+    `(index, wav, error)` for every text in input order; exactly one of `wav`
+    and `error` is set, so one failing chunk does not stop the others.
+    """
+    token_queue = queue.Queue(maxsize=queue_size)
+    wav_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(q, item) -> bool:
+        # Bounded put that gives up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode_worker():
+        try:
+            for start in range(0, len(texts), batch_size):
+                group = texts[start:start + batch_size]
+                try:
+                    token_seqs = model.generate_tokens_batch(group, conds, params)
+                    results = [(start + i, tokens, None) for i, tokens in enumerate(token_seqs)]
+                except Exception as e:
+                    results = [(start + i, None, e) for i in range(len(group))]
+                for result in results:
+                    if not put(token_queue, result):
+                        return
+        finally:
+            put(token_queue, _DONE)
+
+    def vocode_worker():
+        while not stop.is_set():
+            try:
+                item = token_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                put(wav_queue, _DONE)
+                return
+            index, tokens, error = item
+            if error is None:
+                try:
+                    item = (index, model.vocode(tokens, conds, params), None)
+                except Exception as e:
+                    item = (index, None, e)
+            if not put(wav_queue, item):
+                return
+
+    workers = [
+        threading.Thread(target=decode_worker, name="pipeline-t3", daemon=True),
+        threading.Thread(target=vocode_worker, name="pipeline-s3gen", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        while True:
+            item = wav_queue.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,96 @@
+"""
+Reduced-precision (bfloat16) inference.
+
+With `dtype="bfloat16"` the models convert their heavy modules once at load:
+T3 (all but its speech head) and S3Gen's flow model. That halves their
+resident memory, and on CPUs with AVX512-BF16 or AMX their matmuls run on the
+bf16 units. Numerically sensitive parts stay in float32:
+
+- T3's speech head, so logits, CFG and sampling are computed in fp32;
+- S3Gen's HiFT vocoder (mel -> waveform), tokenizer and speaker encoder;
+- the normalization layers of the flow model;
+- the voice encoder.
+
+T3 gets its inputs in its own dtype (`T3Cond.to(dtype=...)`, token
+embeddings); S3Gen's flow runs under `torch.autocast`, which casts the fp32
+reference features at its boundaries.
+"""
+from contextlib import nullcontext
+from typing import Optional
+
+import torch
+from torch import nn
+
+
+SUPPORTED_DTYPES = ("float32", "bfloat16")
+
+
+def resolve_dtype(dtype: str) -> torch.dtype:
+    """torch dtype of a `dtype` option ("float32" or "bfloat16")."""
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}'. Supported dtypes: {', '.join(SUPPORTED_DTYPES)}")
+    return getattr(torch, dtype)
+
+
+def check_dtype(dtype: str, device, quantize: Optional[str] = None, backend: str = "torch") -> None:
+    """Validate a `dtype` option against the device and the other load options."""
+    resolve_dtype(dtype)
+    if dtype == "float32":
+        return
+    if torch.device(device).type not in ("cpu", "cuda"):
+        raise ValueError(f"dtype='{dtype}' is only supported on CPU and CUDA, got device '{device}'")
+    if quantize:
+        raise ValueError(f"dtype='{dtype}' cannot be combined with quantize (int8 layers take fp32 inputs)")
+    if backend != "torch":
+        raise ValueError(f"dtype='{dtype}' needs the torch backend (the ONNX graphs are fp32)")
+
+
+def _module_device(module) -> torch.device:
+    return next(module.parameters()).device
+
+
+def _keep_fp32(module, method: str = "forward"):
+    """Run `module.<method>` in float32: floating tensor arguments are cast and autocast is off."""
+    original = getattr(module, method)
+
+    def to_fp32(value):
+        return value.float() if torch.is_tensor(value) and value.is_floating_point() else value
+
+    def run_fp32(*args, **kwargs):
+        args = [to_fp32(arg) for arg in args]
+        kwargs = {k: to_fp32(v) for k, v in kwargs.items()}
+        with torch.autocast(device_type=_module_device(module).type, enabled=False):
+            return original(*args, **kwargs)
+
+    # Instance attributes win over the class's methods (and over nn.Module.__call__'s lookup)
+    setattr(module, method, run_fp32)
+
+
+def convert_t3(t3, dtype: str):
+    """Convert T3 to `dtype` in place, keeping the speech head (logits) in fp32."""
+    if dtype == "float32":
+        return t3
+    t3.to(dtype=resolve_dtype(dtype))
+    t3.speech_head.float()
+    _keep_fp32(t3.speech_head)
+    return t3
+
+
+def convert_s3gen(s3gen, dtype: str):
+    """Convert S3Gen's flow model to `dtype` in place; the vocoder stays in fp32."""
+    if dtype == "float32":
+        return s3gen
+    s3gen.flow.to(dtype=resolve_dtype(dtype))
+    # Norms stay fp32: they accept both dtypes, and autocast leaves a mix of them
+    for module in s3gen.flow.modules():
+        if isinstance(module, (nn.LayerNorm, nn.GroupNorm)):
+            module.float()
+    _keep_fp32(s3gen.mel2wav, "inference")
+    return s3gen
+
+
+def autocast(device, dtype: str):
+    """Autocast context for S3Gen's flow in `dtype` (no-op for float32)."""
+    if dtype == "float32":
+        return nullcontext()
+    return torch.autocast(device_type=torch.device(device).type, dtype=resolve_dtype(dtype))
@@ -0,0 +1,111 @@
+"""
+Dynamic int8 quantization of the model's linear layers for CPU inference.
+
+`torch.ao.quantization.quantize_dynamic` stores the weights of every
+`nn.Linear` as int8 and quantizes activations on the fly, which shrinks T3's
+transformer about 4x and speeds up its memory-bound decode steps on CPU.
+Embeddings, norms and convolutions stay in fp32.
+
+Quantizing needs the fp32 weights first, so `load_quantized` keeps the
+quantized state dict on disk: later starts build the module skeleton, quantize
+it (cheap on random weights) and load the cached int8 weights, without reading
+the fp32 checkpoint at all.
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import torch
+from torch import nn
+
+
+SUPPORTED_QUANTIZATION = ("int8",)
+
+
+def cache_root() -> Path:
+    """Root of the caches derived from the checkpoint ($CHATTERBOX_CACHE or ~/.cache/chatterbox)."""
+    return Path(os.getenv("CHATTERBOX_CACHE") or Path.home() / ".cache" / "chatterbox")
+
+
+def default_cache_dir() -> Path:
+    """Where quantized states are kept unless a directory is given."""
+    return cache_root() / "quantized"
+
+
+def check_quantization(quantize: Optional[str], device) -> None:
+    """Validate a `quantize` option for `device` (dynamic quantization runs on CPU only)."""
+    if quantize is None:
+        return
+    if quantize not in SUPPORTED_QUANTIZATION:
+        raise ValueError(
+            f"Unsupported quantization '{quantize}'. Supported: {', '.join(SUPPORTED_QUANTIZATION)}"
+        )
+    if torch.device(device).type != "cpu":
+        raise ValueError(f"quantize='{quantize}' is only supported on CPU, got device '{device}'")
+
+
+def quantize_int8(module: nn.Module, targets: Sequence[str] = ()) -> nn.Module:
+    """
+    Replace `nn.Linear` layers with dynamically quantized int8 ones, in place.
+
+    Only the submodules named in `targets` are quantized (all of `module` when
+    empty): e.g. T3 keeps its output heads in fp32, since code reads their
+    `.weight` to find the model's device.
+    """
+    for target in targets or ("",):
+        submodule = module.get_submodule(target)
+        torch.ao.quantization.quantize_dynamic(submodule, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return module
+
+
+def load_quantized(
+    name: str,
+    build_fn: Callable[[], nn.Module],
+    load_fp32_fn: Callable[[nn.Module], None],
+    cache_dir,
+    revision: str,
+    targets: Sequence[str] = (),
+) -> nn.Module:
+    """
+    Return an int8 copy of a model component, from the disk cache when possible.
+
+    Args:
+        name: Component name used in the cache file name (e.g. "t3")
+        build_fn: Builds the fp32 module with its final architecture
+        load_fp32_fn: Loads the fp32 checkpoint into a freshly built module
+        cache_dir: Directory of the cached quantized states
+        revision: Checkpoint revision; a new revision gets a new cache entry
+        targets: Submodules to quantize (see `quantize_int8`)
+    """
+    cache_dir = Path(cache_dir)
+    fpath = cache_dir / f"{name}_int8_{revision}_torch{torch.__version__}.pt"
+
+    if fpath.exists():
+        try:
+            module = quantize_int8(build_fn().eval(), targets)
+            # Our own cache file: packed int8 params need the full unpickler
+            module.load_state_dict(torch.load(fpath, map_location="cpu", weights_only=False))
+            return module.eval()
+        except Exception as e:
+            print(f"Warning: discarding unreadable quantized cache {fpath.name}: {e}")
+            fpath.unlink(missing_ok=True)
+
+    module = build_fn()
+    load_fp32_fn(module)
+    module = quantize_int8(module.eval(), targets)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Unique temp file: concurrent loads of the same revision never share one
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{fpath.stem}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            torch.save(module.state_dict(), tmp_path)
+            os.replace(tmp_path, fpath)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+    except OSError as e:
+        print(f"Warning: could not cache quantized {name}: {e}")
+    return module
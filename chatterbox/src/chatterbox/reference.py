@@ -0,0 +1,81 @@
+"""
+Reference audio loading shared by the TTS, multilingual TTS and VC models.
+
+S3Gen and the speech prompt tokens only look at the first seconds of a
+reference clip; the voice encoder embeds the whole clip at S3_SR (16 kHz).
+Decoding the whole file at S3GEN_SR (24 kHz) and resampling all of it again to
+16 kHz did the work twice, and the 24 kHz copy was mostly thrown away. Here a
+file is decoded once at its native rate, and each target rate is produced only
+for the part its consumer reads, with a polyphase resampler whose filter is
+built once per rate pair.
+"""
+import functools
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+import torch
+import torchaudio
+
+
+# Formats libsndfile decodes natively, without going through librosa/audioread
+SOUNDFILE_EXTENSIONS = (".wav", ".flac")
+
+
+def decode_audio(fpath, max_seconds: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decode `fpath` to mono float32 at its native sample rate.
+
+    Only the first `max_seconds` are read when given. Returns (wav, sample_rate).
+    """
+    fpath = Path(fpath)
+    if fpath.suffix.lower() in SOUNDFILE_EXTENSIONS:
+        with sf.SoundFile(str(fpath)) as f:
+            sr = f.samplerate
+            frames = -1 if max_seconds is None else int(max_seconds * sr)
+            wav = f.read(frames, dtype="float32", always_2d=True)
+        return wav.mean(axis=1), sr
+
+    wav, sr = librosa.load(str(fpath), sr=None, mono=True, duration=max_seconds)
+    return wav.astype(np.float32, copy=False), sr
+
+
+@functools.lru_cache(maxsize=16)
+def get_resampler(orig_sr: int, target_sr: int) -> torchaudio.transforms.Resample:
+    """Polyphase resampler for (orig_sr -> target_sr); its filter is computed once."""
+    return torchaudio.transforms.Resample(orig_sr, target_sr)
+
+
+def resample(wav: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Resample a mono float32 signal, reusing the cached filter for the rate pair."""
+    if orig_sr == target_sr:
+        return wav
+    with torch.inference_mode():
+        out = get_resampler(orig_sr, target_sr)(torch.from_numpy(wav).unsqueeze(0))
+    return out.squeeze(0).numpy()
+
+
+def load_reference(fpath, sample_rates: Iterable[int], max_seconds: Optional[float] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Decode `fpath` once and return it at each of `sample_rates`, in order.
+
+    With `max_seconds`, only that window is decoded and resampled.
+    """
+    wav, sr = decode_audio(fpath, max_seconds=max_seconds)
+    return tuple(resample(wav, sr, target_sr) for target_sr in sample_rates)
+
+
+def load_conditioning_reference(
+    fpath, window_sr: int, window_seconds: float, full_sr: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode `fpath` once for conditioning.
+
+    Returns the first `window_seconds` at `window_sr` (for S3Gen) and the whole
+    clip at `full_sr` (for the speech tokenizer and the voice encoder).
+    """
+    wav, sr = decode_audio(fpath)
+    window = resample(wav[:int(window_seconds * sr)], sr, window_sr)
+    return window, resample(wav, sr, full_sr)
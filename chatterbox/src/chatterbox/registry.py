@@ -0,0 +1,84 @@
+"""
+Process-wide registry of loaded models.
+
+Gradio apps used to load a model per browser session (`gr.State` + `app.load`),
+keeping one multi-GB copy of T3/S3Gen/VE per connected user. Handlers should
+resolve their model from here instead: each (model type, device, dtype) is
+loaded lazily, exactly once, and shared by every caller in the process.
+"""
+import threading
+from typing import Callable, Optional
+
+
+# Same as chatterbox.precision.SUPPORTED_DTYPES, kept here so this module does not import torch
+SUPPORTED_DTYPES = ("float32", "bfloat16")
+
+_models = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _model_class(model_type: str):
+    # Imported lazily: the model modules pull in torch and the full model stack
+    if model_type == "tts":
+        from .tts import ChatterboxTTS
+        return ChatterboxTTS
+    if model_type == "multilingual":
+        from .mtl_tts import ChatterboxMultilingualTTS
+        return ChatterboxMultilingualTTS
+    if model_type == "vc":
+        from .vc import ChatterboxVC
+        return ChatterboxVC
+    raise ValueError(f"Unknown model type '{model_type}'. Expected one of: tts, multilingual, vc")
+
+
+def _registry_key(model_type: str, device, dtype: str):
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}'. Supported dtypes: {', '.join(SUPPORTED_DTYPES)}")
+    return (model_type, str(device), dtype)
+
+
+def get_model(
+    model_type: str = "multilingual",
+    device="cpu",
+    dtype: str = "float32",
+    loader: Optional[Callable] = None,
+):
+    """
+    Return the shared model for (model_type, device, dtype), loading it on first use.
+
+    `loader(device, dtype)` replaces `from_pretrained(device, dtype=dtype)`
+    when given, e.g. to enable caches on the freshly loaded model; it must
+    return the model in `dtype`. It only runs for the call that actually loads
+    the model; concurrent callers for the same key wait for that load to finish.
+    """
+    key = _registry_key(model_type, device, dtype)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        model = _models.get(key)
+        if model is None:
+            if loader is None:
+                model = _model_class(model_type).from_pretrained(device, dtype=dtype)
+            else:
+                model = loader(device, dtype)
+            _models[key] = model
+    return model
+
+
+def get_loaded_model(model_type: str = "multilingual", device="cpu", dtype: str = "float32"):
+    """Return the shared model if it has already been loaded, without loading it."""
+    return _models.get(_registry_key(model_type, device, dtype))
+
+
+def unload_all() -> None:
+    """Drop every registered model (mainly for tests and interactive sessions)."""
+    with _registry_lock:
+        _models.clear()
+        _load_locks.clear()
@@ -0,0 +1,114 @@
+"""
+Streaming synthesis: vocode speech tokens in windows while T3 is still decoding.
+
+Each window is rendered by S3Gen together with a few already-emitted tokens of
+left context, and only the audio of the new tokens is kept. The last tokens of
+a window are held back until the next one (S3Gen looks a few tokens ahead),
+and consecutive blocks are crossfaded over a few milliseconds of audio that both
+windows rendered, so window edges do not click.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from .models.s3gen import S3GEN_SR
+
+
+# S3 speech tokens run at 25 Hz; S3Gen renders each one as 960 samples at 24 kHz
+SAMPLES_PER_TOKEN = S3GEN_SR // 25
+
+
+@dataclass
+class StreamMetrics:
+    """Timing of a streamed synthesis, updated as blocks are produced."""
+    started: float = field(default_factory=time.perf_counter)
+    time_to_first_audio: Optional[float] = None  # seconds until the first block
+    elapsed: float = 0.0                         # seconds until the latest block
+    audio_seconds: float = 0.0                   # audio produced so far
+    blocks: int = 0
+
+    @property
+    def rtf(self) -> Optional[float]:
+        """Real-time factor so far (elapsed / audio seconds)."""
+        return self.elapsed / self.audio_seconds if self.audio_seconds else None
+
+    def record(self, n_samples: int, sample_rate: int = S3GEN_SR):
+        self.elapsed = time.perf_counter() - self.started
+        if self.time_to_first_audio is None:
+            self.time_to_first_audio = self.elapsed
+        self.audio_seconds += n_samples / sample_rate
+        self.blocks += 1
+
+
+def stream_vocode(
+    vocode_fn: Callable,
+    tokens: Iterable[int],
+    first_window: int = 10,
+    window: int = 25,
+    context: int = 10,
+    lookahead: int = 3,
+    fade_samples: int = S3GEN_SR // 50,
+) -> Iterator[np.ndarray]:
+    """
+    Turn a stream of speech tokens into a stream of PCM blocks.
+
+    Args:
+        vocode_fn: Renders a list of speech tokens to a 1D float waveform
+        tokens: Valid speech tokens, as they are decoded
+        first_window: Tokens to wait for before the first block (sets time to first audio)
+        window: New tokens per following block
+        context: Already-emitted tokens re-rendered as left context of each window
+        lookahead: Trailing tokens of a window held back until the next one
+        fade_samples: Crossfade length at block edges
+    """
+    fade_in = np.linspace(0.0, 1.0, fade_samples, dtype=np.float32)
+    fade_out = 1.0 - fade_in
+
+    buffer = []
+    committed = 0  # tokens whose audio has been emitted (or held in `tail`)
+    tail = None    # last samples of the previous block, crossfaded into the next
+
+    def render(final: bool) -> Optional[np.ndarray]:
+        nonlocal committed, tail
+        commit_end = len(buffer) if final else len(buffer) - lookahead
+        if commit_end <= committed:
+            return None
+
+        seg_start = max(0, committed - context)
+        wav = vocode_fn(buffer[seg_start:])
+        start = (committed - seg_start) * SAMPLES_PER_TOKEN
+        stop = (commit_end - seg_start) * SAMPLES_PER_TOKEN
+        committed = commit_end
+
+        block = wav[start:stop]
+        if tail is not None:
+            n = len(tail)
+            if start >= n:
+                # This window re-rendered the held-back samples: blend both versions
+                head = tail * fade_out[:n] + wav[start - n:start] * fade_in[:n]
+            else:
+                head = tail
+            block = np.concatenate([head, block])
+            tail = None
+
+        if not final and len(block) > fade_samples:
+            tail = block[-fade_samples:]
+            block = block[:-fade_samples]
+        return block
+
+    next_flush = first_window
+    for token in tokens:
+        buffer.append(token)
+        if len(buffer) >= next_flush:
+            block = render(final=False)
+            if block is not None and len(block):
+                yield block
+            next_flush = len(buffer) + window
+
+    block = render(final=True)
+    if block is not None and len(block):
+        yield block
+    elif tail is not None:
+        yield tail
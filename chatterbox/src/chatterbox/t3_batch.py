@@ -0,0 +1,373 @@
+"""
+Batched T3 decoding: several texts, each with its own conditioning and sampling
+parameters, in one autoregressive pass.
+
+`T3.inference` decodes one text at a time as a batch of two rows (the CFG pair),
+which leaves most of the matrix throughput of a CPU idle. Here every item adds
+its conditional row, plus its unconditional row when CFG is on. Rows are laid
+out as `[pad | cond | pad | text | bos | bos]`: the conditioning prefix and the
+rest are each left-padded to a common length, with an attention mask hiding the
+padding and position ids derived from the mask, so each row sees exactly the
+positions it would see on its own. Items stop independently, and finished rows
+are dropped from the batch and the KV cache.
+
+The conditioning prefix (speaker embedding, prompt speech tokens, emotion) only
+depends on the voice and the exaggeration, and causal attention means its keys
+and values do not depend on the text that follows. `ConditioningPrefixCache`
+keeps the prefix KV cache of recently used conditionings, so the prefill of
+each chunk only runs over its text tokens.
+
+The transformer itself is run by a runtime: `TorchT3Runtime` (the default)
+calls `t3.tfmr`; `chatterbox.onnx_backend.OnnxT3Runtime` runs an exported ONNX
+graph instead. Embeddings, heads and sampling stay here either way.
+
+Unlike `T3.inference`, the multilingual alignment stream analyzer is not
+attached: it follows the attention of a single sequence and cannot track a batch.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import torch
+from transformers.cache_utils import DynamicCache
+from transformers.generation.logits_process import (
+    MinPLogitsWarper,
+    RepetitionPenaltyLogitsProcessor,
+    TopPLogitsWarper,
+)
+
+from .models.t3 import T3
+from .models.t3.modules.cond_enc import T3Cond
+
+
+@dataclass
+class BatchItem:
+    """
+    One text to decode.
+
+    `text_tokens` is 1D and already wrapped in the start/stop text tokens;
+    `params` needs `cfg_weight`, `temperature`, `repetition_penalty`, `min_p`
+    and `top_p` (e.g. a `GenerationParams`). `max_new_tokens` caps this item's
+    decode below the batch-wide limit.
+    """
+    t3_cond: T3Cond
+    text_tokens: torch.Tensor
+    params: object
+    max_new_tokens: Optional[int] = None
+
+
+# Per layer (key, value), each of shape (1, heads, prefix_len, head_dim)
+PrefixKV = Tuple[Tuple[torch.Tensor, torch.Tensor], ...]
+
+
+def _conditioning_prefix(t3: T3, t3_cond: T3Cond) -> PrefixKV:
+    """Run the transformer over the conditioning prefix alone and return its KV cache."""
+    cond_emb = t3.prepare_conditioning(t3_cond)
+    output = t3.tfmr(inputs_embeds=cond_emb, use_cache=True, return_dict=True)
+    past = output.past_key_values
+    if hasattr(past, "to_legacy_cache"):
+        past = past.to_legacy_cache()
+    return tuple((k, v) for k, v in past)
+
+
+class ConditioningPrefixCache:
+    """
+    LRU of conditioning-prefix KV caches, keyed by the content of the `T3Cond`.
+
+    The key covers the speaker embedding, the prompt speech tokens and the
+    emotion value, i.e. one entry per (voice, exaggeration). Entries are a few MB
+    each and only valid for the weights they were computed with: call `clear()`
+    after changing the model's weights, dtype or device.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(t3_cond: T3Cond) -> str:
+        h = hashlib.sha256()
+        for name in ("speaker_emb", "cond_prompt_speech_tokens", "emotion_adv", "clap_emb"):
+            value = getattr(t3_cond, name, None)
+            h.update(name.encode("utf-8"))
+            if torch.is_tensor(value):
+                h.update(str(tuple(value.shape)).encode("utf-8"))
+                h.update(value.detach().float().cpu().numpy().tobytes())
+            else:
+                h.update(repr(value).encode("utf-8"))
+        return h.hexdigest()
+
+    def get_or_compute(self, t3: T3, t3_cond: T3Cond, runtime=None) -> PrefixKV:
+        """Return the prefix KV cache of `t3_cond`, computing it with `runtime` on a miss."""
+        key = self.key_for(t3_cond)
+        with self._lock:
+            prefix = self._entries.get(key)
+            if prefix is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prefix
+
+        prefix = (runtime or TORCH_RUNTIME).conditioning_prefix(t3, t3_cond)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = prefix
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prefix
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def _item_rows(t3: T3, item: BatchItem) -> List[torch.Tensor]:
+    """
+    Input embeddings (L, D) that follow the conditioning prefix: the item's
+    conditional row and, with CFG, its unconditional row.
+    """
+    text_tokens = item.text_tokens.view(1, -1).to(dtype=torch.long)
+    text_emb = t3.text_emb(text_tokens)[0]
+    text_pos = t3.text_pos_emb(text_tokens)  # already (L, D)
+
+    # T3.inference feeds the initial speech token and then the BOS embedding again
+    bos = torch.full((1, 1), t3.hp.start_speech_token, dtype=torch.long, device=text_tokens.device)
+    bos_emb = t3.speech_emb(bos)[0] + t3.speech_pos_emb.get_fixed_embedding(0)[0]
+    tail = torch.cat([bos_emb, bos_emb])
+
+    rows = [torch.cat([text_emb + text_pos, tail])]
+    if item.params.cfg_weight > 0:
+        # Unconditional row: text embeddings zeroed, positions kept (as T3.prepare_input_embeds)
+        rows.append(torch.cat([text_pos, tail]))
+    return rows
+
+
+def _stack_prefixes(prefixes: List[PrefixKV], prefix_len: int):
+    """
+    Batch the rows' prefix KV caches, left-padded with zeros to `prefix_len`.
+
+    Rows sharing one prefix share its tensors (expanded, not copied); the cache
+    grows by concatenation, so the cached prefixes are never written to.
+    """
+    if all(prefix is prefixes[0] for prefix in prefixes) and prefixes[0][0][0].size(2) == prefix_len:
+        legacy = tuple(
+            (k.expand(len(prefixes), -1, -1, -1), v.expand(len(prefixes), -1, -1, -1))
+            for k, v in prefixes[0]
+        )
+    else:
+        def pad(t):
+            missing = prefix_len - t.size(2)
+            if missing == 0:
+                return t
+            return torch.cat([t.new_zeros(t.size(0), t.size(1), missing, t.size(3)), t], dim=2)
+
+        legacy = tuple(
+            (
+                torch.cat([pad(prefix[layer][0]) for prefix in prefixes]),
+                torch.cat([pad(prefix[layer][1]) for prefix in prefixes]),
+            )
+            for layer in range(len(prefixes[0]))
+        )
+    return DynamicCache.from_legacy_cache(legacy)
+
+
+def _select_rows(past, rows: torch.Tensor):
+    """Keep only `rows` of the KV cache (DynamicCache or legacy tuples)."""
+    if hasattr(past, "batch_select_indices"):
+        past.batch_select_indices(rows)
+        return past
+    return tuple((k[rows], v[rows]) for k, v in past)
+
+
+class _TorchDecoder:
+    """KV cache and transformer calls of one decode, with `t3.tfmr`."""
+
+    def __init__(self, t3: T3):
+        self.tfmr = t3.tfmr
+        self.past = None
+
+    def _run(self, inputs_embeds, attention_mask, position_ids, past) -> torch.Tensor:
+        output = self.tfmr(
+            inputs_embeds=inputs_embeds,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=past,
+            use_cache=True,
+            return_dict=True,
+        )
+        self.past = output.past_key_values
+        return output.last_hidden_state[:, -1, :]
+
+    def prefill(self, inputs_embeds, attention_mask, position_ids, prefixes: List[PrefixKV], prefix_len: int):
+        return self._run(inputs_embeds, attention_mask, position_ids, _stack_prefixes(prefixes, prefix_len))
+
+    def step(self, inputs_embeds, attention_mask, position_ids) -> torch.Tensor:
+        return self._run(inputs_embeds, attention_mask, position_ids, self.past)
+
+    def select_rows(self, rows: torch.Tensor):
+        self.past = _select_rows(self.past, rows)
+
+
+class TorchT3Runtime:
+    """
+    Runs T3's transformer with PyTorch.
+
+    A runtime computes conditioning prefixes and hands out one decoder per
+    decode. A decoder's `prefill` and `step` take the inputs `t3.tfmr` would
+    (after the prefix) and return the last hidden state of each row, (B, D);
+    `select_rows` drops finished rows from its KV cache.
+    """
+
+    name = "torch"
+
+    def conditioning_prefix(self, t3: T3, t3_cond: T3Cond) -> PrefixKV:
+        return _conditioning_prefix(t3, t3_cond)
+
+    def decoder(self, t3: T3, capacity: int) -> _TorchDecoder:
+        """A decoder for one decode of at most `capacity` positions (the cache grows as needed here)."""
+        return _TorchDecoder(t3)
+
+
+TORCH_RUNTIME = TorchT3Runtime()
+
+
+@torch.inference_mode()
+def iter_batched_inference(
+    t3: T3,
+    items: Sequence[BatchItem],
+    max_new_tokens: int = 1000,
+    prefix_cache: Optional[ConditioningPrefixCache] = None,
+    runtime=None,
+) -> Iterator[Dict[int, torch.Tensor]]:
+    """
+    Decode every item in one batched pass, one step at a time.
+
+    Yields, per step, {item index: sampled token of shape (1, 1)} for the items
+    still decoding. An item's last token is the stop token unless its
+    `max_new_tokens` (or the batch-wide one) is reached first. With a `prefix_cache`, the conditioning
+    prefix of each voice is only run through the transformer once. `runtime`
+    runs the transformer (default: `TORCH_RUNTIME`).
+    """
+    runtime = runtime or TORCH_RUNTIME
+    device = t3.device
+    start_token = t3.hp.start_speech_token
+    stop_token = t3.hp.stop_speech_token
+
+    prefixes, rows, row_items = [], [], []  # row_items[r]: index of the item row r belongs to
+    for i, item in enumerate(items):
+        if prefix_cache is not None:
+            prefix = prefix_cache.get_or_compute(t3, item.t3_cond, runtime)
+        else:
+            prefix = runtime.conditioning_prefix(t3, item.t3_cond)
+        for row in _item_rows(t3, item):
+            prefixes.append(prefix)
+            rows.append(row)
+            row_items.append(i)
+
+    # Prefix and text part are each left-padded; positions skip the padding
+    prefix_len = max(prefix[0][0].size(2) for prefix in prefixes)
+    max_len = max(row.size(0) for row in rows)
+    inputs_embeds = rows[0].new_zeros(len(rows), max_len, rows[0].size(1))
+    attention_mask = torch.zeros(len(rows), prefix_len + max_len, dtype=torch.long, device=device)
+    for r, (prefix, row) in enumerate(zip(prefixes, rows)):
+        inputs_embeds[r, max_len - row.size(0):] = row
+        attention_mask[r, prefix_len - prefix[0][0].size(2):prefix_len] = 1
+        attention_mask[r, prefix_len + max_len - row.size(0):] = 1
+    position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, prefix_len:]
+    limits = [min(max_new_tokens, item.max_new_tokens or max_new_tokens) for item in items]
+
+    decoder = runtime.decoder(t3, capacity=prefix_len + max_len + max(limits))
+    hidden = decoder.prefill(inputs_embeds, attention_mask, position_ids, prefixes, prefix_len)
+
+    processors = [
+        (
+            RepetitionPenaltyLogitsProcessor(penalty=float(item.params.repetition_penalty)),
+            MinPLogitsWarper(min_p=item.params.min_p),
+            TopPLogitsWarper(top_p=item.params.top_p),
+        )
+        for item in items
+    ]
+    generated = [torch.full((1, 1), start_token, dtype=torch.long, device=device) for _ in items]
+    active = list(range(len(items)))
+
+    for step in range(max(limits)):
+        logits_all = t3.speech_head(hidden)
+
+        # Sample one token per active item, combining its CFG pair first
+        next_tokens = {}
+        r = 0
+        for i in active:
+            params = items[i].params
+            logits = logits_all[r:r + 1]
+            r += 1
+            if params.cfg_weight > 0:
+                uncond = logits_all[r:r + 1]
+                r += 1
+                logits = logits + params.cfg_weight * (logits - uncond)
+
+            repetition_penalty, min_p, top_p = processors[i]
+            logits = repetition_penalty(generated[i], logits)
+            if params.temperature != 1.0:
+                logits = logits / params.temperature
+            logits = min_p(generated[i], logits)
+            logits = top_p(generated[i], logits)
+
+            next_token = torch.multinomial(torch.softmax(logits, dim=-1), num_samples=1)
+            generated[i] = torch.cat([generated[i], next_token], dim=1)
+            next_tokens[i] = next_token
+
+        yield next_tokens
+
+        # Drop finished items from the batch and the KV cache
+        finished = {
+            i for i in active
+            if next_tokens[i].item() == stop_token or step + 1 >= limits[i]
+        }
+        if finished:
+            active = [i for i in active if i not in finished]
+            if not active:
+                break
+            keep = torch.tensor([r for r, i in enumerate(row_items) if i not in finished], device=device)
+            row_items = [i for i in row_items if i not in finished]
+            attention_mask = attention_mask[keep]
+            decoder.select_rows(keep)
+
+        step_tokens = torch.cat([next_tokens[i] for i in row_items])
+        step_embeds = t3.speech_emb(step_tokens) + t3.speech_pos_emb.get_fixed_embedding(step + 1)
+        attention_mask = torch.cat([attention_mask, attention_mask.new_ones(len(row_items), 1)], dim=1)
+        position_ids = attention_mask.sum(-1, keepdim=True) - 1
+        hidden = decoder.step(step_embeds, attention_mask, position_ids)
+
+
+def batched_inference(
+    t3: T3,
+    items: Sequence[BatchItem],
+    max_new_tokens: int = 1000,
+    prefix_cache: Optional[ConditioningPrefixCache] = None,
+    runtime=None,
+) -> List[torch.Tensor]:
+    """
+    Decode speech tokens for every item in one batched pass.
+
+    Returns one 1D tensor of speech tokens per item, in order (ending with the
+    stop token unless the item's token limit was reached first).
+    """
+    tokens = [[] for _ in items]
+    step_iter = iter_batched_inference(
+        t3, items, max_new_tokens=max_new_tokens, prefix_cache=prefix_cache, runtime=runtime
+    )
+    for step_tokens in step_iter:
+        for i, token in step_tokens.items():
+            tokens[i].append(token)
+    return [
+        torch.cat(item_tokens, dim=1)[0] if item_tokens else torch.zeros(0, dtype=torch.long)
+        for item_tokens in tokens
+    ]
@@ -0,0 +1,123 @@
+"""
+Per-text `max_new_tokens` budgets for T3 decoding.
+
+A fixed budget of 1000 speech tokens (40 s of audio) lets a short sentence that
+misses its stop token decode for the full 1000 steps, and can cut a long chunk
+short without notice. `TokenBudget` predicts the budget of each text from its
+length and language instead, with a ratio of speech tokens per character that
+it keeps learning from completed generations. A decode that still reaches its
+budget is reported by `synthesize` as `TokenLimitReached` rather than vocoded as
+clipped audio, so callers that split text can re-split it. `generate`, which
+cannot split its text, never budgets below `FIXED_MAX_NEW_TOKENS`.
+"""
+import math
+import threading
+from typing import Dict, Optional
+
+
+# S3 speech tokens run at 25 Hz
+SPEECH_TOKENS_PER_SECOND = 25
+
+# The fixed budget every generation used before the per-text prediction
+FIXED_MAX_NEW_TOKENS = 1000
+
+# Starting speech tokens per character of the languages far from the Latin-script
+# default, on the slow side of normal speech: one CJK character is a whole
+# syllable (zh ~3.5 characters/s, ja and ko ~4-5), and Arabic and Hebrew text
+# mostly omits vowels. Observed generations replace these estimates.
+LANGUAGE_RATIOS = {
+    "zh": 7.0,
+    "ja": 6.0,
+    "ko": 5.0,
+    "ar": 2.5,
+    "he": 2.5,
+}
+
+
+class TokenLimitReached(RuntimeError):
+    """T3 reached `max_new_tokens` without emitting its stop token."""
+
+    def __init__(self, max_new_tokens: int, text: Optional[str] = None):
+        self.max_new_tokens = max_new_tokens
+        self.text = text
+        super().__init__(f"speech token budget of {max_new_tokens} reached before the end of the text")
+
+
+def reached_stop(speech_tokens, stop_token: int) -> bool:
+    """Whether a decoded token sequence ends with the stop token (i.e. was not cut by its budget)."""
+    speech_tokens = speech_tokens.view(-1)
+    return speech_tokens.numel() > 0 and int(speech_tokens[-1]) == stop_token
+
+
+class TokenBudget:
+    """
+    Predicts the speech-token budget of a text from its length and language.
+
+    Each language has a running estimate of speech tokens per character
+    (exponential moving average of the observed ratios), seeded with its
+    `language_ratios` entry, else `default_ratio`. The budget is that estimate times `margin`, plus `slack`
+    tokens for very short texts, clamped to [`min_tokens`, `max_tokens`].
+    """
+
+    def __init__(
+        self,
+        default_ratio: float = 1.8,
+        language_ratios: Optional[Dict[str, float]] = None,
+        margin: float = 1.5,
+        slack: int = 50,
+        min_tokens: int = 100,
+        max_tokens: int = 2000,
+        smoothing: float = 0.1,
+    ):
+        self.default_ratio = default_ratio
+        self.language_ratios = dict(LANGUAGE_RATIOS if language_ratios is None else language_ratios)
+        self.margin = margin
+        self.slack = slack
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.smoothing = smoothing
+        self._ratios: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(language_id: Optional[str]) -> str:
+        return (language_id or "").lower()
+
+    def ratio(self, language_id: Optional[str] = None) -> float:
+        """Current estimate of speech tokens per character for `language_id`."""
+        key = self._key(language_id)
+        with self._lock:
+            return self._ratios.get(key, self.language_ratios.get(key, self.default_ratio))
+
+    def predict(self, text: str, language_id: Optional[str] = None) -> int:
+        """`max_new_tokens` for `text`."""
+        budget = math.ceil(len(text) * self.ratio(language_id) * self.margin) + self.slack
+        return max(self.min_tokens, min(self.max_tokens, budget))
+
+    def observe(self, language_id: Optional[str], n_chars: int, n_speech_tokens: int):
+        """Update the estimate with a generation that ended on its stop token."""
+        if n_chars <= 0 or n_speech_tokens <= 0:
+            return
+        ratio = n_speech_tokens / n_chars
+        key = self._key(language_id)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            if count == 0:
+                self._ratios[key] = ratio
+            else:
+                # Plain mean while there are few samples, then a moving average
+                weight = max(self.smoothing, 1.0 / (count + 1))
+                self._ratios[key] += weight * (ratio - self._ratios[key])
+            self._counts[key] = count + 1
+
+    def observe_audio(self, language_id: Optional[str], n_chars: int, audio_seconds: float):
+        """Like `observe`, from the duration of the generated audio."""
+        self.observe(language_id, n_chars, round(audio_seconds * SPEECH_TOKENS_PER_SECOND))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                language or "default": {'ratio': ratio, 'samples': self._counts.get(language, 0)}
+                for language, ratio in self._ratios.items()
+            }
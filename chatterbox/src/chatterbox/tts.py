@@ -1,22 +1,32 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import threading
+import time
 
-import librosa
 import torch
 import perth
 import torch.nn.functional as F
 from huggingface_hub import hf_hub_download
-from safetensors.torch import load_file
 
 from .models.t3 import T3
-from .models.s3tokenizer import S3_SR, drop_invalid_tokens
+from .models.s3tokenizer import S3_SR, SPEECH_VOCAB_SIZE, drop_invalid_tokens
 from .models.s3gen import S3GEN_SR, S3Gen
 from .models.tokenizers import EnTokenizer
 from .models.voice_encoder import VoiceEncoder
 from .models.t3.modules.cond_enc import T3Cond
+from .reference import load_conditioning_reference
+from .t3_batch import BatchItem, ConditioningPrefixCache, iter_batched_inference
+from .streaming import StreamMetrics, stream_vocode
+from .token_budget import FIXED_MAX_NEW_TOKENS, TokenBudget, TokenLimitReached, reached_stop
+from .flow_steps import flow_steps, install_flow_steps_override
+from .precision import autocast, check_dtype, convert_s3gen, convert_t3, resolve_dtype
+from .checkpoints import load_weights, prepare_checkpoint, read_state_dict
+from .loading import load_components
 
 
 REPO_ID = "ResembleAI/chatterbox"
+CHECKPOINT_FILES = ["ve.safetensors", "t3_cfg.safetensors", "s3gen.safetensors", "tokenizer.json", "conds.pt"]
 
 
 def punc_norm(text: str) -> str:
@@ -103,9 +113,24 @@ class Conditionals:
         return cls(T3Cond(**kwargs['t3']), kwargs['gen'])
 
 
+@dataclass
+class GenerationParams:
+    """Per-request sampling parameters for `ChatterboxTTS.synthesize`."""
+    exaggeration: float = 0.5
+    cfg_weight: float = 0.5
+    temperature: float = 0.8
+    repetition_penalty: float = 1.2
+    min_p: float = 0.05
+    top_p: float = 1.0
+    max_new_tokens: Optional[int] = None  # None: predicted from the text (TokenBudget)
+    flow_steps: Optional[int] = None      # S3Gen flow-matching steps (None: S3Gen's default)
+
+
 class ChatterboxTTS:
     ENC_COND_LEN = 6 * S3_SR
     DEC_COND_LEN = 10 * S3GEN_SR
+    # Seconds of reference audio that conditioning actually reads
+    COND_WINDOW_SECONDS = max(DEC_COND_LEN / S3GEN_SR, ENC_COND_LEN / S3_SR)
 
     def __init__(
         self,
@@ -115,6 +140,7 @@ class ChatterboxTTS:
         tokenizer: EnTokenizer,
         device: str,
         conds: Conditionals = None,
+        dtype: str = "float32",
     ):
         self.sr = S3GEN_SR  # sample rate of synthesized audio
         self.t3 = t3
@@ -123,49 +149,78 @@ class ChatterboxTTS:
         self.tokenizer = tokenizer
         self.device = device
         self.conds = conds
+        self.dtype = dtype  # of T3 and S3Gen's flow, see `chatterbox.precision`
+        self.load_timings = {}  # seconds per component, filled by `from_local`
+        self._t3_lock = threading.Lock()
+        self.prefix_cache = ConditioningPrefixCache()
+        self.token_budget = TokenBudget(max_tokens=getattr(t3.hp, "max_speech_tokens", 2000))
+        install_flow_steps_override(s3gen)
         self.watermarker = perth.PerthImplicitWatermarker()
 
     @classmethod
-    def from_local(cls, ckpt_dir, device) -> 'ChatterboxTTS':
+    def from_local(cls, ckpt_dir, device, dtype: str = "float32") -> 'ChatterboxTTS':
+        """
+        Load the model from a checkpoint directory, with T3 and S3Gen's flow in `dtype`.
+
+        The components load concurrently on CPU and are moved to `device`
+        together at the end (see `chatterbox.loading`); the seconds spent on
+        each are kept in `model.load_timings`.
+        """
         ckpt_dir = Path(ckpt_dir)
-
-        # Always load to CPU first for non-CUDA devices to handle CUDA-saved models
-        if device in ["cpu", "mps"]:
-            map_location = torch.device('cpu')
-        else:
-            map_location = None
-
-        ve = VoiceEncoder()
-        ve.load_state_dict(
-            load_file(ckpt_dir / "ve.safetensors")
-        )
-        ve.to(device).eval()
-
-        t3 = T3()
-        t3_state = load_file(ckpt_dir / "t3_cfg.safetensors")
-        if "model" in t3_state.keys():
-            t3_state = t3_state["model"][0]
-        t3.load_state_dict(t3_state)
-        t3.to(device).eval()
-
-        s3gen = S3Gen()
-        s3gen.load_state_dict(
-            load_file(ckpt_dir / "s3gen.safetensors"), strict=False
-        )
-        s3gen.to(device).eval()
-
-        tokenizer = EnTokenizer(
-            str(ckpt_dir / "tokenizer.json")
-        )
-
-        conds = None
-        if (builtin_voice := ckpt_dir / "conds.pt").exists():
-            conds = Conditionals.load(builtin_voice, map_location=map_location).to(device)
-
-        return cls(t3, s3gen, ve, tokenizer, device, conds=conds)
+        check_dtype(dtype, device)
+        start = time.perf_counter()
+
+        def build_ve():
+            ve = VoiceEncoder()
+            load_weights(ve, ckpt_dir / "ve.safetensors")
+            return ve
+
+        def build_t3():
+            t3 = T3()
+            t3_state = read_state_dict(ckpt_dir / "t3_cfg.safetensors")
+            if "model" in t3_state.keys():
+                t3_state = t3_state["model"][0]
+            t3.load_state_dict(t3_state, assign=True)
+            return convert_t3(t3, dtype)
+
+        def build_s3gen():
+            s3gen = S3Gen()
+            load_weights(s3gen, ckpt_dir / "s3gen.safetensors", strict=False)
+            return convert_s3gen(s3gen, dtype)
+
+        def build_conds():
+            # Loaded to CPU first, which also handles CUDA-saved conditionals
+            if (builtin_voice := ckpt_dir / "conds.pt").exists():
+                return Conditionals.load(builtin_voice)
+            return None
+
+        components, timings = load_components({
+            "ve": build_ve,
+            "t3": build_t3,
+            "s3gen": build_s3gen,
+            "tokenizer": lambda: EnTokenizer(str(ckpt_dir / "tokenizer.json")),
+            "conds": build_conds,
+        })
+
+        placement_start = time.perf_counter()
+        ve = components["ve"].to(device).eval()
+        t3 = components["t3"].to(device).eval()
+        s3gen = components["s3gen"].to(device).eval()
+        conds = components["conds"].to(device) if components["conds"] is not None else None
+        timings["to_device"] = time.perf_counter() - placement_start
+
+        model = cls(t3, s3gen, ve, components["tokenizer"], device, conds=conds, dtype=dtype)
+        timings["total"] = time.perf_counter() - start
+        model.load_timings = timings
+        return model
 
     @classmethod
-    def from_pretrained(cls, device) -> 'ChatterboxTTS':
+    def from_pretrained(cls, device, dtype: str = "float32", ckpt_dir=None, offline: bool = False) -> 'ChatterboxTTS':
+        """
+        Load the model from the Hub, or from the local checkpoint directory `ckpt_dir`
+        (verified, missing files downloaded unless `offline`; see
+        `chatterbox.checkpoints.prepare_checkpoint`).
+        """
         # Check if MPS is available on macOS
         if device == "mps" and not torch.backends.mps.is_available():
             if not torch.backends.mps.is_built():
@@ -174,16 +229,20 @@ class ChatterboxTTS:
                 print("MPS not available because the current MacOS version is not 12.3+ and/or you do not have an MPS-enabled device on this machine.")
             device = "cpu"
 
-        for fpath in ["ve.safetensors", "t3_cfg.safetensors", "s3gen.safetensors", "tokenizer.json", "conds.pt"]:
-            local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath)
+        if ckpt_dir is not None:
+            ckpt_dir = prepare_checkpoint(ckpt_dir, REPO_ID, CHECKPOINT_FILES, offline=offline)
+        else:
+            for fpath in CHECKPOINT_FILES:
+                local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath)
+            ckpt_dir = Path(local_path).parent
 
-        return cls.from_local(Path(local_path).parent, device)
+        return cls.from_local(ckpt_dir, device, dtype=dtype)
 
     def prepare_conditionals(self, wav_fpath, exaggeration=0.5):
-        ## Load reference wav
-        s3gen_ref_wav, _sr = librosa.load(wav_fpath, sr=S3GEN_SR)
-
-        ref_16k_wav = librosa.resample(s3gen_ref_wav, orig_sr=S3GEN_SR, target_sr=S3_SR)
+        ## Load reference wav: one decode, the conditioning window at 24 kHz, the whole clip at 16 kHz
+        s3gen_ref_wav, ref_16k_wav = load_conditioning_reference(
+            wav_fpath, S3GEN_SR, self.COND_WINDOW_SECONDS, S3_SR
+        )
 
         s3gen_ref_wav = s3gen_ref_wav[:self.DEC_COND_LEN]
         s3gen_ref_dict = self.s3gen.embed_ref(s3gen_ref_wav, S3GEN_SR, device=self.device)
@@ -205,56 +264,75 @@ class ChatterboxTTS:
         ).to(device=self.device)
         self.conds = Conditionals(t3_cond, s3gen_ref_dict)
 
-    def generate(
-        self,
-        text,
-        repetition_penalty=1.2,
-        min_p=0.05,
-        top_p=1.0,
-        audio_prompt_path=None,
-        exaggeration=0.5,
-        cfg_weight=0.5,
-        temperature=0.8,
-    ):
-        if audio_prompt_path:
-            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
-        else:
-            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
-
-        # Update exaggeration if needed
-        if exaggeration != self.conds.t3.emotion_adv[0, 0, 0]:
-            _cond: T3Cond = self.conds.t3
-            self.conds.t3 = T3Cond(
-                speaker_emb=_cond.speaker_emb,
-                cond_prompt_speech_tokens=_cond.cond_prompt_speech_tokens,
-                emotion_adv=exaggeration * torch.ones(1, 1, 1),
-            ).to(device=self.device)
+    def _t3_cond(self, conds: Conditionals, params: GenerationParams) -> T3Cond:
+        # Fresh T3Cond per call: T3 caches prompt embeddings on the object it is given
+        return T3Cond(
+            speaker_emb=conds.t3.speaker_emb,
+            cond_prompt_speech_tokens=conds.t3.cond_prompt_speech_tokens,
+            emotion_adv=params.exaggeration * torch.ones(1, 1, 1),
+        ).to(device=self.device, dtype=resolve_dtype(self.dtype))
 
-        # Norm and tokenize text
+    def _text_tokens(self, text) -> torch.Tensor:
+        """Normalized, tokenized text wrapped in start/stop text tokens, shape (1, L)."""
         text = punc_norm(text)
         text_tokens = self.tokenizer.text_to_tokens(text).to(self.device)
 
-        if cfg_weight > 0.0:
-            text_tokens = torch.cat([text_tokens, text_tokens], dim=0)  # Need two seqs for CFG
-
         sot = self.t3.hp.start_text_token
         eot = self.t3.hp.stop_text_token
         text_tokens = F.pad(text_tokens, (1, 0), value=sot)
         text_tokens = F.pad(text_tokens, (0, 1), value=eot)
+        return text_tokens
+
+    def max_new_tokens_for(self, text, params: GenerationParams) -> int:
+        """Speech-token budget of `text`: `params.max_new_tokens`, else the `TokenBudget` prediction."""
+        if params.max_new_tokens:
+            return params.max_new_tokens
+        return self.token_budget.predict(text)
+
+    def synthesize(
+        self,
+        text,
+        conds: Conditionals,
+        params: GenerationParams = None,
+        allow_truncated: bool = False,
+    ):
+        """
+        Synthesize `text` with explicitly passed conditionals.
+
+        Unlike `generate`, this never reads or writes `self.conds`, so several
+        requests for different voices can share one loaded model. Raises
+        `TokenLimitReached` if the text did not fit its token budget, unless
+        `allow_truncated` (the decoded part is vocoded instead).
+        """
+        params = params or GenerationParams()
+        max_new_tokens = self.max_new_tokens_for(text, params)
+
+        t3_cond = self._t3_cond(conds, params)
+
+        text_tokens = self._text_tokens(text)
+        if params.cfg_weight > 0.0:
+            text_tokens = torch.cat([text_tokens, text_tokens], dim=0)  # Need two seqs for CFG
 
         with torch.inference_mode():
-            speech_tokens = self.t3.inference(
-                t3_cond=self.conds.t3,
-                text_tokens=text_tokens,
-                max_new_tokens=1000,  # TODO: use the value in config
-                temperature=temperature,
-                cfg_weight=cfg_weight,
-                repetition_penalty=repetition_penalty,
-                min_p=min_p,
-                top_p=top_p,
-            )
+            # T3.inference rebuilds its patched backend on every call, so only
+            # the token decode is serialized
+            with self._t3_lock:
+                speech_tokens = self.t3.inference(
+                    t3_cond=t3_cond,
+                    text_tokens=text_tokens,
+                    max_new_tokens=max_new_tokens,
+                    temperature=params.temperature,
+                    cfg_weight=params.cfg_weight,
+                    repetition_penalty=params.repetition_penalty,
+                    min_p=params.min_p,
+                    top_p=params.top_p,
+                )
             # Extract only the conditional batch.
             speech_tokens = speech_tokens[0]
+            if reached_stop(speech_tokens, self.t3.hp.stop_speech_token):
+                self.token_budget.observe(None, len(text), speech_tokens.numel() - 1)
+            elif not allow_truncated:
+                raise TokenLimitReached(max_new_tokens, text)
 
             # TODO: output becomes 1D
             speech_tokens = drop_invalid_tokens(speech_tokens)
@@ -263,10 +341,115 @@ class ChatterboxTTS:
 
             speech_tokens = speech_tokens.to(self.device)
 
-            wav, _ = self.s3gen.inference(
-                speech_tokens=speech_tokens,
-                ref_dict=self.conds.gen,
-            )
+            with flow_steps(params.flow_steps), autocast(self.device, self.dtype):
+                wav, _ = self.s3gen.inference(
+                    speech_tokens=speech_tokens,
+                    ref_dict=conds.gen,
+                )
             wav = wav.squeeze(0).detach().cpu().numpy()
             watermarked_wav = self.watermarker.apply_watermark(wav, sample_rate=self.sr)
-        return torch.from_numpy(watermarked_wav).unsqueeze(0)
\ No newline at end of file
+        return torch.from_numpy(watermarked_wav).unsqueeze(0)
+
+    def generate_stream(
+        self,
+        text,
+        conds: Conditionals = None,
+        params: GenerationParams = None,
+        first_window_tokens: int = 10,
+        window_tokens: int = 25,
+        context_tokens: int = 10,
+    ) -> Iterator[Tuple[torch.Tensor, StreamMetrics]]:
+        """
+        Synthesize `text` as a stream of audio blocks.
+
+        Speech tokens are vocoded in windows while T3 is still decoding (see
+        `chatterbox.streaming`), so the first block arrives after about
+        `first_window_tokens` tokens instead of after the whole utterance.
+        Yields `(wav, metrics)`: `wav` is a watermarked (1, N) block at
+        `self.sr`, `metrics` the `StreamMetrics` of the stream so far
+        (time to first audio, real-time factor). Blocks already played cannot
+        be taken back, so a text that overruns its token budget ends early.
+
+        Each decode step holds the T3 lock, like `generate_tokens`, so a
+        stream interleaves with other requests on the same model instead of
+        decoding concurrently with them; vocoding a window does not hold it.
+        A stream that ends on its stop token updates the token budget.
+        """
+        conds = conds or self.conds
+        assert conds is not None, "Please `prepare_conditionals` first or pass `conds`"
+        params = params or GenerationParams()
+        metrics = StreamMetrics()
+
+        item = BatchItem(
+            t3_cond=self._t3_cond(conds, params),
+            text_tokens=self._text_tokens(text)[0],
+            params=params,
+            max_new_tokens=self.max_new_tokens_for(text, params),
+        )
+
+        def speech_tokens():
+            decode = iter_batched_inference(
+                self.t3, [item], max_new_tokens=item.max_new_tokens, prefix_cache=self.prefix_cache
+            )
+            emitted = []
+            while True:
+                with self._t3_lock:
+                    step_tokens = next(decode, None)
+                if step_tokens is None:
+                    break
+                token = step_tokens[0].item()
+                emitted.append(token)
+                if token < SPEECH_VOCAB_SIZE:
+                    yield token
+            if reached_stop(torch.tensor(emitted, dtype=torch.long), self.t3.hp.stop_speech_token):
+                self.token_budget.observe(None, len(text), len(emitted) - 1)
+
+        def vocode_window(tokens):
+            with torch.inference_mode(), flow_steps(params.flow_steps), autocast(self.device, self.dtype):
+                wav, _ = self.s3gen.inference(
+                    speech_tokens=torch.tensor(tokens, dtype=torch.long, device=self.device),
+                    ref_dict=conds.gen,
+                )
+            return wav.squeeze(0).detach().cpu().numpy()
+
+        blocks = stream_vocode(
+            vocode_window,
+            speech_tokens(),
+            first_window=first_window_tokens,
+            window=window_tokens,
+            context=context_tokens,
+        )
+        for block in blocks:
+            watermarked_block = self.watermarker.apply_watermark(block, sample_rate=self.sr)
+            metrics.record(len(watermarked_block), self.sr)
+            yield torch.from_numpy(watermarked_block).unsqueeze(0), metrics
+
+    def generate(
+        self,
+        text,
+        repetition_penalty=1.2,
+        min_p=0.05,
+        top_p=1.0,
+        audio_prompt_path=None,
+        exaggeration=0.5,
+        cfg_weight=0.5,
+        temperature=0.8,
+    ):
+        if audio_prompt_path:
+            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
+        else:
+            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
+
+        params = GenerationParams(
+            exaggeration=exaggeration,
+            cfg_weight=cfg_weight,
+            temperature=temperature,
+            repetition_penalty=repetition_penalty,
+            min_p=min_p,
+            top_p=top_p,
+        )
+        # generate() takes whole texts and cannot re-split them: its budget never
+        # drops below the fixed limit it always had, and a decode that still
+        # reaches it is vocoded as it is. Callers that split text use synthesize().
+        params.max_new_tokens = max(FIXED_MAX_NEW_TOKENS, self.max_new_tokens_for(text, params))
+        return self.synthesize(text, self.conds, params, allow_truncated=True)
@@ -1,16 +1,18 @@
 from pathlib import Path
 
-import librosa
 import torch
 import perth
 from huggingface_hub import hf_hub_download
-from safetensors.torch import load_file
 
 from .models.s3tokenizer import S3_SR
 from .models.s3gen import S3GEN_SR, S3Gen
+from .reference import decode_audio, load_reference, resample
+from .precision import autocast, check_dtype, convert_s3gen
+from .checkpoints import load_weights, prepare_checkpoint
 
 
 REPO_ID = "ResembleAI/chatterbox"
+CHECKPOINT_FILES = ["s3gen.safetensors", "conds.pt"]
 
 
 class ChatterboxVC:
@@ -22,10 +24,12 @@ class ChatterboxVC:
         s3gen: S3Gen,
         device: str,
         ref_dict: dict=None,
+        dtype: str = "float32",
     ):
         self.sr = S3GEN_SR
         self.s3gen = s3gen
         self.device = device
+        self.dtype = dtype  # of S3Gen's flow, see `chatterbox.precision`
         self.watermarker = perth.PerthImplicitWatermarker()
         if ref_dict is None:
             self.ref_dict = None
@@ -36,8 +40,10 @@ class ChatterboxVC:
             }
 
     @classmethod
-    def from_local(cls, ckpt_dir, device) -> 'ChatterboxVC':
+    def from_local(cls, ckpt_dir, device, dtype: str = "float32") -> 'ChatterboxVC':
+        """Load the model from a checkpoint directory, with S3Gen's flow in `dtype`."""
         ckpt_dir = Path(ckpt_dir)
+        check_dtype(dtype, device)
         
         # Always load to CPU first for non-CUDA devices to handle CUDA-saved models
         if device in ["cpu", "mps"]:
@@ -51,15 +57,19 @@ class ChatterboxVC:
             ref_dict = states['gen']
 
         s3gen = S3Gen()
-        s3gen.load_state_dict(
-            load_file(ckpt_dir / "s3gen.safetensors"), strict=False
-        )
+        load_weights(s3gen, ckpt_dir / "s3gen.safetensors", strict=False)
+        convert_s3gen(s3gen, dtype)
         s3gen.to(device).eval()
 
-        return cls(s3gen, device, ref_dict=ref_dict)
+        return cls(s3gen, device, ref_dict=ref_dict, dtype=dtype)
 
     @classmethod
-    def from_pretrained(cls, device) -> 'ChatterboxVC':
+    def from_pretrained(cls, device, dtype: str = "float32", ckpt_dir=None, offline: bool = False) -> 'ChatterboxVC':
+        """
+        Load the model from the Hub, or from the local checkpoint directory `ckpt_dir`
+        (verified, missing files downloaded unless `offline`; see
+        `chatterbox.checkpoints.prepare_checkpoint`).
+        """
         # Check if MPS is available on macOS
         if device == "mps" and not torch.backends.mps.is_available():
             if not torch.backends.mps.is_built():
@@ -68,14 +78,18 @@ class ChatterboxVC:
                 print("MPS not available because the current MacOS version is not 12.3+ and/or you do not have an MPS-enabled device on this machine.")
             device = "cpu"
             
-        for fpath in ["s3gen.safetensors", "conds.pt"]:
-            local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath)
+        if ckpt_dir is not None:
+            ckpt_dir = prepare_checkpoint(ckpt_dir, REPO_ID, CHECKPOINT_FILES, offline=offline)
+        else:
+            for fpath in CHECKPOINT_FILES:
+                local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath)
+            ckpt_dir = Path(local_path).parent
 
-        return cls.from_local(Path(local_path).parent, device)
+        return cls.from_local(ckpt_dir, device, dtype=dtype)
 
     def set_target_voice(self, wav_fpath):
         ## Load reference wav
-        s3gen_ref_wav, _sr = librosa.load(wav_fpath, sr=S3GEN_SR)
+        (s3gen_ref_wav,) = load_reference(wav_fpath, (S3GEN_SR,), max_seconds=self.DEC_COND_LEN / S3GEN_SR)
 
         s3gen_ref_wav = s3gen_ref_wav[:self.DEC_COND_LEN]
         self.ref_dict = self.s3gen.embed_ref(s3gen_ref_wav, S3GEN_SR, device=self.device)
@@ -91,14 +105,16 @@ class ChatterboxVC:
             assert self.ref_dict is not None, "Please `prepare_conditionals` first or specify `target_voice_path`"
 
         with torch.inference_mode():
-            audio_16, _ = librosa.load(audio, sr=S3_SR)
+            audio_16, sr = decode_audio(audio)
+            audio_16 = resample(audio_16, sr, S3_SR)
             audio_16 = torch.from_numpy(audio_16).float().to(self.device)[None, ]
 
             s3_tokens, _ = self.s3gen.tokenizer(audio_16)
-            wav, _ = self.s3gen.inference(
-                speech_tokens=s3_tokens,
-                ref_dict=self.ref_dict,
-            )
+            with autocast(self.device, self.dtype):
+                wav, _ = self.s3gen.inference(
+                    speech_tokens=s3_tokens,
+                    ref_dict=self.ref_dict,
+                )
             wav = wav.squeeze(0).detach().cpu().numpy()
             watermarked_wav = self.watermarker.apply_watermark(wav, sample_rate=self.sr)
         return torch.from_numpy(watermarked_wav).unsqueeze(0)
\ No newline at end of file
@@ -11,6 +11,22 @@ TEXT_DIR = INPUT_DIR / "textToGenerate"  # Cartella contenente i file di testo
 OUTPUT_DIR = BASE_DIR / "output"
 OUTPUT_WAV_DIR = OUTPUT_DIR / "wav"
 OUTPUT_MP3_DIR = OUTPUT_DIR / "mp3"
+CACHE_DIR = OUTPUT_DIR / "cache"
+# Conditionals delle voci già preparati (uno per voce e revisione del modello)
+CONDS_CACHE_DIR = CACHE_DIR / "conds"
+# Memoria massima (MB) per le voci preparate tenute in RAM dal server web
+CONDS_MEMORY_BUDGET_MB = 256
+# Pesi quantizzati int8 già calcolati (vedi QUANTIZE)
+QUANTIZED_CACHE_DIR = CACHE_DIR / "quantized"
+# Grafi ONNX esportati (vedi TTS_BACKEND), una sottocartella per revisione del modello
+ONNX_DIR = CACHE_DIR / "onnx"
+# Checkpoint del modello in una cartella locale: i file già presenti vengono verificati
+# (dimensione e hash, calcolato una sola volta e salvato in manifest.json) e caricati
+# senza contattare Hugging Face; quelli mancanti vengono scaricati al primo avvio.
+# None = cache di Hugging Face (controllo online degli aggiornamenti a ogni avvio)
+CHECKPOINT_DIR = BASE_DIR / "checkpoints" / "chatterbox"
+# True = non scaricare mai (nodi senza rete): errore se in CHECKPOINT_DIR manca un file
+CHECKPOINT_OFFLINE = False
 
 # Voice Management
 # Seleziona quale voce usare (nome della cartella in input/voice/)
@@ -24,6 +40,17 @@ SELECTED_TEXT_FILE = "text_to_generate.txt"  # Cambia questo per usare file dive
 # SELECTED_TEXT_FILE = "canto1DC.txt"  # Testo lungo - usa generate_long_text.py
 
 # Audio settings
+# Come costruire il riferimento della voce:
+# "concat" = concatena tutti i file della cartella in <voce>_combined_voice.wav
+# "conditioning" = decodifica i file in ordine solo fino ai secondi usati dal
+#                  modello (10s), senza file combinato: più veloce con cartelle grandi
+REFERENCE_MODE = "concat"
+# Se True, l'embedding della voce è la media degli embedding dei singoli file
+# (calcolati una volta per file e salvati in cache): aggiungere un file alla
+# voce costa un solo embedding invece di rielaborare tutta la voce.
+# Attenzione: l'embedding (e quindi il timbro) è diverso da quello calcolato
+# sul riferimento intero, e le voci già in cache vengono ricalcolate
+POOLED_SPEAKER_EMBEDDING = False
 COMBINED_AUDIO_NAME = "combined_voice.wav"
 OUTPUT_WAV_NAME = "generated_speech.wav"
 OUTPUT_MP3_NAME = "generated_speech.mp3"
@@ -35,6 +62,27 @@ MP3_BITRATE = "192k"
 # Se False, mantiene i chunk individuali per riferimento
 CLEANUP_CHUNKS = True
 
+# Numero di chunk generati insieme in un'unica passata del modello (batch).
+# Valori più alti sfruttano meglio la CPU sui testi lunghi ma usano più memoria.
+# Attenzione: la passata a batch non ha il controllo di allineamento del modello
+# (che evita allucinazioni, ripetizioni e finali in ritardo), quindi l'audio
+# può cambiare rispetto all'originale.
+# 1 = un chunk alla volta (comportamento originale)
+CHUNK_BATCH_SIZE = 1
+
+# Pipeline tra i chunk: S3Gen vocalizza il chunk corrente mentre T3 genera il successivo.
+# Su CPU multi-core riduce il tempo totale dei testi lunghi.
+PIPELINE_CHUNKS = True
+
+# Livello di qualità della generazione: "draft", "standard" o "final"
+# draft    = anteprima veloce: niente CFG e 4 passi di S3Gen (per rivedere i testi).
+#            Senza CFG la generazione passa dal ciclo a batch, che non ha il controllo
+#            di allineamento: più rischio di allucinazioni, ripetizioni e finali in ritardo
+# standard = CFG attivo e 6 passi di S3Gen
+# final    = qualità piena, comportamento originale con CHUNK_BATCH_SIZE = 1 e
+#            DYNAMIC_BATCHING = False (per il render definitivo)
+QUALITY_TIER = "final"
+
 # TTS settings
 # Lingua del testo da sintetizzare (codice ISO 639-1)
 # Esempi: "it"=Italiano, "en"=Inglese, "fr"=Francese, "es"=Spagnolo
@@ -73,5 +121,54 @@ MIN_P = 0.05
 # Alto (0.9-1.0) = più varietà
 TOP_P = 1.0
 
+# Numero massimo di token audio generati per chunk
+# None = stimato automaticamente dalla lunghezza del testo e dalla lingua
+# (il rapporto caratteri/token viene appreso dalle generazioni completate)
+MAX_NEW_TOKENS = None
+
+# Se un chunk esaurisce i token prima della fine, viene diviso e rigenerato.
+# Numero massimo di divisioni successive dello stesso chunk: oltre, la parte
+# viene generata un'ultima volta e tenuta troncata (con un avviso), senza perdere testo
+MAX_RESPLIT_DEPTH = 2
+
 # Device settings (auto-detect by default, or set manually: "cuda", "cpu", "mps")
 DEVICE = None  # None = auto-detect
+
+# Precisione dei pesi di T3 e del modello di flusso di S3Gen: "float32" oppure "bfloat16".
+# "bfloat16" dimezza circa la memoria ed è più veloce sulle CPU con AVX512-BF16/AMX;
+# campionamento e vocoder restano in float32. Non combinabile con QUANTIZE o TTS_BACKEND = "onnx".
+DTYPE = "float32"
+
+# Quantizzazione dinamica int8 dei layer lineari di T3 (solo CPU)
+# None = pesi float32 originali, "int8" = modello più leggero e decodifica più veloce su CPU
+QUANTIZE = None
+# Se True quantizza anche il modello di flusso di S3Gen (più veloce, qualità da verificare)
+QUANTIZE_S3GEN = False
+
+# Motore di esecuzione: "torch" (predefinito) oppure "onnx" (ONNX Runtime, solo CPU).
+# Con "onnx" il primo avvio esporta i grafi in ONNX_DIR (richiede: pip install onnx onnxruntime).
+# Non combinabile con QUANTIZE.
+TTS_BACKEND = "torch"
+
+# Web server
+# Numero di richieste di generazione servite in parallelo dallo stesso modello
+WEB_CONCURRENCY_LIMIT = 4
+# Batching dinamico: le richieste che arrivano insieme (entro BATCH_MAX_WAIT_MS
+# millisecondi, fino a BATCH_MAX_SIZE) vengono generate in un'unica passata
+# del modello. Utile solo con WEB_CONCURRENCY_LIMIT > 1.
+# Attenzione: la passata a batch non ha il controllo di allineamento del modello
+# (allucinazioni, ripetizioni, finali in ritardo), anche per le richieste con CFG
+DYNAMIC_BATCHING = False
+BATCH_MAX_SIZE = 8
+BATCH_MAX_WAIT_MS = 10
+# Riscaldamento all'avvio: prima di accettare richieste il server sintetizza una frase
+# breve per lingua, così la prima richiesta reale non paga i costi di avvio del modello.
+# Nel log vengono stampati i tempi della prima esecuzione (fredda) e della seconda (a regime)
+WARMUP = True
+# Lingue da riscaldare (es. ["it", "en"]); None = solo LANGUAGE_ID
+WARMUP_LANGUAGES = None
+# Voce usata (nome della cartella in input/voice/); None = voce predefinita del modello
+WARMUP_VOICE = None
+# Secondi tra due controlli delle cartelle voci/testi (catalogo in memoria).
+# Se è installato watchdog (inotify) le modifiche sono viste subito
+CATALOG_POLL_INTERVAL = 2.0
@@ -7,10 +7,14 @@ UI construction is in utils/web_ui.py
 """
 
 import gradio as gr
-import torch
 
-from chatterbox.mtl_tts import ChatterboxMultilingualTTS
 from utils.web_handlers import (
+    # Model
+    get_device,
+    get_tts_model,
+    warmup_tts_model,
+    # Voice/text catalog
+    library_catalog,
     # Generation handlers
     refresh_voice_dropdown,
     refresh_text_dropdown,
@@ -48,20 +52,9 @@ from utils.web_ui import (
     create_history_tab,
     create_scripts_tab
 )
-from utils.gradio_helpers import get_preset_values
+from utils.gradio_helpers import get_preset_values, with_progress
 import config
 
-# Device detection
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-
-
-def load_tts_model():
-    """Load the TTS model (called once on app start)."""
-    print("Loading Chatterbox TTS model...")
-    model = ChatterboxMultilingualTTS.from_pretrained(device=DEVICE)
-    print(f"Model loaded successfully on {DEVICE}")
-    return model
-
 
 def create_interface():
     """Create the Gradio interface."""
@@ -78,9 +71,6 @@ def create_interface():
 
     with gr.Blocks(title="Chatterbox TTS Studio", css=custom_css, theme=gr.themes.Soft()) as app:
 
-        # Shared state for model
-        model_state = gr.State(None)
-
         # Header
         gr.Markdown(
             """
@@ -89,14 +79,11 @@ def create_interface():
             """
         )
 
-        # Load model on startup
-        app.load(fn=load_tts_model, inputs=[], outputs=model_state)
-
         with gr.Tabs():
 
             # ===== TAB 1: GENERATION =====
             with gr.Tab("🎬 Generate"):
-                gen = create_generation_tab(model_state)
+                gen = create_generation_tab()
 
                 # Event handlers
                 gen['voice_dropdown'].change(
@@ -137,9 +124,8 @@ def create_interface():
                 )
 
                 gen['generate_btn'].click(
-                    fn=generate_tts,
+                    fn=with_progress(generate_tts),
                     inputs=[
-                        model_state,
                         gen['voice_dropdown'],
                         gen['text_dropdown'],
                         gen['temperature'],
@@ -147,7 +133,8 @@ def create_interface():
                         gen['exaggeration'],
                         gen['repetition_penalty'],
                         gen['min_p'],
-                        gen['top_p']
+                        gen['top_p'],
+                        gen['quality']
                     ],
                     outputs=[gen['wav_output'], gen['mp3_output'], gen['status_text']]
                 )
@@ -272,13 +259,12 @@ def create_interface():
 
             # ===== TAB 4: BATCH =====
             with gr.Tab("⚡ Batch"):
-                batch = create_batch_tab(model_state)
+                batch = create_batch_tab()
 
                 # Event handler
                 batch['batch_generate_btn'].click(
-                    fn=batch_generate,
+                    fn=with_progress(batch_generate),
                     inputs=[
-                        model_state,
                         batch['batch_voice'],
                         batch['batch_text_files'],
                         batch['batch_temperature'],
@@ -286,7 +272,8 @@ def create_interface():
                         batch['batch_exaggeration'],
                         batch['batch_repetition_penalty'],
                         batch['batch_min_p'],
-                        batch['batch_top_p']
+                        batch['batch_top_p'],
+                        batch['batch_quality']
                     ],
                     outputs=[batch['batch_results']]
                 )
@@ -354,7 +341,7 @@ def create_interface():
         gr.Markdown(
             f"""
             ---
-            **Chatterbox TTS Studio** | Built with Gradio | Device: {DEVICE}
+            **Chatterbox TTS Studio** | Built with Gradio | Device: {get_device()}
             """
         )
 
@@ -370,10 +357,21 @@ if __name__ == "__main__":
     config.OUTPUT_MP3_DIR.mkdir(parents=True, exist_ok=True)
 
     print("Starting Chatterbox TTS Studio...")
-    print(f"Device: {DEVICE}")
+    print(f"Device: {get_device()}")
+
+    # Load the shared model once, before accepting requests
+    get_tts_model()
+    # Pay the first-call costs (allocators, thread pools, kernel selection)
+    # before the first request: the server only comes up after this
+    if config.WARMUP:
+        warmup_tts_model()
+
+    # Keep the voice/text catalog fresh in the background
+    library_catalog.start()
 
     app = create_interface()
-    app.queue(max_size=50, default_concurrency_limit=1).launch(
+    print("Server ready")
+    app.queue(max_size=50, default_concurrency_limit=config.WEB_CONCURRENCY_LIMIT).launch(
         server_name="0.0.0.0",
         server_port=7860,
         share=False,
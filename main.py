@@ -6,18 +6,12 @@ using multiple audio files as voice references.
 Automatically handles both short and long texts by splitting into chunks when needed.
 """
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from chatterbox.mtl_tts import ChatterboxMultilingualTTS
-from utils.audio_utils import concatenate_audio_files
+from utils.audio_utils import get_combined_reference
 from utils.text_utils import read_text_from_file
 from utils.voice_manager import get_available_voices, validate_voice
 from utils.setup_utils import detect_device, setup_directories, print_section
-from utils.audio_generator import (
-    generate_single_audio,
-    generate_chunked_audio,
-    print_generation_params
-)
 from utils.output_manager import (
     combine_audio_chunks,
     convert_wav_to_mp3,
@@ -26,6 +20,12 @@ from utils.output_manager import (
 )
 import config
 
+if TYPE_CHECKING:
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+
+# The model stack (torch, chatterbox, utils.audio_generator) is imported where
+# it is used, so voice and text errors are reported before paying for it
+
 
 # Constants
 MAX_SINGLE_PASS_CHARS = 500
@@ -69,7 +69,8 @@ def validate_and_get_voice() -> Optional[Path]:
 
 def prepare_audio_reference(voice_folder: Path) -> Optional[str]:
     """
-    Concatenate audio reference files into a single file.
+    Concatenate audio reference files into a single file (reused while the
+    voice folder is unchanged).
 
     Args:
         voice_folder: Path to folder containing voice reference files
@@ -82,7 +83,7 @@ def prepare_audio_reference(voice_folder: Path) -> Optional[str]:
     combined_audio_path = config.OUTPUT_DIR / f"{config.SELECTED_VOICE}_{config.COMBINED_AUDIO_NAME}"
 
     try:
-        combined_audio_path = concatenate_audio_files(
+        combined_audio_path = get_combined_reference(
             audio_folder=voice_folder,
             output_path=str(combined_audio_path),
             target_sr=config.SAMPLE_RATE
@@ -130,10 +131,11 @@ def load_text_file() -> Optional[str]:
 
 
 def process_short_text(
-    model: ChatterboxMultilingualTTS,
+    model: "ChatterboxMultilingualTTS",
     text: str,
-    audio_prompt_path: str,
-    filenames: dict
+    audio_prompt_path: Optional[str],
+    filenames: dict,
+    voice_folder: Optional[Path] = None
 ) -> Optional[Path]:
     """
     Process short text with single-pass generation.
@@ -143,10 +145,13 @@ def process_short_text(
         text: Text to synthesize
         audio_prompt_path: Path to audio reference
         filenames: Dictionary with output filenames
+        voice_folder: Folder with the voice clips (keys the conditionals cache)
 
     Returns:
         Optional[Path]: Path to generated WAV file
     """
+    from utils.audio_generator import generate_single_audio, print_generation_params
+
     print_section("STEP 3: Speech Synthesis (Single-pass)")
     print_generation_params()
 
@@ -157,15 +162,17 @@ def process_short_text(
         text=text,
         audio_prompt_path=audio_prompt_path,
         output_path=output_wav_path,
+        voice_folder=voice_folder,
         verbose=True
     )
 
 
 def process_long_text(
-    model: ChatterboxMultilingualTTS,
+    model: "ChatterboxMultilingualTTS",
     text: str,
-    audio_prompt_path: str,
-    filenames: dict
+    audio_prompt_path: Optional[str],
+    filenames: dict,
+    voice_folder: Optional[Path] = None
 ) -> tuple[Optional[Path], int]:
     """
     Process long text with chunked generation.
@@ -175,10 +182,13 @@ def process_long_text(
         text: Text to synthesize
         audio_prompt_path: Path to audio reference
         filenames: Dictionary with output filenames
+        voice_folder: Folder with the voice clips (keys the conditionals cache)
 
     Returns:
         tuple: (Path to final combined WAV file, number of chunks generated)
     """
+    from utils.audio_generator import generate_chunked_audio
+
     print_section("STEP 3: Speech Synthesis (Chunked Mode)")
 
     # Generate chunks
@@ -189,6 +199,7 @@ def process_long_text(
         output_dir=config.OUTPUT_WAV_DIR,
         base_filename=filenames['base'],
         max_chars=MAX_SINGLE_PASS_CHARS,
+        voice_folder=voice_folder,
         verbose=True
     )
 
@@ -216,7 +227,7 @@ def process_long_text(
 
 def print_summary(
     text: str,
-    combined_audio_path: str,
+    combined_audio_path: Optional[str],
     output_wav: Path,
     output_mp3: Optional[Path],
     is_long_text: bool
@@ -226,7 +237,7 @@ def print_summary(
 
     Args:
         text: Original text that was synthesized
-        combined_audio_path: Path to audio reference file
+        combined_audio_path: Path to audio reference file (None in conditioning mode)
         output_wav: Path to generated WAV file
         output_mp3: Path to generated MP3 file (if any)
         is_long_text: Whether text was processed as long text
@@ -237,7 +248,8 @@ def print_summary(
     print(f"Text: {config.SELECTED_TEXT_FILE} ({len(text)} characters)")
     print(f"Processing mode: {'Chunked' if is_long_text else 'Single-pass'}")
     print(f"\nGenerated files:")
-    print(f"  - Audio reference: {combined_audio_path}")
+    if combined_audio_path:
+        print(f"  - Audio reference: {combined_audio_path}")
     print(f"  - Speech synthesis WAV: {output_wav}")
 
     if output_mp3 and output_mp3.exists():
@@ -270,12 +282,29 @@ def main() -> None:
 
     # Load model
     print_section("LOADING MODEL")
-    model = ChatterboxMultilingualTTS.from_pretrained(device=device)
+    from chatterbox.loading import format_timings
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+
+    model = ChatterboxMultilingualTTS.from_pretrained(
+        device=device,
+        quantize=config.QUANTIZE,
+        quantize_s3gen=config.QUANTIZE_S3GEN,
+        quantize_cache_dir=config.QUANTIZED_CACHE_DIR,
+        backend=config.TTS_BACKEND,
+        onnx_dir=config.ONNX_DIR,
+        dtype=config.DTYPE,
+        ckpt_dir=config.CHECKPOINT_DIR,
+        offline=config.CHECKPOINT_OFFLINE
+    )
+    print(f"✓ Model loaded ({format_timings(model.load_timings)})")
+    model.enable_conds_cache(config.CONDS_CACHE_DIR)
 
-    # Prepare audio reference
-    combined_audio_path = prepare_audio_reference(voice_folder)
-    if combined_audio_path is None:
-        return
+    # Prepare audio reference ("conditioning" mode streams the clips instead)
+    combined_audio_path = None
+    if config.REFERENCE_MODE == "concat":
+        combined_audio_path = prepare_audio_reference(voice_folder)
+        if combined_audio_path is None:
+            return
 
     # Load text
     text = load_text_file()
@@ -298,10 +327,14 @@ def main() -> None:
     if is_long_text:
         print(f"\n📚 Mode: LONG TEXT (chunked processing)")
         print(f"Text will be split into chunks of max {MAX_SINGLE_PASS_CHARS} characters")
-        output_wav, chunk_count = process_long_text(model, text, combined_audio_path, filenames)
+        output_wav, chunk_count = process_long_text(
+            model, text, combined_audio_path, filenames, voice_folder=Path(voice_folder)
+        )
     else:
         print(f"\n📝 Mode: SHORT TEXT (single-pass)")
-        output_wav = process_short_text(model, text, combined_audio_path, filenames)
+        output_wav = process_short_text(
+            model, text, combined_audio_path, filenames, voice_folder=Path(voice_folder)
+        )
 
     if output_wav is None:
         print("\n❌ Audio generation failed")
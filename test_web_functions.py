@@ -18,6 +18,7 @@ from utils.voice_manager import (
     get_voice_details
 )
 from utils.history_manager import HistoryManager
+from utils.audio_utils import build_folder_manifest
 import config
 
 
@@ -104,7 +105,10 @@ def test_history_manager():
         parameters={
             'temperature': 0.8,
             'cfg_weight': 0.5
-        }
+        },
+        language="it",
+        audio_seconds=19.5,
+        speech_samples=[("it", 150, 11.0), ("it", 100, 7.5)]
     )
 
     # Get all generations
@@ -117,12 +121,49 @@ def test_history_manager():
     for key, value in stats.items():
         print(f"  - {key}: {value}")
 
+    # Speech rate samples (for the token budget)
+    samples = hm.get_speech_rate_samples()
+    print(f"\nSpeech rate samples: {samples}")
+    # Per chunk, without the silence counted in audio_seconds
+    assert samples == [("it", 150, 11.0), ("it", 100, 7.5)]
+
     # Clean up test file
     if history_file.exists():
         history_file.unlink()
         print(f"\nTest history file removed: {history_file}")
 
 
+def test_reference_manifest():
+    """Test that the combined-reference manifest tracks folder changes."""
+    import os
+    import tempfile
+
+    print("\n=== Testing Reference Manifest ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        (folder / "a.wav").write_bytes(b"RIFF0000")
+        (folder / "notes.txt").write_text("ignored")
+
+        first = build_folder_manifest(folder, target_sr=24000)
+        assert [f['name'] for f in first['files']] == ["a.wav"]
+        assert build_folder_manifest(folder, target_sr=24000) == first
+        print("Unchanged folder -> same manifest")
+
+        assert build_folder_manifest(folder, target_sr=16000) != first
+        print("Different sample rate -> new manifest")
+
+        (folder / "b.ogg").write_bytes(b"OggS")
+        assert build_folder_manifest(folder, target_sr=24000) != first
+        print("Added clip -> new manifest")
+
+        second = build_folder_manifest(folder, target_sr=24000)
+        st = (folder / "a.wav").stat()
+        os.utime(folder / "a.wav", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert build_folder_manifest(folder, target_sr=24000) != second
+        print("Touched clip -> new manifest")
+
+
 def test_directory_structure():
     """Test and create directory structure."""
     print("\n=== Testing Directory Structure ===")
@@ -145,6 +186,163 @@ def test_directory_structure():
             print(f"  -> Created: {directory}")
 
 
+def test_voice_index():
+    """Test that the voice index persists clip metadata and follows renames."""
+    import tempfile
+    import numpy as np
+    import soundfile as sf
+    from utils.voice_index import VoiceIndex
+
+    print("\n=== Testing Voice Index ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        voice_path = Path(tmp) / "voices" / "testVoice"
+        voice_path.mkdir(parents=True)
+        sf.write(voice_path / "a.wav", np.zeros(8000, dtype=np.float32), 16000)
+        index_file = Path(tmp) / "voice_index.json"
+
+        files = VoiceIndex(index_file).get_files(voice_path)
+        assert [f['name'] for f in files] == ["a.wav"]
+        assert abs(files[0]['duration'] - 0.5) < 1e-6 and files[0]['sample_rate'] == 16000
+
+        # A fresh index reads the entry back from disk
+        index = VoiceIndex(index_file)
+        assert index.get_files(voice_path) == files
+
+        renamed_path = voice_path.with_name("renamedVoice")
+        voice_path.rename(renamed_path)
+        index.rename_voice(voice_path, renamed_path)
+        assert [f['name'] for f in VoiceIndex(index_file).get_files(renamed_path)] == ["a.wav"]
+
+    print("Voice index OK")
+
+
+def test_light_imports():
+    """Test that the voice/text management modules and web handlers do not import heavy libraries."""
+    import subprocess
+    import sys
+
+    print("\n=== Testing Light Imports ===")
+
+    modules = [
+        "utils.gradio_helpers", "utils.voice_manager", "utils.history_manager",
+        "utils.library_catalog", "utils.output_manager", "utils.setup_utils",
+        "utils.web_handlers"
+    ]
+    heavy = ["torch", "torchaudio", "librosa", "numpy", "gradio", "chatterbox.mtl_tts"]
+    code = (
+        f"import sys; import {', '.join(modules)}; "
+        f"print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    )
+    # Fresh interpreter: this test module itself may already have them loaded
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    assert not loaded, f"Heavy modules imported at top level: {loaded}"
+    print("No heavy imports")
+
+
+def test_batch_item_rows():
+    """Test that batched T3 input rows match T3.prepare_input_embeds for one item."""
+    import torch
+    from chatterbox.models.t3 import T3
+    from chatterbox.models.t3.modules.cond_enc import T3Cond
+    from chatterbox.mtl_tts import GenerationParams
+    from chatterbox.t3_batch import BatchItem, _item_rows
+
+    print("\n=== Testing Batched T3 Input Rows ===")
+
+    torch.manual_seed(0)
+    t3 = T3().eval()
+    hp = t3.hp
+    t3_cond = T3Cond(
+        speaker_emb=torch.randn(1, hp.speaker_embed_size),
+        cond_prompt_speech_tokens=torch.randint(0, 100, (1, hp.speech_cond_prompt_len)),
+        emotion_adv=0.5 * torch.ones(1, 1, 1),
+    )
+    text_tokens = torch.tensor([hp.start_text_token, 10, 20, 30, hp.stop_text_token])
+
+    with torch.inference_mode():
+        rows = _item_rows(t3, BatchItem(t3_cond, text_tokens, GenerationParams(cfg_weight=0.5)))
+        # T3.inference: doubled text for CFG, the start speech token, then BOS once more
+        embeds, len_cond = t3.prepare_input_embeds(
+            t3_cond=t3_cond,
+            text_tokens=text_tokens.view(1, -1).repeat(2, 1),
+            speech_tokens=torch.full((2, 1), hp.start_speech_token, dtype=torch.long),
+            cfg_weight=0.5,
+        )
+        bos = t3.speech_emb(torch.tensor([[hp.start_speech_token]]))[0] + t3.speech_pos_emb.get_fixed_embedding(0)[0]
+
+    assert len(rows) == 2
+    for row, expected in zip(rows, embeds[:, len_cond:]):
+        assert row.shape == (len(text_tokens) + 2, embeds.size(2))
+        assert torch.allclose(row[:-1], expected, atol=1e-6)
+        assert torch.allclose(row[-1:], bos, atol=1e-6)
+    print("Conditional and unconditional rows OK")
+
+
+def test_batch_scheduler_stats():
+    """Test that failed batches, single-request ones included, are counted in the scheduler stats."""
+    from chatterbox.batching import BatchScheduler
+
+    print("\n=== Testing Batch Scheduler Stats ===")
+
+    def decode(texts, conds_list, params_list):
+        if "bad" in texts:
+            raise ValueError("bad request")
+        return [text.upper() for text in texts]
+
+    scheduler = BatchScheduler(decode, max_batch_size=4, max_wait_ms=0)
+    try:
+        assert scheduler.submit("ok", None).result(timeout=5) == "OK"
+        try:
+            scheduler.submit("bad", None).result(timeout=5)
+            raise AssertionError("failing request did not raise")
+        except ValueError:
+            pass
+    finally:
+        scheduler.close()
+
+    stats = scheduler.stats()
+    assert stats["batches"] == 2, stats
+    assert stats["requests"] == 2, stats
+    print(f"Stats: {stats}")
+
+
+def test_token_budget_cjk():
+    """Test that Chinese and Japanese texts get a budget above their realistic speech-token count."""
+    from chatterbox.token_budget import SPEECH_TOKENS_PER_SECOND, TokenBudget
+
+    print("\n=== Testing Token Budget (CJK) ===")
+
+    budget = TokenBudget()
+    # (language, text, characters spoken per second at a slow, realistic pace)
+    samples = [
+        ("zh", "今天天气很好，我们一起去公园散步吧。晚上回家以后，我们再一起做饭，然后看一部电影。", 3.5),
+        ("ja", "今日はとても良い天気なので、公園まで散歩に行きましょう。", 5.0),
+    ]
+    for language, text, chars_per_second in samples:
+        expected = len(text) / chars_per_second * SPEECH_TOKENS_PER_SECOND
+        predicted = budget.predict(text, language)
+        assert predicted >= expected, f"{language}: budget {predicted} < {expected:.0f} tokens"
+        print(f"{language}: {len(text)} chars, budget {predicted} >= {expected:.0f} tokens")
+
+
+def test_text_splitter_cjk():
+    """Test that Chinese text splits at full-width sentence endings and, without them, by characters."""
+    from utils.text_splitter import split_text_smart
+
+    print("\n=== Testing Text Splitter (CJK) ===")
+
+    text = "今天天气很好。我们去公园散步吧！晚上一起做饭？"
+    chunks = split_text_smart(text, max_chars=10)
+    assert chunks == ["今天天气很好。", "我们去公园散步吧！", "晚上一起做饭？"], chunks
+
+    text = "今天天气很好我们一起去公园散步吧"
+    chunks = split_text_smart(text, max_chars=8)
+    assert chunks == ["今天天气很好我们", "一起去公园散步吧"], chunks
+    print(f"Split into {len(chunks)} chunks")
+
+
 def main():
     """Run all tests."""
     print("=" * 60)
@@ -158,6 +356,13 @@ def main():
         test_parameter_presets()
         test_filename_sanitization()
         test_history_manager()
+        test_reference_manifest()
+        test_voice_index()
+        test_light_imports()
+        test_batch_item_rows()
+        test_batch_scheduler_stats()
+        test_token_budget_cjk()
+        test_text_splitter_cjk()
 
         print("\n" + "=" * 60)
         print("All tests completed!")
@@ -7,52 +7,233 @@ including both single-pass and chunked processing for long texts.
 import torch
 import torchaudio as ta
 from pathlib import Path
-from typing import Optional, List
-
-from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+from typing import Iterator, List, Optional, Tuple
+
+from chatterbox.mtl_tts import (
+    ChatterboxMultilingualTTS,
+    Conditionals,
+    GenerationParams,
+    S3GEN_SR,
+    S3_SR
+)
+from chatterbox.pipeline import pipelined_synthesize
+from chatterbox.reference import resample
+from chatterbox.token_budget import TokenLimitReached
+from utils.audio_utils import list_audio_files, load_reference_window
 from utils.text_splitter import split_text_smart
 import config
 
 
+# Quality tiers trade compute for fidelity. "cfg_weight" replaces the requested
+# CFG weight (0 skips the unconditional T3 branch); "flow_steps" sets the S3Gen
+# flow-matching steps. None keeps the requested value / S3Gen's default.
+# Without CFG the decode takes the batched loop, which has no alignment analyzer:
+# "draft" gives up the guard against hallucination and a late end of speech.
+QUALITY_TIERS = {
+    "draft": {"cfg_weight": 0.0, "flow_steps": 4},
+    "standard": {"cfg_weight": None, "flow_steps": 6},
+    "final": {"cfg_weight": None, "flow_steps": None},
+}
+
+
+def build_generation_params(
+    temperature: Optional[float] = None,
+    cfg_weight: Optional[float] = None,
+    exaggeration: Optional[float] = None,
+    repetition_penalty: Optional[float] = None,
+    min_p: Optional[float] = None,
+    top_p: Optional[float] = None,
+    quality: Optional[str] = None
+) -> GenerationParams:
+    """
+    Build generation parameters, using config values for anything not set.
+
+    Args:
+        quality: Quality tier from QUALITY_TIERS (default: from config)
+
+    Returns:
+        GenerationParams: Parameters for model.synthesize
+    """
+    quality = quality or config.QUALITY_TIER
+    if quality not in QUALITY_TIERS:
+        raise ValueError(f"Unknown quality tier '{quality}'. Available: {', '.join(QUALITY_TIERS)}")
+    tier = QUALITY_TIERS[quality]
+
+    cfg_weight = cfg_weight if cfg_weight is not None else config.CFG_WEIGHT
+    if tier["cfg_weight"] is not None:
+        cfg_weight = tier["cfg_weight"]
+
+    return GenerationParams(
+        language_id=config.LANGUAGE_ID,
+        temperature=temperature if temperature is not None else config.TEMPERATURE,
+        cfg_weight=cfg_weight,
+        exaggeration=exaggeration if exaggeration is not None else config.EXAGGERATION,
+        repetition_penalty=repetition_penalty if repetition_penalty is not None else config.REPETITION_PENALTY,
+        min_p=min_p if min_p is not None else config.MIN_P,
+        top_p=top_p if top_p is not None else config.TOP_P,
+        max_new_tokens=config.MAX_NEW_TOKENS,
+        flow_steps=tier["flow_steps"],
+    )
+
+
+def prepare_voice_conditionals(
+    model: ChatterboxMultilingualTTS,
+    audio_prompt_path: Optional[str],
+    voice_folder: Optional[Path] = None,
+    exaggeration: Optional[float] = None
+) -> Conditionals:
+    """
+    Prepare the voice conditionals once, so that every chunk can reuse them.
+
+    When `voice_folder` is given the entry is cached under the folder's clips.
+    With config.REFERENCE_MODE == "conditioning" the clips are streamed in
+    order and decoding stops once the model's conditioning window is filled,
+    so `audio_prompt_path` is not needed; with "concat" the combined reference
+    at `audio_prompt_path` is used. With config.POOLED_SPEAKER_EMBEDDING the
+    speaker embedding is pooled from per-clip embeddings cached on each file,
+    so adding a clip to the folder only embeds that clip.
+
+    Args:
+        model: TTS model instance
+        audio_prompt_path: Path to audio reference file (None in conditioning mode)
+        voice_folder: Folder with the voice clips the reference was built from
+        exaggeration: Exaggeration level (default: from config)
+
+    Returns:
+        Conditionals: Voice conditioning to pass to generate_audio_chunk
+    """
+    exaggeration = exaggeration if exaggeration is not None else config.EXAGGERATION
+
+    if voice_folder is None:
+        return model.get_conditionals(audio_prompt_path, exaggeration=exaggeration)
+
+    reference_mode = config.REFERENCE_MODE
+    pooled = config.POOLED_SPEAKER_EMBEDDING
+    voice_files = list_audio_files(voice_folder)
+    variant = f"{reference_mode}+pooled" if pooled else reference_mode
+    cache_key = model.conds_cache_key(voice_files, variant=variant)
+
+    def compute() -> Conditionals:
+        speaker_emb = model.voice_embedding(voice_files) if pooled else None
+        if reference_mode == "conditioning":
+            ref_wav = load_reference_window(voice_folder, model.COND_WINDOW_SECONDS, target_sr=S3GEN_SR)
+            ref_16k_wav = resample(ref_wav, S3GEN_SR, S3_SR)
+            return model.compute_conditionals_from_wavs(
+                ref_wav, ref_16k_wav, exaggeration=exaggeration, speaker_emb=speaker_emb
+            )
+        return model.compute_conditionals(audio_prompt_path, exaggeration=exaggeration, speaker_emb=speaker_emb)
+
+    return model.cached_conditionals(cache_key, compute, exaggeration=exaggeration)
+
+
 def generate_audio_chunk(
     model: ChatterboxMultilingualTTS,
     text: str,
-    audio_prompt_path: str,
+    conds: Conditionals,
     temperature: Optional[float] = None,
     cfg_weight: Optional[float] = None,
     exaggeration: Optional[float] = None,
     repetition_penalty: Optional[float] = None,
     min_p: Optional[float] = None,
-    top_p: Optional[float] = None
+    top_p: Optional[float] = None,
+    quality: Optional[str] = None
 ) -> torch.Tensor:
     """
     Generate audio for a single text chunk.
 
+    Uses the stateless model.synthesize, so concurrent calls on a shared
+    model do not interfere with each other.
+
     Args:
         model: TTS model instance
         text: Text to synthesize
-        audio_prompt_path: Path to audio reference file
+        conds: Voice conditionals from prepare_voice_conditionals
         temperature: Temperature for generation (default: from config)
         cfg_weight: CFG weight (default: from config)
         exaggeration: Exaggeration level (default: from config)
         repetition_penalty: Repetition penalty (default: from config)
         min_p: Min P value (default: from config)
         top_p: Top P value (default: from config)
+        quality: Quality tier (default: from config)
 
     Returns:
         torch.Tensor: Generated audio waveform
     """
-    return model.generate(
-        text,
-        language_id=config.LANGUAGE_ID,
-        audio_prompt_path=audio_prompt_path,
-        temperature=temperature if temperature is not None else config.TEMPERATURE,
-        cfg_weight=cfg_weight if cfg_weight is not None else config.CFG_WEIGHT,
-        exaggeration=exaggeration if exaggeration is not None else config.EXAGGERATION,
-        repetition_penalty=repetition_penalty if repetition_penalty is not None else config.REPETITION_PENALTY,
-        min_p=min_p if min_p is not None else config.MIN_P,
-        top_p=top_p if top_p is not None else config.TOP_P,
+    params = build_generation_params(
+        temperature=temperature,
+        cfg_weight=cfg_weight,
+        exaggeration=exaggeration,
+        repetition_penalty=repetition_penalty,
+        min_p=min_p,
+        top_p=top_p,
+        quality=quality
     )
+    return synthesize_with_resplit(model, text, conds, params)
+
+
+def synthesize_with_resplit(
+    model: ChatterboxMultilingualTTS,
+    text: str,
+    conds: Conditionals,
+    params: GenerationParams,
+    depth: int = 0
+) -> torch.Tensor:
+    """
+    Synthesize `text`, splitting it when it does not fit its token budget.
+
+    When T3 reaches the token budget before its stop token, the text is split
+    in about two halves (at sentence, word, then character boundaries), each
+    half is synthesized the same way and the audio is concatenated, instead of
+    returning clipped audio. A part that still overruns after
+    config.MAX_RESPLIT_DEPTH splits is decoded once more and kept truncated,
+    with a warning, so no text is dropped.
+
+    Args:
+        model: TTS model instance
+        text: Text to synthesize
+        conds: Voice conditionals from prepare_voice_conditionals
+        params: Generation parameters
+        depth: Number of splits already applied to this text
+
+    Returns:
+        torch.Tensor: Generated audio waveform
+    """
+    try:
+        return model.synthesize(text, conds, params)
+    except TokenLimitReached:
+        return resynthesize_split(model, text, conds, params, depth)
+
+
+def resynthesize_split(
+    model: ChatterboxMultilingualTTS,
+    text: str,
+    conds: Conditionals,
+    params: GenerationParams,
+    depth: int = 0
+) -> torch.Tensor:
+    """
+    Split `text` that overran its token budget and synthesize the parts.
+
+    Past config.MAX_RESPLIT_DEPTH splits (or when the text cannot be split)
+    the text is decoded once more and its truncated audio is returned.
+
+    Args:
+        model: TTS model instance
+        text: Text that reached the token budget
+        conds: Voice conditionals from prepare_voice_conditionals
+        params: Generation parameters
+        depth: Number of splits already applied to this text
+
+    Returns:
+        torch.Tensor: Concatenated audio of the parts
+    """
+    parts = split_text_smart(text, max_chars=max(1, (len(text) + 1) // 2))
+    if depth >= config.MAX_RESPLIT_DEPTH or len(parts) < 2:
+        print(f"  ⚠ Token budget still reached after {depth} splits, keeping truncated audio: {text[:60]}...")
+        return model.synthesize(text, conds, params, allow_truncated=True)
+
+    wavs = [synthesize_with_resplit(model, part, conds, params, depth + 1) for part in parts]
+    return torch.cat(wavs, dim=-1)
 
 
 def save_audio_chunk(
@@ -75,18 +256,42 @@ def save_audio_chunk(
     return str(output_path)
 
 
+def record_speech_sample(
+    speech_samples: Optional[List[Tuple[str, int, float]]],
+    params: GenerationParams,
+    text: str,
+    wav: torch.Tensor,
+    sample_rate: int
+) -> None:
+    """
+    Append (language, characters, audio seconds) of a synthesized chunk to `speech_samples`.
+
+    Args:
+        speech_samples: List collecting the samples (nothing is recorded when None)
+        params: Generation parameters the chunk was synthesized with
+        text: Text of the chunk
+        wav: Audio of the chunk
+        sample_rate: Audio sample rate
+    """
+    if speech_samples is not None:
+        speech_samples.append((params.language_id, len(text), wav.shape[-1] / sample_rate))
+
+
 def generate_single_audio(
     model: ChatterboxMultilingualTTS,
     text: str,
-    audio_prompt_path: str,
+    audio_prompt_path: Optional[str],
     output_path: Path,
+    voice_folder: Optional[Path] = None,
     temperature: Optional[float] = None,
     cfg_weight: Optional[float] = None,
     exaggeration: Optional[float] = None,
     repetition_penalty: Optional[float] = None,
     min_p: Optional[float] = None,
     top_p: Optional[float] = None,
-    verbose: bool = True
+    quality: Optional[str] = None,
+    verbose: bool = True,
+    speech_samples: Optional[List[Tuple[str, int, float]]] = None
 ) -> Optional[Path]:
     """
     Generate audio for short text (single pass).
@@ -94,15 +299,19 @@ def generate_single_audio(
     Args:
         model: TTS model instance
         text: Text to synthesize
-        audio_prompt_path: Path to audio reference file
+        audio_prompt_path: Path to audio reference file (None in conditioning mode)
         output_path: Path where to save the generated audio
+        voice_folder: Folder with the voice clips (keys the conditionals cache)
         temperature: Temperature for generation (default: from config)
         cfg_weight: CFG weight (default: from config)
         exaggeration: Exaggeration level (default: from config)
         repetition_penalty: Repetition penalty (default: from config)
         min_p: Min P value (default: from config)
         top_p: Top P value (default: from config)
+        quality: Quality tier (default: from config)
         verbose: Whether to print progress information
+        speech_samples: List that receives the (language, characters, audio
+            seconds) of the generated text (see record_speech_sample)
 
     Returns:
         Optional[Path]: Path to generated WAV file
@@ -111,16 +320,20 @@ def generate_single_audio(
         print("\nGenerating audio...")
 
     try:
-        wav = generate_audio_chunk(
-            model, text, audio_prompt_path,
+        conds = prepare_voice_conditionals(model, audio_prompt_path, voice_folder, exaggeration)
+        params = build_generation_params(
             temperature=temperature,
             cfg_weight=cfg_weight,
             exaggeration=exaggeration,
             repetition_penalty=repetition_penalty,
             min_p=min_p,
-            top_p=top_p
+            top_p=top_p,
+            quality=quality
         )
+
+        wav = synthesize_with_resplit(model, text, conds, params)
         save_audio_chunk(wav, model.sr, output_path)
+        record_speech_sample(speech_samples, params, text, wav, model.sr)
 
         if verbose:
             print(f"✓ Audio saved: {output_path.name}")
@@ -136,17 +349,22 @@ def generate_single_audio(
 def generate_chunked_audio(
     model: ChatterboxMultilingualTTS,
     text: str,
-    audio_prompt_path: str,
+    audio_prompt_path: Optional[str],
     output_dir: Path,
     base_filename: str,
     max_chars: int = 500,
+    voice_folder: Optional[Path] = None,
     temperature: Optional[float] = None,
     cfg_weight: Optional[float] = None,
     exaggeration: Optional[float] = None,
     repetition_penalty: Optional[float] = None,
     min_p: Optional[float] = None,
     top_p: Optional[float] = None,
-    verbose: bool = True
+    batch_size: Optional[int] = None,
+    pipeline: Optional[bool] = None,
+    quality: Optional[str] = None,
+    verbose: bool = True,
+    speech_samples: Optional[List[Tuple[str, int, float]]] = None
 ) -> List[Path]:
     """
     Generate audio for long text (chunked processing).
@@ -154,17 +372,23 @@ def generate_chunked_audio(
     Args:
         model: TTS model instance
         text: Text to synthesize
-        audio_prompt_path: Path to audio reference file
+        audio_prompt_path: Path to audio reference file (None in conditioning mode)
         output_dir: Directory where to save the chunks
         base_filename: Base name for chunk files (without extension)
         max_chars: Maximum characters per chunk
+        voice_folder: Folder with the voice clips (keys the conditionals cache)
         temperature: Temperature for generation (default: from config)
         cfg_weight: CFG weight (default: from config)
         exaggeration: Exaggeration level (default: from config)
         repetition_penalty: Repetition penalty (default: from config)
         min_p: Min P value (default: from config)
         top_p: Top P value (default: from config)
+        batch_size: Chunks decoded together in one T3 pass (default: from config)
+        pipeline: Overlap T3 and S3Gen across chunks (default: from config)
+        quality: Quality tier (default: from config)
         verbose: Whether to print progress information
+        speech_samples: List that receives the (language, characters, audio
+            seconds) of every saved chunk (see record_speech_sample)
 
     Returns:
         List[Path]: List of paths to generated chunk files
@@ -177,30 +401,54 @@ def generate_chunked_audio(
         avg_length = sum(len(c) for c in chunks) // len(chunks)
         print(f"Average chunk length: {avg_length} characters")
 
+    # Voice conditioning is the same for every chunk: compute it once
+    conds = prepare_voice_conditionals(model, audio_prompt_path, voice_folder, exaggeration)
+    params = build_generation_params(
+        temperature=temperature,
+        cfg_weight=cfg_weight,
+        exaggeration=exaggeration,
+        repetition_penalty=repetition_penalty,
+        min_p=min_p,
+        top_p=top_p,
+        quality=quality
+    )
+
+    batch_size = max(1, batch_size if batch_size is not None else config.CHUNK_BATCH_SIZE)
+    pipeline = pipeline if pipeline is not None else config.PIPELINE_CHUNKS
+
+    if pipeline:
+        # T3 decodes the next chunks while S3Gen vocodes the current one
+        results = pipelined_synthesize(
+            model, chunks, conds, params,
+            batch_size=batch_size
+        )
+    else:
+        results = synthesize_chunks(model, chunks, conds, params, batch_size=batch_size)
+
     chunk_files = []
 
-    for i, chunk in enumerate(chunks, 1):
+    for index, wav, error in results:
+        i = index + 1
+        chunk = chunks[index]
+
         if verbose:
-            print(f"\n[{i}/{len(chunks)}] Generating chunk {i}...")
+            print(f"\n[{i}/{len(chunks)}] Chunk {i}")
             print(f"  Characters: {len(chunk)}")
             print(f"  Preview: {chunk[:60]}...")
 
         try:
-            # Generate audio for chunk
-            wav = generate_audio_chunk(
-                model, chunk, audio_prompt_path,
-                temperature=temperature,
-                cfg_weight=cfg_weight,
-                exaggeration=exaggeration,
-                repetition_penalty=repetition_penalty,
-                min_p=min_p,
-                top_p=top_p
-            )
+            if isinstance(error, TokenLimitReached):
+                if verbose:
+                    print("  ⚠ Token budget reached, splitting chunk and regenerating...")
+                wav = resynthesize_split(model, chunk, conds, params)
+            elif error is not None:
+                raise error
 
             # Save chunk
             chunk_filename = f"{base_filename}_chunk{i:03d}.wav"
             chunk_path = output_dir / chunk_filename
             save_audio_chunk(wav, model.sr, chunk_path)
+            record_speech_sample(speech_samples, params, chunk, wav, model.sr)
 
             chunk_files.append(chunk_path)
 
@@ -215,10 +463,48 @@ def generate_chunked_audio(
     return chunk_files
 
 
+def synthesize_chunks(
+    model: ChatterboxMultilingualTTS,
+    chunks: List[str],
+    conds: Conditionals,
+    params: GenerationParams,
+    batch_size: int = 1
+) -> Iterator[Tuple[int, Optional[torch.Tensor], Optional[Exception]]]:
+    """
+    Synthesize chunks in order, `batch_size` chunks per T3 pass.
+
+    Args:
+        model: TTS model instance
+        chunks: Text chunks to synthesize
+        conds: Voice conditionals shared by every chunk
+        params: Generation parameters shared by every chunk
+        batch_size: Chunks decoded together in one T3 pass
+
+    Yields:
+        (index, wav, error) for every chunk; wav is None when error is set
+    """
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        try:
+            if len(batch) == 1:
+                wavs = [model.synthesize(batch[0], conds, params)]
+            else:
+                wavs = model.synthesize_batch(batch, conds, params, return_exceptions=True)
+        except Exception as e:
+            wavs = [e] * len(batch)
+
+        for index, wav in enumerate(wavs, start):
+            if isinstance(wav, Exception):
+                yield index, None, wav
+            else:
+                yield index, wav, None
+
+
 def print_generation_params() -> None:
     """Print current generation parameters."""
     print(f"Voice: {config.SELECTED_VOICE}")
     print(f"Language: {config.LANGUAGE_ID}")
+    print(f"Quality: {config.QUALITY_TIER}")
     print(f"Temperature: {config.TEMPERATURE}")
     print(f"CFG Weight: {config.CFG_WEIGHT}")
     print(f"Exaggeration: {config.EXAGGERATION}")
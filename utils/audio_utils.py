@@ -1,12 +1,32 @@
 """
 Audio utilities for voice processing and conversion.
 """
+import json
+import os
 import subprocess
-import numpy as np
-import librosa
-import soundfile as sf
+import threading
 from pathlib import Path
 
+# Estensioni audio supportate
+AUDIO_EXTENSIONS = ['.wav', '.mp3', '.ogg', '.flac', '.m4a', '.opus']
+
+
+def list_audio_files(audio_folder):
+    """
+    Restituisce i file audio di una cartella, ordinati per nome.
+
+    Args:
+        audio_folder: Path alla cartella contenente i file audio
+
+    Returns:
+        Lista ordinata di Path
+    """
+    audio_folder = Path(audio_folder)
+    audio_files = []
+    for ext in AUDIO_EXTENSIONS:
+        audio_files.extend(audio_folder.glob(f"*{ext}"))
+    return sorted(audio_files)
+
 
 def concatenate_audio_files(audio_folder, output_path="combined_voice.wav", target_sr=24000):
     """
@@ -40,6 +60,11 @@ def concatenate_audio_files(audio_folder, output_path="combined_voice.wav", targ
     for f in audio_files:
         print(f"  - {f.name}")
 
+    # Import differiti: la sola gestione di cartelle e file non li richiede
+    import numpy as np
+    import librosa
+    import soundfile as sf
+
     # Carica e concatena tutti gli audio
     combined_audio = []
     for audio_file in audio_files:
@@ -64,6 +89,123 @@ def concatenate_audio_files(audio_folder, output_path="combined_voice.wav", targ
     return output_path
 
 
+def load_reference_window(audio_folder, seconds, target_sr=24000):
+    """
+    Decodifica i file audio della cartella, in ordine, solo fino a `seconds`
+    secondi complessivi.
+
+    Il modello usa solo i primi secondi del riferimento per il conditioning:
+    appena la finestra è piena la decodifica si ferma, quindi tempo e memoria
+    non dipendono più dalla dimensione della cartella.
+
+    Args:
+        audio_folder: Path alla cartella contenente i file audio
+        seconds: Durata della finestra da riempire
+        target_sr: Sample rate target (default 24000 Hz)
+
+    Returns:
+        np.ndarray con al massimo seconds * target_sr campioni
+    """
+    import numpy as np
+    import librosa
+
+    remaining = int(seconds * target_sr)
+    pieces = []
+
+    for audio_file in list_audio_files(audio_folder):
+        if remaining <= 0:
+            break
+        try:
+            # `duration` limita la decodifica ai campioni che servono ancora
+            audio, _ = librosa.load(str(audio_file), sr=target_sr, duration=remaining / target_sr)
+        except Exception as e:
+            print(f"Errore nel caricare {audio_file.name}: {e}")
+            continue
+        audio = audio[:remaining]
+        pieces.append(audio)
+        remaining -= len(audio)
+
+    if not pieces:
+        raise ValueError(f"Nessun audio caricato con successo da {audio_folder}")
+
+    return np.concatenate(pieces)
+
+
+def build_folder_manifest(audio_folder, target_sr=24000):
+    """
+    Descrive il contenuto di una cartella voce (nomi, dimensioni, mtime).
+
+    Due manifest uguali indicano che il riferimento combinato costruito dalla
+    cartella è ancora valido.
+
+    Args:
+        audio_folder: Path alla cartella contenente i file audio
+        target_sr: Sample rate del riferimento combinato
+
+    Returns:
+        dict serializzabile in JSON
+    """
+    files = []
+    for audio_file in list_audio_files(audio_folder):
+        st = audio_file.stat()
+        files.append({
+            'name': audio_file.name,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns
+        })
+    return {'target_sr': target_sr, 'files': files}
+
+
+# Un lock per file combinato: richieste concorrenti sulla stessa voce lo costruiscono una volta
+_reference_locks = {}
+_reference_locks_guard = threading.Lock()
+
+
+def get_combined_reference(audio_folder, output_path="combined_voice.wav", target_sr=24000):
+    """
+    Restituisce il file audio combinato della cartella, ricostruendolo solo se
+    la cartella è cambiata dall'ultima volta.
+
+    Accanto al file combinato viene salvato un manifest (<nome>.manifest.json);
+    se coincide con quello attuale della cartella, nessun file viene decodificato.
+
+    Args:
+        audio_folder: Path alla cartella contenente i file audio
+        output_path: Path del file audio combinato
+        target_sr: Sample rate target (default 24000 Hz)
+
+    Returns:
+        Path del file audio combinato
+    """
+    output_path = Path(output_path)
+    manifest_path = output_path.with_suffix('.manifest.json')
+
+    with _reference_locks_guard:
+        lock = _reference_locks.setdefault(str(output_path.resolve()), threading.Lock())
+
+    with lock:
+        manifest = build_folder_manifest(audio_folder, target_sr)
+
+        if output_path.exists() and manifest_path.exists():
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    if json.load(f) == manifest:
+                        print(f"Riferimento combinato aggiornato, riuso: {output_path.name}")
+                        return str(output_path)
+            except (OSError, ValueError):
+                pass
+
+        # Scrittura atomica: chi legge non vede mai un file a metà
+        tmp_path = output_path.with_name(f"{output_path.stem}.{os.getpid()}.tmp{output_path.suffix}")
+        concatenate_audio_files(audio_folder, output_path=str(tmp_path), target_sr=target_sr)
+        os.replace(tmp_path, output_path)
+
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return str(output_path)
+
+
 def convert_to_mp3(input_file, output_file=None, bitrate="192k"):
     """
     Converte un file audio in MP3 usando ffmpeg.
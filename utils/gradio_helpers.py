@@ -1,9 +1,38 @@
 """
 Gradio UI helper functions for the web interface.
 """
+import functools
+import inspect
 from pathlib import Path
-from typing import List, Tuple, Optional
-import gradio as gr
+from typing import Callable, Dict, List, Tuple, Optional
+
+
+def with_progress(fn: Callable) -> Callable:
+    """
+    Wrap a handler so Gradio passes it a progress tracker.
+
+    Gradio injects `gr.Progress` into a parameter whose default is a
+    `gr.Progress()`; the handlers default `progress` to None so they can be
+    imported without gradio. The wrapper's signature restores that default.
+
+    Args:
+        fn: Handler with a `progress` parameter
+
+    Returns:
+        Callable: The handler, with `progress=gr.Progress()` in its signature
+    """
+    import gradio as gr
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+
+    signature = inspect.signature(fn)
+    wrapper.__signature__ = signature.replace(parameters=[
+        param.replace(default=gr.Progress()) if param.name == "progress" else param
+        for param in signature.parameters.values()
+    ])
+    return wrapper
 
 
 def format_duration(seconds: float) -> str:
@@ -23,20 +52,23 @@ def format_duration(seconds: float) -> str:
     return f"{minutes}m {secs}s"
 
 
-def get_voice_info_display(voice_name: str, voices_dir: Path) -> str:
+def get_voice_info_display(voice_name: str, voices_dir: Path, index=None, details: Optional[Dict] = None) -> str:
     """
     Get formatted display string with voice information.
 
     Args:
         voice_name: Name of the voice
         voices_dir: Path to voices directory
+        index: VoiceIndex to read clip metadata from (optional)
+        details: Voice details already at hand, e.g. from the library catalog (optional)
 
     Returns:
         Formatted info string
     """
     from utils.voice_manager import get_voice_details
 
-    details = get_voice_details(voices_dir, voice_name)
+    if details is None:
+        details = get_voice_details(voices_dir, voice_name, index=index)
     if not details:
         return "Voice not found"
 
@@ -286,6 +318,27 @@ def create_parameter_presets() -> dict:
     }
 
 
+def create_quality_tiers() -> dict:
+    """
+    Create the generation quality tiers shown next to the parameter presets.
+
+    Presets shape the voice; tiers choose how much compute each generation
+    gets (see QUALITY_TIERS in utils.audio_generator). The real-time factor
+    of each tier depends on the hardware, so no figure is fixed here:
+    `python -m benchmarks.bench_quality_tiers` prints one per tier, headed by
+    the CPU or GPU it was measured on.
+
+    Returns:
+        Dictionary of tier names and their descriptions
+    """
+    return {
+        "draft": "Draft - senza CFG, 4 passi S3Gen: anteprima veloce per rivedere i testi "
+                 "(senza controllo di allineamento: possibili allucinazioni o finali in ritardo)",
+        "standard": "Standard - CFG attivo, 6 passi S3Gen: buon compromesso",
+        "final": "Final - qualità piena (comportamento originale): per il render definitivo"
+    }
+
+
 def get_preset_values(preset_name: str) -> Tuple:
     """
     Get parameter values for a given preset.
@@ -4,7 +4,7 @@ History management for TTS generations.
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 
 class HistoryManager:
@@ -61,7 +61,11 @@ class HistoryManager:
         wav_path: str,
         mp3_path: Optional[str] = None,
         chunk_count: int = 0,
-        parameters: Optional[Dict] = None
+        parameters: Optional[Dict] = None,
+        language: Optional[str] = None,
+        audio_seconds: Optional[float] = None,
+        generation_seconds: Optional[float] = None,
+        speech_samples: Optional[List[Tuple[str, int, float]]] = None
     ) -> bool:
         """
         Add a new generation to history.
@@ -74,6 +78,11 @@ class HistoryManager:
             mp3_path: Path to generated MP3 file (optional)
             chunk_count: Number of chunks (0 for single-pass)
             parameters: Dictionary of TTS parameters used
+            language: Language code of the text (optional)
+            audio_seconds: Duration of the generated audio (optional)
+            generation_seconds: Wall time the generation took (optional)
+            speech_samples: (language, characters, audio seconds) of every
+                synthesized chunk, without the silence between chunks (optional)
 
         Returns:
             True if successful
@@ -90,7 +99,11 @@ class HistoryManager:
             'mp3_path': mp3_path,
             'chunk_count': chunk_count,
             'mode': 'chunked' if chunk_count > 0 else 'single-pass',
-            'parameters': parameters or {}
+            'parameters': parameters or {},
+            'language': language,
+            'audio_seconds': audio_seconds,
+            'generation_seconds': generation_seconds,
+            'speech_samples': [list(sample) for sample in speech_samples or []]
         }
 
         history.append(record)
@@ -107,6 +120,24 @@ class HistoryManager:
         history = self._load_history()
         return sorted(history, key=lambda x: x.get('timestamp', ''), reverse=True)
 
+    def get_speech_rate_samples(self) -> List[Tuple[Optional[str], int, float]]:
+        """
+        Get (language, characters, audio seconds) of every chunk synthesized
+        by past generations, oldest first.
+
+        Only the per-chunk samples are used: a generation's total audio
+        duration includes the silence added between chunks.
+
+        Returns:
+            List of samples for learning the speech rate of each language
+        """
+        return [
+            (language, n_chars, audio_seconds)
+            for h in self._load_history()
+            for language, n_chars, audio_seconds in h.get('speech_samples') or []
+            if n_chars and audio_seconds
+        ]
+
     def get_generations_by_voice(self, voice_name: str) -> List[Dict]:
         """
         Get all generations for a specific voice.
@@ -189,13 +220,24 @@ class HistoryManager:
         chunked = sum(1 for h in history if h.get('chunk_count', 0) > 0)
         single = len(history) - chunked
 
+        # Measured real-time factor (generation time / audio duration) per quality tier
+        rtfs = {}
+        for h in history:
+            if h.get('generation_seconds') and h.get('audio_seconds'):
+                quality = h.get('parameters', {}).get('quality', 'final')
+                rtfs.setdefault(quality, []).append(h['generation_seconds'] / h['audio_seconds'])
+
         return {
             'total_generations': len(history),
             'unique_voices': len(voices),
             'total_characters': total_chars,
             'chunked_generations': chunked,
             'single_pass_generations': single,
-            'voices_used': sorted(list(voices))
+            'voices_used': sorted(list(voices)),
+            'rtf_by_quality': {
+                quality: {'mean': sum(values) / len(values), 'count': len(values)}
+                for quality, values in sorted(rtfs.items())
+            }
         }
 
     def export_to_csv(self, output_path: Path) -> bool:
@@ -0,0 +1,228 @@
+"""
+In-memory catalog of voices and texts, kept up to date by a background watcher.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.audio_utils import AUDIO_EXTENSIONS
+from utils.text_utils import read_text_from_file
+from utils.voice_index import VoiceIndex
+from utils.voice_manager import get_voice_details
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional: fall back to polling only
+    Observer = None
+
+
+PREVIEW_CHARS = 100
+
+
+def _snapshot_dir(folder: Path, suffixes) -> Dict[str, tuple]:
+    """Map file name -> (size, mtime_ns) for the files of `folder` with one of `suffixes`."""
+    snapshot = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and os.path.splitext(entry.name)[1] in suffixes:
+                    st = entry.stat()
+                    snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+
+if Observer is not None:
+    class _WakeHandler(FileSystemEventHandler):
+        """Wake the catalog watcher on any change under a watched directory."""
+
+        def __init__(self, wake_event: threading.Event):
+            self.wake_event = wake_event
+
+        def on_any_event(self, event):
+            self.wake_event.set()
+
+
+class LibraryCatalog:
+    """
+    Catalog of the voices in `voices_dir` and the texts in `texts_dir`.
+
+    Each refresh compares (size, mtime) snapshots with the previous ones and
+    only reloads the voices and texts that changed. Once `start()` is called a
+    daemon thread refreshes every `poll_interval` seconds, or as soon as
+    watchdog (inotify) reports a change when it is installed, and readers never
+    touch the disk.
+    """
+
+    def __init__(
+        self,
+        voices_dir: Path,
+        texts_dir: Path,
+        voice_index: Optional[VoiceIndex] = None,
+        poll_interval: float = 2.0
+    ):
+        """
+        Initialize the catalog.
+
+        Args:
+            voices_dir: Path to the voices directory
+            texts_dir: Path to the texts directory
+            voice_index: Voice index used to read clip metadata
+            poll_interval: Seconds between two polls of the directories
+        """
+        self.voices_dir = Path(voices_dir)
+        self.texts_dir = Path(texts_dir)
+        self.voice_index = voice_index
+        self.poll_interval = poll_interval
+
+        self._voices = {}  # voice name -> {'snapshot': ..., 'details': ...}
+        self._texts = {}   # file name -> {'snapshot': ..., 'char_count', 'preview', 'error'}
+        self._voice_names = []
+        self._text_names = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._scanned = False
+
+        self._thread = None
+        self._observer = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        """Poll both directories once and reload what changed since the last poll."""
+        with self._refresh_lock:
+            self._refresh_voices()
+            self._refresh_texts()
+            self._scanned = True
+
+    def _refresh_voices(self):
+        try:
+            voice_dirs = sorted(
+                d.name for d in os.scandir(self.voices_dir)
+                if d.is_dir() and not d.name.startswith('.')
+            )
+        except FileNotFoundError:
+            voice_dirs = []
+
+        voices = {}
+        for name in voice_dirs:
+            snapshot = _snapshot_dir(self.voices_dir / name, AUDIO_EXTENSIONS)
+            entry = self._voices.get(name)
+            if entry is None or entry['snapshot'] != snapshot:
+                details = get_voice_details(self.voices_dir, name, index=self.voice_index)
+                entry = {'snapshot': snapshot, 'details': details}
+            voices[name] = entry
+
+        with self._lock:
+            self._voices = voices
+            self._voice_names = voice_dirs
+
+    def _refresh_texts(self):
+        snapshot = _snapshot_dir(self.texts_dir, ('.txt',))
+
+        texts = {}
+        for name in sorted(snapshot):
+            entry = self._texts.get(name)
+            if entry is None or entry['snapshot'] != snapshot[name]:
+                entry = {'snapshot': snapshot[name], 'char_count': 0, 'preview': '', 'error': None}
+                try:
+                    text = read_text_from_file(self.texts_dir / name)
+                    entry['char_count'] = len(text)
+                    entry['preview'] = text[:PREVIEW_CHARS]
+                except Exception as e:
+                    entry['error'] = str(e)
+            texts[name] = entry
+
+        with self._lock:
+            self._texts = texts
+            self._text_names = list(texts)
+
+    def _ensure_scanned(self):
+        # Without a watcher every read has to look at the disk
+        if self._thread is None or not self._scanned:
+            self.refresh()
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    def voice_names(self) -> List[str]:
+        """Sorted voice names."""
+        self._ensure_scanned()
+        with self._lock:
+            return list(self._voice_names)
+
+    def voice_details(self, voice_name: str) -> Optional[Dict]:
+        """Details of one voice (as get_voice_details), or None if unknown."""
+        self._ensure_scanned()
+        with self._lock:
+            entry = self._voices.get(voice_name)
+        return entry['details'] if entry else None
+
+    def text_names(self) -> List[str]:
+        """Sorted text file names."""
+        self._ensure_scanned()
+        with self._lock:
+            return list(self._text_names)
+
+    def text_info(self, text_name: str) -> Optional[Dict]:
+        """'char_count', 'preview' and 'error' of one text file, or None if unknown."""
+        self._ensure_scanned()
+        with self._lock:
+            entry = self._texts.get(text_name)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Scan once, then keep the catalog fresh from a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.refresh()
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                handler = _WakeHandler(self._wake)
+                for folder in (self.voices_dir, self.texts_dir):
+                    if folder.exists():
+                        self._observer.schedule(handler, str(folder), recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception as e:
+                print(f"Warning: file watcher unavailable, polling only: {e}")
+                self._observer = None
+
+        self._thread = threading.Thread(target=self._watch, name="library-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread (the catalog keeps its last state)."""
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _watch(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: library catalog refresh failed: {e}")
@@ -3,8 +3,6 @@ Output management utilities for audio file operations.
 
 This module handles combining audio chunks and converting between formats.
 """
-import numpy as np
-import soundfile as sf
 from pathlib import Path
 from typing import List, Optional
 
@@ -44,6 +42,9 @@ def combine_audio_chunks(
     if verbose:
         print(f"\nCombining {len(chunk_files)} chunks...")
 
+    import numpy as np
+    import soundfile as sf
+
     try:
         # Load and concatenate all chunks
         combined_audio = []
@@ -1,7 +1,6 @@
 """
 Setup and initialization utilities.
 """
-import torch
 from pathlib import Path
 
 
@@ -18,6 +17,8 @@ def detect_device(device_config=None):
     if device_config:
         return device_config
 
+    import torch  # Deferred: only device detection needs it
+
     if torch.cuda.is_available():
         return "cuda"
     elif torch.backends.mps.is_available():
@@ -15,8 +15,8 @@ def split_text_by_sentences(text, max_chars=500):
     Returns:
         List of text chunks
     """
-    # Split by sentence endings
-    sentences = re.split(r'([.!?]\s+)', text)
+    # Split by sentence endings (CJK full-width ones need no following space)
+    sentences = re.split(r'([.!?]\s+|[。！？]\s*)', text)
 
     chunks = []
     current_chunk = ""
@@ -103,8 +103,11 @@ def split_text_smart(text, max_chars=500, method='sentences'):
         if len(chunk) <= max_chars:
             final_chunks.append(chunk)
         else:
-            # Force split by words if still too long
-            words = chunk.split()
+            # Force split by words if still too long; words longer than
+            # max_chars (e.g. CJK text without spaces) by characters
+            words = []
+            for word in chunk.split():
+                words.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
             current = ""
             for word in words:
                 if len(current) + len(word) + 1 > max_chars:
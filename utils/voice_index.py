@@ -0,0 +1,194 @@
+"""
+Persistent metadata index for the voice library.
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.audio_utils import list_audio_files
+
+
+INDEX_VERSION = 1
+
+
+def probe_audio_file(audio_file: Path) -> Dict:
+    """
+    Read duration and sample rate of an audio file without decoding it.
+
+    soundfile reads them from the header; formats it cannot open fall back
+    to librosa.
+
+    Args:
+        audio_file: Path to the audio file
+
+    Returns:
+        Dictionary with 'duration' (seconds) and 'sample_rate'
+    """
+    import soundfile as sf
+
+    try:
+        info = sf.info(str(audio_file))
+        return {'duration': info.duration, 'sample_rate': info.samplerate}
+    except Exception:
+        import librosa
+        return {
+            'duration': librosa.get_duration(path=str(audio_file)),
+            'sample_rate': librosa.get_samplerate(str(audio_file))
+        }
+
+
+class VoiceIndex:
+    """
+    Per-clip metadata (duration, sample rate, size, mtime) of every voice,
+    stored in a compact JSON file.
+
+    A clip is probed again only when its size or modification time changed,
+    so listing the voice library costs one stat() per clip instead of reading
+    every file.
+    """
+
+    def __init__(self, index_file: Optional[Path] = None):
+        """
+        Initialize the voice index.
+
+        Args:
+            index_file: Path to the JSON index file (None keeps it in memory only)
+        """
+        self.index_file = Path(index_file) if index_file is not None else None
+        self._voices = {}  # voice folder -> {file name -> metadata}
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index from disk, ignoring missing or incompatible files."""
+        if self.index_file is None or not self.index_file.exists():
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading voice index: {e}")
+            return
+        if data.get('version') == INDEX_VERSION:
+            self._voices = data.get('voices', {})
+
+    def _save_index(self):
+        """Write the index atomically (caller holds the lock)."""
+        if self.index_file is None:
+            return
+        tmp_file = None
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp file: other processes or indexes on the same file never share one
+            fd, tmp_file = tempfile.mkstemp(dir=self.index_file.parent,
+                                            prefix=f"{self.index_file.name}.", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'voices': self._voices}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            print(f"Error saving voice index: {e}")
+            if tmp_file is not None:
+                Path(tmp_file).unlink(missing_ok=True)
+
+    @staticmethod
+    def _voice_key(voice_path: Path) -> str:
+        return str(Path(voice_path).resolve())
+
+    def get_files(self, voice_path: Path, audio_files: Optional[List[Path]] = None) -> List[Dict]:
+        """
+        Get metadata of every clip of a voice, re-probing only changed clips.
+
+        Args:
+            voice_path: Path to the voice folder
+            audio_files: Clips of the voice, if the caller already listed them
+
+        Returns:
+            List of dictionaries (name, path, duration, sample_rate, size, mtime_ns),
+            sorted by name. Unreadable clips are skipped.
+        """
+        voice_path = Path(voice_path)
+        if audio_files is None:
+            audio_files = list_audio_files(voice_path)
+        key = self._voice_key(voice_path)
+
+        with self._lock:
+            cached = self._voices.get(key, {})
+
+        entries = {}
+        changed = False
+        for audio_file in audio_files:
+            try:
+                st = audio_file.stat()
+            except OSError:
+                continue
+
+            entry = cached.get(audio_file.name)
+            if entry is None or entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns:
+                try:
+                    entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, **probe_audio_file(audio_file)}
+                except Exception as e:
+                    print(f"Warning: Could not read {audio_file.name}: {e}")
+                    continue
+                changed = True
+            entries[audio_file.name] = entry
+
+        if changed or entries.keys() != cached.keys():
+            with self._lock:
+                self._voices[key] = entries
+                self._save_index()
+
+        return [
+            {'name': name, 'path': str(voice_path / name), **entry}
+            for name, entry in sorted(entries.items())
+        ]
+
+    def update_voice(self, voice_path: Path):
+        """
+        Bring a voice up to date after clips were added or replaced.
+
+        Args:
+            voice_path: Path to the voice folder
+        """
+        self.get_files(voice_path)
+
+    def remove_file(self, voice_path: Path, audio_filename: str):
+        """
+        Drop one clip from the index.
+
+        Args:
+            voice_path: Path to the voice folder
+            audio_filename: Name of the removed clip
+        """
+        with self._lock:
+            entries = self._voices.get(self._voice_key(voice_path))
+            if entries is not None and entries.pop(audio_filename, None) is not None:
+                self._save_index()
+
+    def remove_voice(self, voice_path: Path):
+        """
+        Drop a whole voice from the index.
+
+        Args:
+            voice_path: Path to the voice folder
+        """
+        with self._lock:
+            if self._voices.pop(self._voice_key(voice_path), None) is not None:
+                self._save_index()
+
+    def rename_voice(self, old_path: Path, new_path: Path):
+        """
+        Move the entries of a renamed voice; the clips themselves are unchanged.
+
+        Args:
+            old_path: Previous path of the voice folder
+            new_path: New path of the voice folder
+        """
+        with self._lock:
+            entries = self._voices.pop(self._voice_key(old_path), None)
+            if entries is not None:
+                self._voices[self._voice_key(new_path)] = entries
+                self._save_index()
@@ -3,9 +3,11 @@ Voice management utilities for handling multiple voices.
 """
 from pathlib import Path
 import shutil
-import librosa
 from typing import Dict, List, Optional, Tuple
 
+from utils.audio_utils import list_audio_files
+from utils.voice_index import VoiceIndex
+
 
 def get_available_voices(voices_dir):
     """
@@ -93,13 +95,14 @@ def list_voices_info(voices_dir):
     return voices_info
 
 
-def get_voice_details(voices_dir: Path, voice_name: str) -> Optional[Dict]:
+def get_voice_details(voices_dir: Path, voice_name: str, index: Optional[VoiceIndex] = None) -> Optional[Dict]:
     """
     Get detailed information about a specific voice.
 
     Args:
         voices_dir: Path to the voices directory
         voice_name: Name of the voice
+        index: Voice index to read clip metadata from (without one every clip is probed)
 
     Returns:
         Dictionary with voice details or None if not found
@@ -110,39 +113,27 @@ def get_voice_details(voices_dir: Path, voice_name: str) -> Optional[Dict]:
     if not voice_path.exists():
         return None
 
-    # Get audio files
-    audio_extensions = ['.wav', '.mp3', '.ogg', '.flac', '.m4a', '.opus']
-    audio_files = []
-    for ext in audio_extensions:
-        audio_files.extend(list(voice_path.glob(f"*{ext}")))
-
-    # Calculate total duration
-    total_duration = 0.0
-    file_details = []
+    audio_files = list_audio_files(voice_path)
 
-    for audio_file in sorted(audio_files):
-        try:
-            duration = librosa.get_duration(path=str(audio_file))
-            total_duration += duration
-            file_details.append({
-                'name': audio_file.name,
-                'path': str(audio_file),
-                'duration': duration,
-                'size': audio_file.stat().st_size
-            })
-        except Exception as e:
-            print(f"Warning: Could not read {audio_file.name}: {e}")
+    if index is None:
+        index = VoiceIndex()
+    file_details = index.get_files(voice_path, audio_files)
 
     return {
         'name': voice_name,
         'path': str(voice_path),
         'audio_count': len(audio_files),
-        'total_duration': total_duration,
+        'total_duration': sum(f['duration'] for f in file_details),
         'files': file_details
     }
 
 
-def create_voice(voices_dir: Path, voice_name: str, audio_files: List[str]) -> Tuple[bool, str]:
+def create_voice(
+    voices_dir: Path,
+    voice_name: str,
+    audio_files: List[str],
+    index: Optional[VoiceIndex] = None
+) -> Tuple[bool, str]:
     """
     Create a new voice by copying audio files to a new folder.
 
@@ -150,6 +141,7 @@ def create_voice(voices_dir: Path, voice_name: str, audio_files: List[str]) -> T
         voices_dir: Path to the voices directory
         voice_name: Name for the new voice
         audio_files: List of paths to audio files to include
+        index: Voice index to update (optional)
 
     Returns:
         Tuple of (success, message)
@@ -183,10 +175,18 @@ def create_voice(voices_dir: Path, voice_name: str, audio_files: List[str]) -> T
         voice_path.rmdir()
         return False, "No audio files were copied successfully"
 
+    if index is not None:
+        index.update_voice(voice_path)
+
     return True, f"Voice '{voice_name}' created with {copied_count} audio files"
 
 
-def add_audio_to_voice(voices_dir: Path, voice_name: str, audio_files: List[str]) -> Tuple[bool, str]:
+def add_audio_to_voice(
+    voices_dir: Path,
+    voice_name: str,
+    audio_files: List[str],
+    index: Optional[VoiceIndex] = None
+) -> Tuple[bool, str]:
     """
     Add audio files to an existing voice.
 
@@ -194,6 +194,7 @@ def add_audio_to_voice(voices_dir: Path, voice_name: str, audio_files: List[str]
         voices_dir: Path to the voices directory
         voice_name: Name of the voice
         audio_files: List of paths to audio files to add
+        index: Voice index to update (optional); only the new clips are probed
 
     Returns:
         Tuple of (success, message)
@@ -226,10 +227,18 @@ def add_audio_to_voice(voices_dir: Path, voice_name: str, audio_files: List[str]
     if copied_count == 0:
         return False, "No audio files were added"
 
+    if index is not None:
+        index.update_voice(voice_path)
+
     return True, f"Added {copied_count} audio files to '{voice_name}'"
 
 
-def remove_audio_from_voice(voices_dir: Path, voice_name: str, audio_filename: str) -> Tuple[bool, str]:
+def remove_audio_from_voice(
+    voices_dir: Path,
+    voice_name: str,
+    audio_filename: str,
+    index: Optional[VoiceIndex] = None
+) -> Tuple[bool, str]:
     """
     Remove an audio file from a voice.
 
@@ -237,6 +246,7 @@ def remove_audio_from_voice(voices_dir: Path, voice_name: str, audio_filename: s
         voices_dir: Path to the voices directory
         voice_name: Name of the voice
         audio_filename: Name of the audio file to remove
+        index: Voice index to update (optional)
 
     Returns:
         Tuple of (success, message)
@@ -250,18 +260,21 @@ def remove_audio_from_voice(voices_dir: Path, voice_name: str, audio_filename: s
 
     try:
         audio_path.unlink()
+        if index is not None:
+            index.remove_file(voice_path, audio_filename)
         return True, f"Removed '{audio_filename}' from '{voice_name}'"
     except Exception as e:
         return False, f"Failed to remove audio file: {e}"
 
 
-def delete_voice(voices_dir: Path, voice_name: str) -> Tuple[bool, str]:
+def delete_voice(voices_dir: Path, voice_name: str, index: Optional[VoiceIndex] = None) -> Tuple[bool, str]:
     """
     Delete a voice and all its audio files.
 
     Args:
         voices_dir: Path to the voices directory
         voice_name: Name of the voice to delete
+        index: Voice index to update (optional)
 
     Returns:
         Tuple of (success, message)
@@ -274,12 +287,19 @@ def delete_voice(voices_dir: Path, voice_name: str) -> Tuple[bool, str]:
 
     try:
         shutil.rmtree(voice_path)
+        if index is not None:
+            index.remove_voice(voice_path)
         return True, f"Voice '{voice_name}' deleted successfully"
     except Exception as e:
         return False, f"Failed to delete voice: {e}"
 
 
-def rename_voice(voices_dir: Path, old_name: str, new_name: str) -> Tuple[bool, str]:
+def rename_voice(
+    voices_dir: Path,
+    old_name: str,
+    new_name: str,
+    index: Optional[VoiceIndex] = None
+) -> Tuple[bool, str]:
     """
     Rename a voice.
 
@@ -287,6 +307,7 @@ def rename_voice(voices_dir: Path, old_name: str, new_name: str) -> Tuple[bool,
         voices_dir: Path to the voices directory
         old_name: Current name of the voice
         new_name: New name for the voice
+        index: Voice index to update (optional)
 
     Returns:
         Tuple of (success, message)
@@ -303,6 +324,8 @@ def rename_voice(voices_dir: Path, old_name: str, new_name: str) -> Tuple[bool,
 
     try:
         old_path.rename(new_path)
+        if index is not None:
+            index.rename_voice(old_path, new_path)
         return True, f"Voice renamed from '{old_name}' to '{new_name}'"
     except Exception as e:
         return False, f"Failed to rename voice: {e}"
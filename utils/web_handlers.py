@@ -5,24 +5,20 @@ This module contains all the business logic handlers for the web interface,
 separated from UI construction for better maintainability.
 """
 
-import gradio as gr
+import functools
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import TYPE_CHECKING, Optional, List, Tuple
 import shutil
+import time
 
-from utils.audio_utils import concatenate_audio_files
+from chatterbox.registry import get_model, get_loaded_model
+from utils.audio_utils import get_combined_reference
 from utils.text_utils import read_text_from_file
 from utils.voice_manager import (
-    get_available_voices,
-    get_voice_details,
     create_voice,
     add_audio_to_voice,
     delete_voice
 )
-from utils.audio_generator import (
-    generate_single_audio,
-    generate_chunked_audio
-)
 from utils.output_manager import (
     combine_audio_chunks,
     convert_wav_to_mp3,
@@ -30,50 +26,186 @@ from utils.output_manager import (
 )
 from utils.gradio_helpers import (
     format_duration,
+    format_file_size,
     get_voice_info_display,
     get_text_info_display,
     validate_text_file,
     validate_audio_file,
-    sanitize_filename,
-    create_voice_choices,
-    create_text_choices
+    sanitize_filename
 )
 from utils.history_manager import HistoryManager
+from utils.voice_index import VoiceIndex, probe_audio_file
+from utils.library_catalog import LibraryCatalog
+from utils.setup_utils import detect_device
 import config
 
+if TYPE_CHECKING:
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+
+# Gradio and the model stack (torch, torchaudio, chatterbox) are imported inside
+# the handlers that need them, so importing this module for the voice/text/history
+# handlers stays cheap. Handlers taking `progress` get Gradio's tracker through
+# `gradio_helpers.with_progress` (see main-web.py)
+
 # Constants
 MAX_SINGLE_PASS_CHARS = 500
 history_manager = HistoryManager(config.OUTPUT_DIR / "generation_history.json")
+voice_index = VoiceIndex(config.OUTPUT_DIR / "voice_index.json")
+library_catalog = LibraryCatalog(
+    config.VOICES_DIR,
+    config.TEXT_DIR,
+    voice_index=voice_index,
+    poll_interval=config.CATALOG_POLL_INTERVAL
+)
+
+
+# =============================================================================
+# MODEL
+# =============================================================================
+
+def load_tts_model(device: str, dtype: str = "float32") -> "ChatterboxMultilingualTTS":
+    """Load the TTS model in `dtype` and enable the voice conditionals caches."""
+    from chatterbox.loading import format_timings
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+
+    print("Loading Chatterbox TTS model...")
+    model = ChatterboxMultilingualTTS.from_pretrained(
+        device=device,
+        quantize=config.QUANTIZE,
+        quantize_s3gen=config.QUANTIZE_S3GEN,
+        quantize_cache_dir=config.QUANTIZED_CACHE_DIR,
+        backend=config.TTS_BACKEND,
+        onnx_dir=config.ONNX_DIR,
+        dtype=dtype,
+        ckpt_dir=config.CHECKPOINT_DIR,
+        offline=config.CHECKPOINT_OFFLINE
+    )
+    model.enable_conds_cache(config.CONDS_CACHE_DIR)
+    model.conds_lru.resize(config.CONDS_MEMORY_BUDGET_MB * 1024 * 1024)
+    if config.DYNAMIC_BATCHING:
+        model.enable_dynamic_batching(
+            max_batch_size=config.BATCH_MAX_SIZE,
+            max_wait_ms=config.BATCH_MAX_WAIT_MS
+        )
+    # Start the token budget from the speech rate of past generations
+    for language, text_length, audio_seconds in history_manager.get_speech_rate_samples():
+        model.token_budget.observe_audio(language, text_length, audio_seconds)
+    print(f"Model loaded successfully on {device} ({format_timings(model.load_timings)})")
+    return model
+
+
+@functools.lru_cache(maxsize=None)
+def get_device() -> str:
+    """Device of the shared model (config.DEVICE, or auto-detected on first call)."""
+    return detect_device(config.DEVICE)
+
+
+def _no_progress(*args, **kwargs):
+    """Progress callback used when a handler runs outside Gradio."""
+
+
+def _dropdown(choices: List[str]):
+    """Gradio dropdown update selecting the first of `choices`."""
+    import gradio as gr
+    return gr.Dropdown(choices=choices, value=choices[0] if choices else None)
+
+
+def get_tts_model() -> "ChatterboxMultilingualTTS":
+    """Return the process-wide TTS model shared by every browser session."""
+    return get_model("multilingual", device=get_device(), dtype=config.DTYPE, loader=load_tts_model)
+
+
+def warmup_tts_model() -> None:
+    """
+    Warm up the shared model before the server accepts requests.
+
+    Synthesizes a short sentence per language in WARMUP_LANGUAGES (default:
+    LANGUAGE_ID) with WARMUP_VOICE, or the model's built-in voice when unset.
+    """
+    from utils.audio_generator import prepare_voice_conditionals
+    from utils.warmup import warmup_model
+
+    model = get_tts_model()
+    languages = config.WARMUP_LANGUAGES or [config.LANGUAGE_ID]
+
+    if config.WARMUP_VOICE:
+        voice_folder = config.VOICES_DIR / config.WARMUP_VOICE
+        if not voice_folder.is_dir():
+            print(f"⚠ Warmup skipped: voice '{config.WARMUP_VOICE}' not found in {config.VOICES_DIR}")
+            return
+        try:
+            conds = prepare_voice_conditionals(model, prepare_voice_reference(config.WARMUP_VOICE), voice_folder)
+        except Exception as e:
+            print(f"⚠ Warmup skipped: could not prepare voice '{config.WARMUP_VOICE}': {e}")
+            return
+        voice_label = config.WARMUP_VOICE
+    elif model.conds is not None:
+        conds = model.conds
+        voice_label = "built-in"
+    else:
+        print("⚠ Warmup skipped: the model has no built-in voice and WARMUP_VOICE is not set")
+        return
+
+    print(f"Warming up ({voice_label} voice, languages: {', '.join(languages)})...")
+    started = time.perf_counter()
+    warmup_model(model, conds, languages)
+    print(f"Warmup done in {time.perf_counter() - started:.1f}s")
+
+
+def prepare_voice_reference(voice_name: str) -> Optional[str]:
+    """
+    Build the combined reference for a voice when REFERENCE_MODE is "concat".
+
+    Returns None in "conditioning" mode, where the clips are streamed straight
+    into the conditionals instead.
+    """
+    if config.REFERENCE_MODE != "concat":
+        return None
+    return get_combined_reference(
+        audio_folder=config.VOICES_DIR / voice_name,
+        output_path=str(config.OUTPUT_DIR / f"{voice_name}_{config.COMBINED_AUDIO_NAME}"),
+        target_sr=config.SAMPLE_RATE
+    )
 
 
 # =============================================================================
 # GENERATION HANDLERS (Tab 1)
 # =============================================================================
 
+def _voice_choices() -> List[str]:
+    """Voice names from the library catalog, for dropdowns."""
+    return library_catalog.voice_names() or ["No voices available"]
+
+
+def _text_choices() -> List[str]:
+    """Text file names from the library catalog, for dropdowns."""
+    return library_catalog.text_names() or ["No texts available"]
+
+
 def refresh_voice_dropdown():
     """Refresh the list of available voices."""
-    voices = create_voice_choices(config.VOICES_DIR)
-    return gr.Dropdown(choices=voices, value=voices[0] if voices else None)
+    voices = _voice_choices()
+    return _dropdown(voices)
 
 
 def refresh_all_voice_dropdowns():
     """Refresh all voice dropdowns (for auto-update after CRUD operations)."""
-    voices = create_voice_choices(config.VOICES_DIR)
-    dropdown = gr.Dropdown(choices=voices, value=voices[0] if voices else None)
+    voices = _voice_choices()
+    dropdown = _dropdown(voices)
     # Return same dropdown 3 times (for gen, add, delete)
     return dropdown, dropdown, dropdown
 
 
 def refresh_text_dropdown():
     """Refresh the list of available text files."""
-    texts = create_text_choices(config.TEXT_DIR)
-    return gr.Dropdown(choices=texts, value=texts[0] if texts else None)
+    texts = _text_choices()
+    return _dropdown(texts)
 
 
 def refresh_all_text_dropdowns():
     """Refresh all text dropdowns (for auto-update after CRUD operations)."""
-    texts = create_text_choices(config.TEXT_DIR)
-    dropdown = gr.Dropdown(choices=texts, value=texts[0] if texts else None)
+    texts = _text_choices()
+    dropdown = _dropdown(texts)
     # Return same dropdown 2 times (for gen, delete)
     return dropdown, dropdown
 
@@ -82,7 +214,12 @@ def update_voice_info(voice_name: str) -> str:
     """Update voice information display."""
     if not voice_name or voice_name == "No voices available":
         return "No voice selected"
-    return get_voice_info_display(voice_name, config.VOICES_DIR)
+    return get_voice_info_display(
+        voice_name,
+        config.VOICES_DIR,
+        index=voice_index,
+        details=library_catalog.voice_details(voice_name)
+    )
 
 
 def update_text_info(text_file: str) -> str:
@@ -99,7 +236,6 @@ def update_text_info(text_file: str) -> str:
 
 
 def generate_tts(
-    model,
     voice_name: str,
     text_file: str,
     temperature: float,
@@ -108,7 +244,8 @@ def generate_tts(
     repetition_penalty: float,
     min_p: float,
     top_p: float,
-    progress=gr.Progress()
+    quality: str = config.QUALITY_TIER,
+    progress=None
 ) -> Tuple[Optional[str], Optional[str], str]:
     """
     Generate TTS audio from selected voice and text.
@@ -116,6 +253,7 @@ def generate_tts(
     Returns:
         Tuple of (wav_path, mp3_path, status_message)
     """
+    progress = progress or _no_progress
     try:
         # Validation
         if not voice_name or voice_name == "No voices available":
@@ -125,6 +263,8 @@ def generate_tts(
             return None, None, "Please select a text file"
 
         progress(0.1, desc="Loading text and preparing voice...")
+        model = get_tts_model()
+        from utils.audio_generator import generate_chunked_audio, generate_single_audio
 
         # Load text
         text_path = config.TEXT_DIR / text_file
@@ -132,14 +272,9 @@ def generate_tts(
 
         # Prepare audio reference
         voice_folder = config.VOICES_DIR / voice_name
-        combined_audio_path = config.OUTPUT_DIR / f"{voice_name}_{config.COMBINED_AUDIO_NAME}"
 
-        progress(0.2, desc="Concatenating voice references...")
-        combined_audio_path = concatenate_audio_files(
-            audio_folder=voice_folder,
-            output_path=str(combined_audio_path),
-            target_sr=config.SAMPLE_RATE
-        )
+        progress(0.2, desc="Preparing voice reference...")
+        combined_audio_path = prepare_voice_reference(voice_name)
 
         # Determine processing mode
         text_basename = text_file.replace('.txt', '')
@@ -154,6 +289,9 @@ def generate_tts(
 
         # Generate audio
         chunk_count = 0
+        # Per-chunk (language, characters, audio seconds): they seed the token budget
+        speech_samples = []
+        started = time.perf_counter()
         if is_long_text:
             progress(0.3, desc=f"Generating audio (chunked mode)...")
 
@@ -164,13 +302,16 @@ def generate_tts(
                 output_dir=config.OUTPUT_WAV_DIR,
                 base_filename=filenames['base'],
                 max_chars=MAX_SINGLE_PASS_CHARS,
+                voice_folder=voice_folder,
                 temperature=temperature,
                 cfg_weight=cfg_weight,
                 exaggeration=exaggeration,
                 repetition_penalty=repetition_penalty,
                 min_p=min_p,
                 top_p=top_p,
-                verbose=False
+                quality=quality,
+                verbose=False,
+                speech_samples=speech_samples
             )
 
             if not chunk_files:
@@ -197,18 +338,24 @@ def generate_tts(
                 text=text,
                 audio_prompt_path=combined_audio_path,
                 output_path=output_wav_path,
+                voice_folder=voice_folder,
                 temperature=temperature,
                 cfg_weight=cfg_weight,
                 exaggeration=exaggeration,
                 repetition_penalty=repetition_penalty,
                 min_p=min_p,
                 top_p=top_p,
-                verbose=False
+                quality=quality,
+                verbose=False,
+                speech_samples=speech_samples
             )
 
         if output_wav_path is None:
             return None, None, "Audio generation failed"
 
+        generation_seconds = time.perf_counter() - started
+        audio_seconds = probe_audio_file(output_wav_path)['duration']
+
         progress(0.85, desc="Converting to MP3...")
 
         # Convert to MP3
@@ -229,7 +376,8 @@ def generate_tts(
             'exaggeration': exaggeration,
             'repetition_penalty': repetition_penalty,
             'min_p': min_p,
-            'top_p': top_p
+            'top_p': top_p,
+            'quality': quality
         }
 
         history_manager.add_generation(
@@ -239,7 +387,11 @@ def generate_tts(
             wav_path=str(output_wav_path),
             mp3_path=str(output_mp3_path) if output_mp3_path else None,
             chunk_count=chunk_count,
-            parameters=parameters
+            parameters=parameters,
+            language=speech_samples[0][0] if speech_samples else None,
+            audio_seconds=audio_seconds,
+            generation_seconds=generation_seconds,
+            speech_samples=speech_samples
         )
 
         progress(1.0, desc="Complete!")
@@ -249,9 +401,11 @@ def generate_tts(
         mp3_audio = str(output_mp3_path) if output_mp3_path else None
 
         mode = "chunked" if is_long_text else "single-pass"
-        status = f"✓ Generation complete! ({mode}, {len(text)} chars"
+        status = f"✓ Generation complete! ({mode}, {quality}, {len(text)} chars"
         if chunk_count > 0:
             status += f", {chunk_count} chunks"
+        if audio_seconds:
+            status += f", RTF {generation_seconds / audio_seconds:.2f}"
         status += ")"
 
         return wav_audio, mp3_audio, status
@@ -269,14 +423,14 @@ def generate_tts(
 
 def list_voices_details() -> str:
     """Get detailed list of all voices."""
-    voices = get_available_voices(config.VOICES_DIR)
+    voices = library_catalog.voice_names()
 
     if not voices:
         return "No voices available"
 
     output = "# Available Voices\n\n"
     for voice in voices:
-        details = get_voice_details(config.VOICES_DIR, voice)
+        details = library_catalog.voice_details(voice)
         if details:
             output += f"## {voice}\n"
             output += f"- Audio files: {details['audio_count']}\n"
@@ -306,7 +460,8 @@ def create_new_voice(voice_name: str, audio_files: List) -> str:
             return f"Invalid file {audio_file.name}: {msg}"
         file_paths.append(audio_file.name)
 
-    success, message = create_voice(config.VOICES_DIR, voice_name, file_paths)
+    success, message = create_voice(config.VOICES_DIR, voice_name, file_paths, index=voice_index)
+    library_catalog.refresh()
 
     if success:
         return f"✓ {message}"
@@ -323,7 +478,8 @@ def add_audio_files_to_voice(voice_name: str, audio_files: List) -> str:
         return "Please upload at least one audio file"
 
     file_paths = [f.name for f in audio_files]
-    success, message = add_audio_to_voice(config.VOICES_DIR, voice_name, file_paths)
+    success, message = add_audio_to_voice(config.VOICES_DIR, voice_name, file_paths, index=voice_index)
+    library_catalog.refresh()
 
     if success:
         return f"✓ {message}"
@@ -336,7 +492,8 @@ def delete_selected_voice(voice_name: str) -> str:
     if not voice_name:
         return "Please select a voice to delete"
 
-    success, message = delete_voice(config.VOICES_DIR, voice_name)
+    success, message = delete_voice(config.VOICES_DIR, voice_name, index=voice_index)
+    library_catalog.refresh()
 
     if success:
         return f"✓ {message}"
@@ -353,28 +510,31 @@ def list_texts_details() -> str:
     if not config.TEXT_DIR.exists():
         return "Text directory not found"
 
-    text_files = sorted(config.TEXT_DIR.glob("*.txt"))
+    text_files = library_catalog.text_names()
 
     if not text_files:
         return "No text files available"
 
     output = "# Available Texts\n\n"
     for text_file in text_files:
-        try:
-            text = read_text_from_file(text_file)
-            char_count = len(text)
-            is_long = char_count > MAX_SINGLE_PASS_CHARS
-            mode = "CHUNKED" if is_long else "SINGLE-PASS"
-
-            output += f"## {text_file.name}\n"
-            output += f"- Length: {char_count} characters\n"
-            output += f"- Mode: {mode}\n"
-            if is_long:
-                chunks = (char_count + MAX_SINGLE_PASS_CHARS - 1) // MAX_SINGLE_PASS_CHARS
-                output += f"- Estimated chunks: {chunks}\n"
-            output += f"- Preview: {text[:100]}...\n\n"
-        except Exception as e:
-            output += f"## {text_file.name}\n- Error: {e}\n\n"
+        info = library_catalog.text_info(text_file)
+        if info is None:
+            continue
+        if info['error']:
+            output += f"## {text_file}\n- Error: {info['error']}\n\n"
+            continue
+
+        char_count = info['char_count']
+        is_long = char_count > MAX_SINGLE_PASS_CHARS
+        mode = "CHUNKED" if is_long else "SINGLE-PASS"
+
+        output += f"## {text_file}\n"
+        output += f"- Length: {char_count} characters\n"
+        output += f"- Mode: {mode}\n"
+        if is_long:
+            chunks = (char_count + MAX_SINGLE_PASS_CHARS - 1) // MAX_SINGLE_PASS_CHARS
+            output += f"- Estimated chunks: {chunks}\n"
+        output += f"- Preview: {info['preview']}...\n\n"
 
     return output
 
@@ -396,6 +556,7 @@ def save_text_from_input(text_name: str, text_content: str) -> str:
     try:
         with open(text_path, 'w', encoding='utf-8') as f:
             f.write(text_content.strip())
+        library_catalog.refresh()
         return f"✓ Text saved as {text_name} ({len(text_content)} characters)"
     except Exception as e:
         return f"✗ Failed to save text: {e}"
@@ -415,6 +576,7 @@ def save_uploaded_text(text_file) -> str:
 
     try:
         shutil.copy2(src, dst)
+        library_catalog.refresh()
         with open(dst, 'r', encoding='utf-8') as f:
             char_count = len(f.read())
         return f"✓ Text file uploaded: {dst.name} ({char_count} characters)"
@@ -431,6 +593,7 @@ def delete_text_file(text_file: str) -> str:
 
     try:
         text_path.unlink()
+        library_catalog.refresh()
         return f"✓ Deleted {text_file}"
     except Exception as e:
         return f"✗ Failed to delete text: {e}"
@@ -441,7 +604,6 @@ def delete_text_file(text_file: str) -> str:
 # =============================================================================
 
 def batch_generate(
-    model,
     voice_name: str,
     text_files: List,
     temperature: float,
@@ -450,18 +612,29 @@ def batch_generate(
     repetition_penalty: float,
     min_p: float,
     top_p: float,
-    progress=gr.Progress()
+    quality: str = config.QUALITY_TIER,
+    progress=None
 ) -> str:
     """Generate TTS for multiple text files."""
+    progress = progress or _no_progress
     if not voice_name or voice_name == "No voices available":
         return "Please select a voice"
 
     if not text_files:
         return "Please upload text files for batch processing"
 
+    model = get_tts_model()
+    from utils.audio_generator import generate_chunked_audio, generate_single_audio
     results = []
     total_files = len(text_files)
 
+    # Same voice for every file: prepare the reference once
+    voice_folder = config.VOICES_DIR / voice_name
+    try:
+        combined_audio_path = prepare_voice_reference(voice_name)
+    except ValueError as e:
+        return f"✗ Voice '{voice_name}': {e}"
+
     for idx, text_file in enumerate(text_files):
         progress((idx / total_files), desc=f"Processing {idx+1}/{total_files}...")
 
@@ -469,14 +642,6 @@ def batch_generate(
             with open(text_file.name, 'r', encoding='utf-8') as f:
                 text = f.read()
 
-            voice_folder = config.VOICES_DIR / voice_name
-            combined_audio_path = config.OUTPUT_DIR / f"{voice_name}_{config.COMBINED_AUDIO_NAME}"
-            combined_audio_path = concatenate_audio_files(
-                audio_folder=voice_folder,
-                output_path=str(combined_audio_path),
-                target_sr=config.SAMPLE_RATE
-            )
-
             text_basename = Path(text_file.name).stem
             is_long_text = len(text) > MAX_SINGLE_PASS_CHARS
             filenames = generate_output_filenames(
@@ -493,12 +658,14 @@ def batch_generate(
                     output_dir=config.OUTPUT_WAV_DIR,
                     base_filename=filenames['base'],
                     max_chars=MAX_SINGLE_PASS_CHARS,
+                    voice_folder=voice_folder,
                     temperature=temperature,
                     cfg_weight=cfg_weight,
                     exaggeration=exaggeration,
                     repetition_penalty=repetition_penalty,
                     min_p=min_p,
                     top_p=top_p,
+                    quality=quality,
                     verbose=False
                 )
 
@@ -517,12 +684,14 @@ def batch_generate(
                     text=text,
                     audio_prompt_path=combined_audio_path,
                     output_path=output_wav_path,
+                    voice_folder=voice_folder,
                     temperature=temperature,
                     cfg_weight=cfg_weight,
                     exaggeration=exaggeration,
                     repetition_penalty=repetition_penalty,
                     min_p=min_p,
                     top_p=top_p,
+                    quality=quality,
                     verbose=False
                 )
 
@@ -576,8 +745,9 @@ def display_history() -> str:
 
 
 def display_statistics() -> str:
-    """Display generation statistics."""
+    """Display generation statistics (and voice cache usage once the model is loaded)."""
     stats = history_manager.get_statistics()
+    model = get_loaded_model("multilingual", device=get_device(), dtype=config.DTYPE)
 
     output = "# Statistics\n\n"
     output += f"- Total generations: {stats['total_generations']}\n"
@@ -591,6 +761,31 @@ def display_statistics() -> str:
         for voice in stats['voices_used']:
             output += f"- {voice}\n"
 
+    if stats.get('rtf_by_quality'):
+        output += f"\n### Real-Time Factor by Quality\n"
+        for quality, rtf in stats['rtf_by_quality'].items():
+            output += f"- {quality}: {rtf['mean']:.2f} ({rtf['count']} generations)\n"
+
+    if model is not None:
+        cache = model.conds_cache_stats()
+        output += f"\n### Voice Conditionals Cache\n"
+        output += f"- Voices in memory: {cache['entries']}\n"
+        output += f"- Hits / misses: {cache['hits']} / {cache['misses']} ({cache['hit_rate']:.0%} hit rate)\n"
+        output += f"- Evictions: {cache['evictions']}\n"
+        output += f"- Memory: {format_file_size(cache['resident_bytes'])} / {format_file_size(cache['max_bytes'])}\n"
+
+    if model is not None and model.batch_scheduler is not None:
+        batching = model.batch_scheduler.stats()
+        output += f"\n### Dynamic Batching\n"
+        output += f"- Requests / batches: {batching['requests']} / {batching['batches']}\n"
+        output += f"- Mean batch size: {batching['mean_batch_size']:.2f}\n"
+
+    if model is not None:
+        prefix = model.prefix_cache.stats()
+        output += f"\n### Voice Prefix Cache\n"
+        output += f"- Cached voices: {prefix['entries']}\n"
+        output += f"- Hits / misses: {prefix['hits']} / {prefix['misses']}\n"
+
     return output
 
 
@@ -636,7 +831,7 @@ def get_all_scripts() -> List[Path]:
 def refresh_script_dropdown():
     """Refresh the list of available scripts."""
     scripts = get_script_choices()
-    return gr.Dropdown(choices=scripts, value=scripts[0] if scripts else None)
+    return _dropdown(scripts)
 
 
 def load_all_scripts() -> Tuple[str, str, str]:
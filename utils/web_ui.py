@@ -8,6 +8,7 @@ separated from business logic handlers for better maintainability.
 import gradio as gr
 from utils.gradio_helpers import (
     create_parameter_presets,
+    create_quality_tiers,
     get_preset_values,
     create_voice_choices,
     create_text_choices
@@ -15,7 +16,7 @@ from utils.gradio_helpers import (
 import config
 
 
-def create_generation_tab(model_state):
+def create_generation_tab():
     """
     Create the TTS Generation tab.
 
@@ -47,6 +48,14 @@ def create_generation_tab(model_state):
             components['text_info'] = gr.Markdown("Select a text to see details")
             components['refresh_texts_btn'] = gr.Button("🔄 Refresh Texts", size="sm")
 
+    components['quality'] = gr.Radio(
+        label="Quality",
+        choices=[(label, tier) for tier, label in create_quality_tiers().items()],
+        value=config.QUALITY_TIER,
+        interactive=True,
+        info="Draft per iterare velocemente sui testi, Final per il render definitivo"
+    )
+
     # Parameters
     with gr.Accordion("⚙️ Generation Parameters", open=False):
         components['preset_dropdown'] = gr.Dropdown(
@@ -215,7 +224,7 @@ def create_text_tab():
     return components
 
 
-def create_batch_tab(model_state):
+def create_batch_tab():
     """
     Create the Batch Processing tab.
 
@@ -243,6 +252,12 @@ def create_batch_tab(model_state):
 
         with gr.Column():
             gr.Markdown("### Parameters")
+            components['batch_quality'] = gr.Radio(
+                label="Quality",
+                choices=[(label, tier) for tier, label in create_quality_tiers().items()],
+                value=config.QUALITY_TIER,
+                info="Draft = veloce, Final = qualità piena"
+            )
             components['batch_temperature'] = gr.Slider(
                 0.05, 2.0, step=0.05, value=config.TEMPERATURE,
                 label="Temperature",